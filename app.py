@@ -1,30 +1,45 @@
 # app.py
-import os, hashlib
+import os, hashlib, time
 import streamlit as st
 import pandas as pd
 
 from fpl.kb import build_full_kb
-from fpl.api import fetch_bootstrap
+from fpl.api import fetch_bootstrap, fetch_fixtures, clear_live_caches
+from fpl.leaderboards import build_index
+from fpl.similarity import build_similarity
 if "DATABASE_URL" in st.secrets:
     os.environ["DATABASE_URL"] = st.secrets["DATABASE_URL"]
 from fpl.ai_manager.persist_db import init_db, load_state
-from fpl.ai_manager.decision import ensure_initial_squad_with_ai, run_ai_auto_until_current
-from ui.tabs_leaderboards import render_top20, render_top10_by_pos, render_budget
+from fpl.ai_manager.decision import ensure_initial_squad_with_ai, run_ai_auto_until_current, user_run_lease
+from ui.tabs_leaderboards import render_top20, render_top10_by_pos, render_budget, render_risers, clear_caches as clear_leaderboard_caches
 from ui.tab_fixtures import render_fixtures_tab
 from ui.tab_chat import render_chat_tab
 from ui.tab_ai_auto import render_ai_tab
+from ui.tab_admin import render_admin_tab, ADMIN_TAB
+from ui.pitch import cached_pitch_html
+from fpl import metrics
+from fpl.profiler import SamplingProfiler
 from config import TZ, MODEL_NAME
 
 st.set_page_config(page_title="FPL Chat Agent", page_icon="⚽", layout="wide")
 st.title("⚽ FPL Assistant")
 
+_rerun_t0 = time.perf_counter()
+# Opt-in: sample this one rerun (armed from the Admin tab)
+profiler = SamplingProfiler().start() if st.session_state.pop("profile_next", False) else None
+
 # Defaults in session
 if "openai_key" not in st.session_state: st.session_state.openai_key = ""
 if "user_id" not in st.session_state:    st.session_state.user_id = "default"
 if "auto_kick" not in st.session_state:  st.session_state.auto_kick = False
 
-# DB init
-init_db()
+# DB init (once per process, not once per rerun)
+@st.cache_resource(show_spinner=False)
+def _init_db_once():
+    init_db()
+    return True
+
+_init_db_once()
 
 # --------- KB cache wrapper: cache until user clicks Refresh ----------
 @st.cache_data(show_spinner=False)
@@ -34,6 +49,23 @@ def get_full_kb_cached(epoch: int):
     last_n = st.session_state.get("last_n", 5)
     return build_full_kb(include_history=include_history, last_n=last_n)
 
+@st.cache_data(show_spinner=False, max_entries=4)
+def get_kb_hash_cached(epoch: int) -> str:
+    """sha256 of the KB text, once per KB epoch instead of on every rerun."""
+    return hashlib.sha256(get_full_kb_cached(epoch)[0].encode("utf-8")).hexdigest()
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_leaderboards_cached(epoch: int):
+    """One shared leaderboard index per KB epoch (not copied per session)."""
+    _, kb_meta, players_df, _ = get_full_kb_cached(epoch)
+    return build_index(players_df, gw=kb_meta.get("gw"))
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_similarity_cached(epoch: int):
+    """One shared player-similarity index per KB epoch."""
+    _, kb_meta, players_df, _ = get_full_kb_cached(epoch)
+    return build_similarity(players_df, fetch_fixtures(), gw=kb_meta.get("gw"))
+
 # ---------------- Sidebar ----------------
 with st.sidebar:
     st.subheader("👤 User")
@@ -86,11 +118,18 @@ with st.sidebar:
 
     if st.button("🔄 Refresh live KB"):
         st.session_state.kb_epoch += 1
+        clear_live_caches()
         try:
             get_full_kb_cached.clear()
+            get_kb_hash_cached.clear()
+            get_leaderboards_cached.clear()
+            get_similarity_cached.clear()
+            clear_leaderboard_caches()
+            cached_pitch_html.clear()
         except Exception:
             pass
-        for k in ["full_kb", "kb_meta", "players_df", "fixtures_text", "kb_hash", "conversation"]:
+        for k in ["full_kb", "kb_meta", "players_df", "fixtures_text", "kb_hash", "conversation", "leaderboards", "similarity",
+                  "auto_mgr_uid"]:
             st.session_state.pop(k, None)
         st.rerun()
 
@@ -103,15 +142,20 @@ st.session_state.full_kb = full_kb
 st.session_state.kb_meta = kb_meta
 st.session_state.players_df = players_df
 st.session_state.fixtures_text = fixtures_text
-st.session_state.kb_hash = hashlib.sha256(full_kb.encode("utf-8")).hexdigest()
+st.session_state.kb_hash = get_kb_hash_cached(st.session_state.kb_epoch)
+st.session_state.leaderboards = get_leaderboards_cached(st.session_state.kb_epoch)
+st.session_state.similarity = get_similarity_cached(st.session_state.kb_epoch)
 st.caption(kb_meta["header"])
 
-# --------------- Load state from DB (for the active user) ---------------
-persisted = load_state(st.session_state.user_id)
-if persisted is not None:
-    st.session_state.auto_mgr = persisted
-else:
-    st.session_state.auto_mgr = st.session_state.get("auto_mgr", {"squad": []})
+# --------------- Load state from DB (for the active user; again after a switch or KB refresh) ---------------
+# The AI manager updates st.session_state.auto_mgr in place as it saves, so reruns in between need no reload.
+if st.session_state.get("auto_mgr_uid") != st.session_state.user_id:
+    persisted = load_state(st.session_state.user_id)
+    if persisted is not None:
+        st.session_state.auto_mgr = persisted
+    else:
+        st.session_state.auto_mgr = st.session_state.get("auto_mgr", {"squad": []})
+    st.session_state.auto_mgr_uid = st.session_state.user_id
 
 # --------------- Trigger AI only when requested ---------------
 trigger_ai = st.sidebar.button("▶ Initialize/Run AI now") or st.session_state.get("auto_kick", False)
@@ -120,36 +164,71 @@ if trigger_ai:
     if not st.session_state.openai_key:
         st.sidebar.warning("Add your OpenAI API key first.")
     else:
-        with st.spinner("Running AI manager…"):
-            ensure_initial_squad_with_ai(
-                user_id=st.session_state.user_id,
-                players_df=players_df,
-                kb_text=st.session_state.full_kb,
-                model_name=MODEL_NAME,
-                budget=100.0,
-            )
-            run_ai_auto_until_current(
-                user_id=st.session_state.user_id,
-                kb_meta=kb_meta,
-                players_df=players_df,
-                model_name=MODEL_NAME,
-                
-            )
-        st.sidebar.success("AI manager updated.")
-        st.rerun()
+        with st.spinner("Running AI manager…"), user_run_lease(st.session_state.user_id, "app") as lease:
+            if lease is not None:
+                ensure_initial_squad_with_ai(
+                    user_id=st.session_state.user_id,
+                    players_df=players_df,
+                    kb_text=st.session_state.full_kb,
+                    model_name=MODEL_NAME,
+                    budget=100.0,
+                )
+                run_ai_auto_until_current(
+                    user_id=st.session_state.user_id,
+                    kb_meta=kb_meta,
+                    players_df=players_df,
+                    model_name=MODEL_NAME,
+                    keep_going=lease.alive,
+                )
+        if lease is None:
+            st.sidebar.warning("A run for this user is already in progress; try again shortly.")
+        else:
+            st.sidebar.success("AI manager updated.")
+            st.rerun()
 
 # --------------- Tabs ---------------
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
-    ["Top 20 Overall","Top 10 by Position","Top Budget Picks","Fixtures","AI Auto Manager","Chat"]
-)
-
-with tab1: render_top20(players_df)
-with tab2: render_top10_by_pos(players_df)
-with tab3: render_budget(players_df)
-with tab4: render_fixtures_tab(st.session_state.fixtures_text)
-with tab5: render_ai_tab(players_df, kb_meta, user_id=st.session_state.user_id)
-with tab6: render_chat_tab(
-    model_name=MODEL_NAME,
-    kb_text=st.session_state.full_kb,
-    kb_hash=st.session_state.kb_hash,
-)
+# Only the selected tab runs: switching tabs reruns the (now cheap) page, and each tab
+# body is a fragment, so its own widgets (chat input, leaderboard pickers, AI controls)
+# rerun just that tab. Streamlit versions without tab state render every tab.
+TAB_LABELS = ["Top 20 Overall","Top 10 by Position","Top Budget Picks","Risers & Fallers","Fixtures","AI Auto Manager","Chat"]
+if ADMIN_TAB:   # opt-in per deployment (FPL_ADMIN=1)
+    TAB_LABELS.append("Admin")
+try:
+    tabs = st.tabs(TAB_LABELS, key="main_tab", on_change="rerun")
+except TypeError:
+    tabs = st.tabs(TAB_LABELS)
+tab1, tab2, tab3, tab7, tab4, tab5, tab6 = tabs[:7]
+tab8 = tabs[7] if ADMIN_TAB else None
+
+def _is_open(tab) -> bool:
+    return getattr(tab, "open", None) is not False
+
+kb_hash = st.session_state.kb_hash   # same for every session on this KB, unlike kb_epoch
+if _is_open(tab1):
+    with tab1: render_top20(st.session_state.leaderboards, kb_hash)
+if _is_open(tab2):
+    with tab2: render_top10_by_pos(st.session_state.leaderboards, kb_hash)
+if _is_open(tab3):
+    with tab3: render_budget(st.session_state.leaderboards, kb_hash)
+if _is_open(tab7):
+    with tab7: render_risers(players_df, kb_hash)
+if _is_open(tab4):
+    with tab4: render_fixtures_tab(st.session_state.fixtures_text)
+if _is_open(tab5):
+    with tab5: render_ai_tab(players_df, kb_meta, user_id=st.session_state.user_id, kb_hash=kb_hash)
+if _is_open(tab6):
+    with tab6: render_chat_tab(
+        model_name=MODEL_NAME,
+        kb_text=st.session_state.full_kb,
+        kb_hash=st.session_state.kb_hash,
+    )
+
+# --------------- Metrics / profile (last, so the whole rerun is covered) ---------------
+if profiler is not None:
+    profiler.stop()
+    st.session_state.last_profile = {"elapsed": profiler.elapsed, "samples": profiler.samples,
+                                     "top": profiler.top(), "collapsed": profiler.collapsed()}
+metrics.observe("rerun_seconds", time.perf_counter() - _rerun_t0)
+if tab8 is not None and _is_open(tab8):
+    with tab8: render_admin_tab()
+metrics.write_file()
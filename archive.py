@@ -0,0 +1,66 @@
+# archive.py
+"""
+Compact closed seasons' gw_logs into per-user archives (persist_db.archive_season).
+
+    python archive.py --list                   # hot log rows / archives per season
+    python archive.py --season 2024-25         # archive every user's 2024-25 log
+    python archive.py --season 2024-25 --vacuum
+
+Readers (get_gw_logs, get_gw_logs_page, load_state) merge the archive with any later
+rows, and save_state keeps an archived season's log out of season_states.
+"""
+from __future__ import annotations
+import argparse, sys, time
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from config import SEASON
+from fpl.ai_manager.persist_db import engine, init_db, archive_season, GwLog, GwLogArchive
+
+
+def _listing() -> list[dict]:
+    with Session(engine) as s:
+        hot = dict(s.execute(select(GwLog.season, func.count()).group_by(GwLog.season)).all())
+        arch = {r.season: r for r in s.execute(
+            select(GwLogArchive.season, func.count().label("users"), func.sum(GwLogArchive.gws).label("gws"),
+                   func.sum(GwLogArchive.raw_bytes).label("raw"), func.sum(func.length(GwLogArchive.blob)).label("blob"))
+            .group_by(GwLogArchive.season)).all()}
+    rows = []
+    for season in sorted(set(hot) | set(arch)):
+        a = arch.get(season)
+        rows.append({"season": season, "live": season == SEASON, "hot_rows": hot.get(season, 0),
+                     "archived_users": a.users if a else 0, "archived_gws": int(a.gws or 0) if a else 0,
+                     "raw_mib": (a.raw or 0) / 2**20 if a else 0.0, "blob_mib": (a.blob or 0) / 2**20 if a else 0.0})
+    return rows
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--season", default="", help="season to archive (never the live one unless --allow-live)")
+    ap.add_argument("--users", default="", help="comma-separated user ids (default: all)")
+    ap.add_argument("--allow-live", action="store_true")
+    ap.add_argument("--vacuum", action="store_true", help="reclaim freed space afterwards (SQLite VACUUM / Postgres VACUUM)")
+    ap.add_argument("--list", action="store_true")
+    args = ap.parse_args(argv)
+
+    init_db()
+    if args.season:
+        t0 = time.perf_counter()
+        users = [u for u in args.users.split(",") if u] or None
+        r = archive_season(args.season, users=users, allow_live=args.allow_live)
+        ratio = r["raw_bytes"] / r["blob_bytes"] if r["blob_bytes"] else 0.0
+        print(f"archived {r['season']}: {r['users']} users, {r['gws']} GWs, "
+              f"{r['raw_bytes'] / 2**20:.1f} MiB JSON -> {r['blob_bytes'] / 2**20:.1f} MiB ({ratio:.1f}x) "
+              f"in {time.perf_counter() - t0:.1f}s")
+        if args.vacuum:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.exec_driver_sql("VACUUM")
+    if args.list or not args.season:
+        for row in _listing():
+            print(row)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+# backtest.py
+"""
+Point-in-time season backtests of the AI manager over recorded snapshots.
+
+    FPL_TRANSPORT=record streamlit run app.py      # during the season: snapshots land in FPL_SNAPSHOT_DIR
+    python backtest.py --strategies default,hold --models gpt-5-mini --seeds 1,2 --processes 4
+    python backtest.py --llm bench.stub_llm:StubLLM --gws 1-10     # no LLM calls at all
+    python backtest.py --configs grid.json --out results.csv       # [{"strategy":..,"model":..,"seed":..,"llm":..}]
+
+GW n is decided on the newest snapshot captured before GW n's deadline and scored
+with the final (newest) snapshot's histories. LLM replies are cached on disk under
+--cache by default (--llm cached), so re-running a grid costs no tokens. State goes
+to a throwaway SQLite database, never DATABASE_URL.
+"""
+from __future__ import annotations
+import argparse, json, os, sys, tempfile
+
+# before fpl imports: persist_db / trends read these at import (spawned workers inherit them)
+_tmp = os.environ.get("FPL_BACKTEST_TMP") or tempfile.mkdtemp(prefix="fpl-backtest-")
+os.environ["FPL_BACKTEST_TMP"] = _tmp
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp, "backtest.db")
+os.environ["FPL_TRENDS_DIR"] = os.path.join(_tmp, "trends")
+
+import pandas as pd
+
+from config import MODEL_NAME, FPL_SNAPSHOT_DIR
+from fpl.ai_manager.persist_db import init_db
+from fpl.ai_manager.backtest import STRATEGIES, grid, run_backtests
+
+
+def _gw_range(s: str) -> tuple[int | None, int | None]:
+    if not s:
+        return None, None
+    lo, _, hi = s.partition("-")
+    return int(lo), int(hi or lo)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--snapshots", default=FPL_SNAPSHOT_DIR)
+    ap.add_argument("--final", default="", help="snapshot tag to score with (default: newest)")
+    ap.add_argument("--strategies", default="default", help=f"comma-separated: {', '.join(STRATEGIES)}")
+    ap.add_argument("--models", default=MODEL_NAME)
+    ap.add_argument("--seeds", default="0")
+    ap.add_argument("--llm", default="cached", help="live | cached | package.module:Factory")
+    ap.add_argument("--configs", default="", help="JSON list of configurations (overrides the grid flags)")
+    ap.add_argument("--gws", default="", help="e.g. 1-38 (default: every GW with a snapshot)")
+    ap.add_argument("--no-history", action="store_true", help="build KBs without per-player history")
+    ap.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--cache", default=os.path.join("data", "llm_cache"))
+    ap.add_argument("--out", default="", help="write the table (.csv or .json)")
+    args = ap.parse_args(argv)
+
+    if args.configs:
+        with open(args.configs, encoding="utf-8") as f:
+            configs = json.load(f)
+    else:
+        unknown = [s for s in args.strategies.split(",") if s not in STRATEGIES]
+        if unknown:
+            ap.error(f"unknown strategies {unknown}; known: {', '.join(STRATEGIES)}")
+        configs = grid(args.strategies.split(","), args.models.split(","),
+                       [int(s) for s in args.seeds.split(",")], args.llm)
+    start, end = _gw_range(args.gws)
+
+    init_db()
+    table = run_backtests(configs, args.snapshots, processes=min(args.processes, len(configs)),
+                          final_tag=args.final or None, start_gw=start, end_gw=end,
+                          include_history=not args.no_history, cache_dir=args.cache)
+    cols = ["name", "points", "gws", "failed_gws", "hits", "transfers", "chips", "solver_lineups",
+            "llm_calls", "kb_s", "wall_s"]
+    with pd.option_context("display.width", 200, "display.max_colwidth", 40):
+        print(table[cols].to_string(index=False))
+    for _, r in table[table["error"].notna()].iterrows():
+        print(f"\n{r['name']} failed:\n{r['error']}")
+    if args.out:
+        if args.out.endswith(".json"):
+            table.to_json(args.out, orient="records", indent=1)
+        else:
+            table.to_csv(args.out, index=False)
+        print(f"wrote {args.out}")
+    return 1 if table["error"].notna().any() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
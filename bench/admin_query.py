@@ -0,0 +1,98 @@
+# bench/admin_query.py
+"""
+Memory of an admin query over a large gw_logs table: the old fetchall() path versus
+persist_db.query_page / iter_query (bounded pages, streamed chunks).
+
+    python -m bench.admin_query --users 2000 --gws 38
+
+Fills a throwaway SQLite file with --users × --gws log rows (each a full JSON entry)
+and reports peak traced Python memory per approach.
+"""
+from __future__ import annotations
+import argparse, os, sys, time, tracemalloc
+
+import bench.tmpenv
+
+from config import SEASON
+from fpl.ai_manager.persist_db import engine, init_db, GwLog, iter_query, query_page
+
+SQL = "SELECT user_id, gw, entry FROM gw_logs ORDER BY user_id, gw"
+
+
+def _entry(uid: int, gw: int) -> dict:
+    squad = [(uid * 7 + gw * 3 + k) % 700 + 1 for k in range(15)]
+    return {"gw": gw, "points": (uid + gw) % 90, "bank": 0.5, "free_transfers": 1, "chip": "NONE",
+            "squad_ids": squad, "xi_ids": squad[:11], "bench_ids": squad[11:], "captain_id": squad[3],
+            "moves": [{"out": squad[0], "in": squad[1]}], "reason": "Form and fixtures favour the move. " * 12,
+            "lineup_check": {"source": "solver", "xp": 55.1, "best_xp": 56.3}}
+
+
+def fill(users: int, gws: int) -> float:
+    t0 = time.perf_counter()
+    init_db()
+    with engine.begin() as conn:
+        for u in range(users):
+            conn.execute(GwLog.__table__.insert(), [
+                {"user_id": f"user-{u:05d}", "season": SEASON, "gw": gw, "entry": _entry(u, gw)}
+                for gw in range(1, gws + 1)])
+    return time.perf_counter() - t0
+
+
+def _measure(fn) -> tuple[float, float, int]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    n = fn()
+    secs = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return secs, peak / 2**20, n
+
+
+def fetchall_rows() -> int:
+    """What raw_query did before: every row materialized at once."""
+    with engine.connect() as conn:
+        res = conn.exec_driver_sql(SQL)
+        cols = res.keys()
+        return len([dict(zip(cols, row)) for row in res.fetchall()])
+
+
+def streamed_rows() -> int:
+    """Whole result, one chunk alive at a time (e.g. an export)."""
+    return sum(len(chunk) for chunk in iter_query(SQL, timeout=600))
+
+
+def one_page() -> int:
+    return query_page(SQL, max_rows=500, arrow=True).table().num_rows
+
+
+def all_pages() -> int:
+    """Page through with next_token, keeping only the current page."""
+    n, token = 0, None
+    while True:
+        page = query_page(SQL, page_token=token, max_rows=5000, timeout=600)
+        n += page.rows
+        token = page.next_token
+        if not token:
+            return n
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--users", type=int, default=2000)
+    ap.add_argument("--gws", type=int, default=38)
+    args = ap.parse_args(argv)
+
+    secs = fill(args.users, args.gws)
+    size = os.path.getsize(engine.url.database) / 2**20
+    print(f"gw_logs: {args.users * args.gws} rows, {size:.0f} MiB on disk (filled in {secs:.1f}s)\n")
+    query_page("SELECT 1 AS x", arrow=True).table()   # pyarrow's one-time setup, not query memory
+    print(f"{'approach':<28} {'rows':>8} {'seconds':>8} {'peak MiB':>9}")
+    for name, fn in [("fetchall (old raw_query)", fetchall_rows), ("iter_query (streamed)", streamed_rows),
+                     ("query_page 500 rows, Arrow", one_page), ("query_page × all pages", all_pages)]:
+        s, peak, n = _measure(fn)
+        print(f"{name:<28} {n:>8} {s:>8.2f} {peak:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+# bench/api_load.py
+"""
+50 concurrent callers against a local stub FPL server: checks single-flight and rate limiting.
+
+    python -m bench.api_load --callers 50 --delay 0.2 --throttle-first 3
+"""
+from __future__ import annotations
+import argparse, glob, json, os, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from bench.synthetic import SyntheticSeason
+import fpl.api as api
+
+
+class StubFPL(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, season: SyntheticSeason, delay: float = 0.0, throttle_first: int = 0,
+                 recorded: dict[str, object] | None = None):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.season = season
+        self.recorded = recorded or {}
+        self.delay = float(delay)
+        self.throttle_left = int(throttle_first)
+        self.hits: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/api"
+
+    def payload(self, path: str):
+        if path in self.recorded:
+            return self.recorded[path]
+        url = urlsplit(path)
+        parts = [p for p in url.path.split("/") if p][1:]  # drop "api"
+        query = parse_qs(url.query)
+        if len(parts) == 3 and parts[0] == "leagues-classic" and parts[2] == "standings":
+            return self.season.league_standings(int(parts[1]), int(query.get("page_standings", ["1"])[0]))
+        if len(parts) == 5 and parts[0] == "entry" and parts[2] == "event" and parts[4] == "picks":
+            return self.season.entry_picks(int(parts[1]), int(parts[3]))
+        if parts == ["bootstrap-static"]:
+            return self.season.bootstrap()
+        if parts == ["fixtures"]:
+            return self.season.fixtures_payload()
+        if len(parts) == 2 and parts[0] == "element-summary":
+            return self.season.player_history(int(parts[1]))
+        return None
+
+
+def load_recorded(directory: str) -> dict[str, object]:
+    """Recorded pages: one JSON file per request, {"path": "/api/...", "body": <payload>}."""
+    out = {}
+    for fn in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(fn, encoding="utf-8") as f:
+            rec = json.load(f)
+        out[rec["path"]] = rec["body"]
+    return out
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        srv: StubFPL = self.server
+        with srv.lock:
+            srv.hits[self.path] = srv.hits.get(self.path, 0) + 1
+            throttle = srv.throttle_left > 0
+            if throttle:
+                srv.throttle_left -= 1
+        if throttle:
+            self.send_response(429)
+            self.send_header("Retry-After", "0.2")
+            self.end_headers()
+            return
+        if srv.delay:
+            time.sleep(srv.delay)
+        body = srv.payload(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+def _clear_caches():
+    for fn in (api.fetch_bootstrap, api.fetch_fixtures, api.fetch_player_history):
+        fn.cache_clear()
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--callers", type=int, default=50)
+    ap.add_argument("--players", type=int, default=5, help="distinct element-summary ids hit")
+    ap.add_argument("--delay", type=float, default=0.2, help="stub server latency per request")
+    ap.add_argument("--throttle-first", type=int, default=3, help="answer the first N requests with 429")
+    args = ap.parse_args(argv)
+
+    srv = StubFPL(SyntheticSeason(), delay=args.delay, throttle_first=args.throttle_first)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    api.FPL_API = srv.base_url
+    _clear_caches()
+
+    barrier = threading.Barrier(args.callers)
+    lat, errors = [], []
+
+    def caller(i: int):
+        barrier.wait()
+        t0 = time.perf_counter()
+        try:
+            api.fetch_bootstrap()
+            api.fetch_fixtures()
+            api.fetch_player_history(1 + i % args.players)
+        except Exception as e:
+            errors.append(repr(e))
+        lat.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(args.callers)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    wall = time.perf_counter() - t0
+    srv.shutdown()
+
+    logical = args.callers * 3
+    upstream = sum(srv.hits.values())
+    lat.sort()
+    print(f"callers={args.callers} logical_calls={logical} upstream_requests={upstream} "
+          f"distinct_urls={len(srv.hits)} errors={len(errors)}")
+    print(f"wall={wall:.3f}s p50={lat[len(lat) // 2]:.3f}s max={lat[-1]:.3f}s")
+    print("api_stats:", api.api_stats())
+    for e in errors[:5]:
+        print("  error:", e)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
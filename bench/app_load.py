@@ -0,0 +1,237 @@
+# bench/app_load.py
+"""
+N concurrent headless sessions driving app.py (streamlit.testing AppTest) against a
+stub FPL API and a stub OpenAI endpoint; rerun latency, memory and DB pool use per level.
+
+    python -m bench.app_load --sessions 1,4,8,16
+    python -m bench.app_load --sessions 8 --refreshers 8 --llm-latency 0.5   # deadline-night refresh storm
+
+Every session: open, switch user, enter a key, toggle history, (refreshers only) refresh
+the KB, open the AI tab, draft + run the AI manager, open Chat, chat, then two idle reruns. All sessions share this
+process, like sessions of one `streamlit run`: same caches, same DB pool, same GIL.
+"""
+from __future__ import annotations
+import argparse, logging, os, resource, sys, threading, time
+
+import bench.tmpenv
+os.environ["FPL_EO_LEAGUE"] = ""
+os.environ.setdefault("FPL_API_RATE", "500")   # the stand-in is local; don't model FPL's throttle here
+os.environ.setdefault("FPL_API_CONCURRENCY", "16")
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.logger import set_log_level
+from streamlit.runtime import Runtime
+from streamlit.testing.v1 import AppTest, app_test, local_script_runner
+
+from bench.api_load import StubFPL
+from bench.synthetic import SyntheticSeason
+from bench.stub_llm import StubOpenAI
+import fpl.api as api
+from fpl.kb import build_full_kb
+from fpl.ai_manager.persist_db import engine, init_db
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def _share_runtime():
+    """
+    Make concurrent AppTest runs behave like sessions of one server:
+    - AppTest installs a mock Runtime per run and clears it when that run ends, which
+      would pull it out from under the other sessions' runs. Fall back to the last one.
+    - A server compiles app.py once (one ScriptCache); AppTest compiles per run, and
+      concurrent compile() calls crash CPython 3.11's AST builder.
+    """
+    shared_cache = app_test.ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: shared_cache
+
+    last = {"rt": None}
+    orig_instance = Runtime.instance.__func__
+
+    def instance(cls):
+        if cls._instance is not None:
+            last["rt"] = cls._instance
+            return cls._instance
+        if last["rt"] is not None:
+            return last["rt"]
+        return orig_instance(cls)
+
+    def exists(cls):
+        return cls._instance is not None or last["rt"] is not None
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(exists)
+
+
+def start_stubs(delay: float, llm_latency: float, current_gw: int = 20) -> tuple[StubFPL, StubOpenAI]:
+    """Stub FPL API + stub OpenAI endpoint on localhost, wired in for app.py; quiet Streamlit logs."""
+    fpl_srv = StubFPL(SyntheticSeason(current_gw=current_gw), delay=delay)
+    threading.Thread(target=fpl_srv.serve_forever, daemon=True).start()
+    api.FPL_API = fpl_srv.base_url
+    init_db()
+    players_df = build_full_kb(include_history=False)[2]
+    llm_srv = StubOpenAI(players_df, latency=llm_latency)
+    threading.Thread(target=llm_srv.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = os.environ["OPENAI_API_BASE"] = llm_srv.base_url
+    set_log_level("error")
+    for name in ("streamlit.deprecation_util", "streamlit.runtime.scriptrunner_utils.script_run_context"):
+        logging.getLogger(name).disabled = True   # a line per dataframe / per bare st call otherwise
+    st.secrets._secrets = {"DATABASE_URL": os.environ["DATABASE_URL"]}   # what secrets.toml holds in deployment
+    return fpl_srv, llm_srv
+
+
+def _rss_mib() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class Sampler(threading.Thread):
+    """Polls process RSS and checked-out DB connections while a wave runs."""
+
+    def __init__(self, interval: float = 0.01):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.rss_peak = 0.0
+        self.pool_peak = 0
+        self.samples = 0
+        self.saturated = 0
+        self.capacity = engine.pool.size() + max(0, engine.pool._max_overflow)
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(self.interval):
+            self.rss_peak = max(self.rss_peak, _rss_mib())
+            out = engine.pool.checkedout()
+            self.pool_peak = max(self.pool_peak, out)
+            self.samples += 1
+            self.saturated += out >= self.capacity
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+def find_button(at: AppTest, label: str):
+    for b in at.button:
+        if b.label == label:
+            return b
+    raise LookupError(f"no button {label!r}")
+
+
+def open_tab(at: AppTest, label: str):
+    """Select a main tab (app.py renders only the open one) and rerun."""
+    at.session_state["main_tab"] = label
+    at.run()
+
+
+class Session:
+    def __init__(self, uid: str, idx: int, refresher: bool, timeout: float):
+        self.uid = uid
+        self.idx = idx
+        self.refresher = refresher
+        self.at = AppTest.from_file(APP, default_timeout=timeout)
+        self.lat: list[tuple[str, float]] = []
+        self.errors: list[str] = []
+
+    def _step(self, name: str, act):
+        t0 = time.perf_counter()
+        try:
+            act()
+            if self.at.exception:
+                self.errors.append(f"{name}: {self.at.exception[0].message}")
+        except Exception as e:
+            self.errors.append(f"{name}: {type(e).__name__}: {e} (last tree: {len(self.at.main.children)} main blocks)")
+        self.lat.append((name, time.perf_counter() - t0))
+
+    def run(self, barrier: threading.Barrier):
+        at = self.at
+        barrier.wait()
+        self._step("open", lambda: at.run())
+        self._step("user_id", lambda: at.text_input(key="uid_input").input(self.uid).run())
+        self._step("use_id", lambda: find_button(at, "Use this ID").click().run())
+        self._step("api_key", lambda: at.text_input(key="openai_api_key_input").input("sk-stub").run())
+        self._step("history", lambda: at.checkbox[0].check().run())
+        if self.refresher:
+            self._step("refresh_kb", lambda: find_button(at, "🔄 Refresh live KB").click().run())
+        self._step("ai_tab", lambda: open_tab(at, "AI Auto Manager"))
+        self._step("ai_draft_run", lambda: find_button(at, "🧠 Draft GW1 Squad (AI)").click().run())
+        self._step("chat_tab", lambda: open_tab(at, "Chat"))
+        self._step("chat", lambda: at.chat_input[0].set_value("Who should I captain?").run())
+        self._step("idle", lambda: at.run())
+        self._step("idle", lambda: at.run())
+
+
+def _pct(xs: list[float], q: float) -> float:
+    return float(np.percentile(xs, q)) if xs else float("nan")
+
+
+def wave(n: int, refreshers: int, timeout: float) -> tuple[dict, list[Session]]:
+    sessions = [Session(f"load-{n}-{i}", i, i < refreshers, timeout) for i in range(n)]
+    barrier = threading.Barrier(n)
+    base_rss = _rss_mib()
+    sampler = Sampler()
+    sampler.start()
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=s.run, args=(barrier,), name=f"session-{s.idx}") for s in sessions]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    wall = time.perf_counter() - t0
+    sampler.stop()
+    lat = [d for s in sessions for _, d in s.lat]
+    return {
+        "sessions": n, "reruns": len(lat), "errors": sum(len(s.errors) for s in sessions),
+        "p50_s": _pct(lat, 50), "p95_s": _pct(lat, 95), "p99_s": _pct(lat, 99), "max_s": max(lat),
+        "wall_s": wall, "reruns_per_s": len(lat) / wall,
+        "rss_peak_mib": sampler.rss_peak, "rss_per_session_mib": max(0.0, sampler.rss_peak - base_rss) / n,
+        "pool_peak": f"{sampler.pool_peak}/{sampler.capacity}",
+        "pool_saturated_pct": 100.0 * sampler.saturated / max(1, sampler.samples),
+    }, sessions
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--sessions", default="1,4,8", help="comma-separated concurrency levels")
+    ap.add_argument("--refreshers", type=int, default=1, help="sessions per level that click Refresh KB")
+    ap.add_argument("--delay", type=float, default=0.005, help="stub FPL API latency per request")
+    ap.add_argument("--llm-latency", type=float, default=0.2, help="stub LLM latency per call")
+    ap.add_argument("--timeout", type=float, default=300.0, help="per-rerun timeout")
+    ap.add_argument("--steps", action="store_true", help="also print latency by step")
+    args = ap.parse_args(argv)
+
+    fpl_srv, llm_srv = start_stubs(args.delay, args.llm_latency)
+    _share_runtime()
+
+    # warm-up: imports, first KB build and the caches, outside the measured waves
+    Session("warmup", -1, False, args.timeout).at.run()
+
+    rows, steps = [], []
+    for n in [int(x) for x in args.sessions.split(",")]:
+        row, sessions = wave(n, args.refreshers, args.timeout)
+        rows.append(row)
+        steps += [{"sessions": n, "step": name, "s": d} for s in sessions for name, d in s.lat]
+        errs = [e for s in sessions for e in s.errors]
+        print(f"sessions={n}: {row['reruns']} reruns in {row['wall_s']:.1f}s, {row['errors']} errors", flush=True)
+        for e in errs[:3]:
+            print("   ", e)
+
+    fpl_srv.shutdown()
+    llm_srv.shutdown()
+    table = pd.DataFrame(rows)
+    print()
+    with pd.option_context("display.width", 200):
+        print(table.round(3).to_string(index=False))
+    if args.steps:
+        by_step = pd.DataFrame(steps).groupby(["sessions", "step"], sort=False)["s"].median().unstack("sessions")
+        print("\nmedian seconds by step:")
+        print(by_step.round(3).to_string())
+    print(f"\nprocess peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB; "
+          f"upstream FPL requests {sum(fpl_srv.hits.values())}; LLM calls {llm_srv.calls}")
+    return 1 if table["errors"].sum() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+# bench/app_rerun.py
+"""
+Rerun cost of app.py for one session, interaction by interaction (AppTest, stub FPL
+API and stub OpenAI endpoint), for a user with a full AI log.
+
+    python -m bench.app_rerun --repeat 5
+
+AppTest always reruns the whole script, so each row is a full-page rerun; with lazy
+tabs the "... (<tab> open)" rows are what a rerun costs while that tab is selected.
+"""
+from __future__ import annotations
+import argparse, statistics, sys, time
+
+from bench.app_load import APP, find_button, open_tab, start_stubs   # sets up the throwaway DB / trend dir first
+from streamlit.testing.v1 import AppTest
+
+from bench.stub_llm import StubLLM
+from fpl.ai_manager.persist_db import save_state
+from fpl.kb import build_full_kb
+
+def _seed_user(uid: str) -> None:
+    """A drafted squad that has not played yet: the sidebar run then logs every GW so far."""
+    players_df = build_full_kb(include_history=False)[2]
+    squad = StubLLM(players_df)._draft()["squad_ids"]
+    save_state(uid, {"squad": squad, "bank": 0.5, "free_transfers": 0, "last_gw_processed": 0,
+                     "last_ft_accrual_gw": 0, "chips": {"TC": True, "BB": True, "FH": True, "WC1": True,
+                                                        "WC2": True}, "log": []})
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--gw", type=int, default=20, help="current GW (log length)")
+    args = ap.parse_args(argv)
+
+    fpl_srv, llm_srv = start_stubs(0.0, 0.0, current_gw=args.gw)
+    _seed_user("rerun")
+    at = AppTest.from_file(APP, default_timeout=300)
+    at.run()
+    at.text_input(key="uid_input").input("rerun").run()
+    find_button(at, "Use this ID").click().run()
+    at.text_input(key="openai_api_key_input").input("sk-stub").run()
+    find_button(at, "▶ Initialize/Run AI now").click().run()
+    print(f"log entries: {len(at.session_state['auto_mgr']['log'])}")
+
+    def tab(label: str):
+        return lambda: open_tab(at, label)
+
+    metrics = iter(["form", "selected_by"] * args.repeat)
+    steps = [
+        ("idle rerun", lambda: at.run()),
+        ("leaderboard: change metric", lambda: at.selectbox(key="lb_top20_metric").set_value(next(metrics)).run()),
+        ("rerun (AI Auto Manager open)", tab("AI Auto Manager")),
+        ("rerun (Chat open)", tab("Chat")),
+        ("chat message", lambda: at.chat_input[0].set_value("Who should I captain?").run()),
+        ("rerun (Top 20 Overall open)", tab("Top 20 Overall")),
+    ]
+    print(f"{'interaction':<32} {'median s':>9} {'min s':>9}")
+    for name, act in steps:
+        samples = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            act()
+            samples.append(time.perf_counter() - t0)
+            if at.exception:
+                print(f"  {name}: {at.exception[0].message}")
+        print(f"{name:<32} {statistics.median(samples):>9.3f} {min(samples):>9.3f}")
+    fpl_srv.shutdown()
+    llm_srv.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
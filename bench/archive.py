@@ -0,0 +1,102 @@
+# bench/archive.py
+"""
+Season archival on SQLite: hot-table size, read latency and archive size before and
+after compacting a closed season (persist_db.archive_season).
+
+    python -m bench.archive --users 2000 --old-gws 38 --live-gws 10
+
+Fills a throwaway database with a closed season (every user, --old-gws GWs, logs in
+both gw_logs and season_states like the AI manager writes them) and the live season,
+then archives the closed one.
+"""
+from __future__ import annotations
+import argparse, statistics, sys, time
+
+import bench.tmpenv
+
+from bench.admin_query import _entry
+from config import SEASON
+from fpl.ai_manager.persist_db import (
+    engine, init_db, GwLog, SeasonState, archive_season, get_gw_logs, get_gw_logs_page, load_state,
+)
+
+OLD = "2024-25"
+
+
+def fill(users: int, season: str, gws: int):
+    with engine.begin() as conn:
+        for u in range(users):
+            entries = [_entry(u, gw) for gw in range(1, gws + 1)]
+            conn.execute(GwLog.__table__.insert(), [
+                {"user_id": f"user-{u:05d}", "season": season, "gw": e["gw"], "entry": e} for e in entries])
+            conn.execute(SeasonState.__table__.insert(), [{
+                "user_id": f"user-{u:05d}", "season": season,
+                "state": {"squad": entries[-1]["squad_ids"], "bank": 0.5, "free_transfers": 1,
+                          "last_gw_processed": gws, "chips": {}, "log": entries}}])
+
+
+def table_mib() -> dict[str, float]:
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").all()
+    return {name: size / 2**20 for name, size in rows}
+
+
+def _ms(fn, n: int = 200) -> float:
+    samples = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+def reads(users: int) -> dict[str, float]:
+    uid = lambda i: f"user-{(i * 37) % users:05d}"
+    return {
+        "live get_gw_logs ms": _ms(lambda i: get_gw_logs(uid(i))),
+        "live page ms": _ms(lambda i: get_gw_logs_page(uid(i))),
+        "old get_gw_logs ms": _ms(lambda i: get_gw_logs(uid(i), OLD)),
+        "old load_state ms": _ms(lambda i: load_state(uid(i), OLD)),
+    }
+
+
+def _vacuum():
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--users", type=int, default=2000)
+    ap.add_argument("--old-gws", type=int, default=38)
+    ap.add_argument("--live-gws", type=int, default=10)
+    args = ap.parse_args(argv)
+
+    init_db()
+    fill(args.users, OLD, args.old_gws)
+    fill(args.users, SEASON, args.live_gws)
+    _vacuum()
+    before_sizes, before_reads = table_mib(), reads(args.users)
+    check = get_gw_logs("user-00042", OLD), load_state("user-00042", OLD)
+    check[1]["log_archived"] = True   # the one key archiving adds (save_state keeps the log compacted by it)
+
+    t0 = time.perf_counter()
+    r = archive_season(OLD)
+    secs = time.perf_counter() - t0
+    _vacuum()
+    after_sizes, after_reads = table_mib(), reads(args.users)
+    same = (get_gw_logs("user-00042", OLD), load_state("user-00042", OLD)) == check
+
+    print(f"archived {r['users']} users / {r['gws']} GWs in {secs:.1f}s: {r['raw_bytes'] / 2**20:.1f} MiB JSON -> "
+          f"{r['blob_bytes'] / 2**20:.1f} MiB blobs; archived reads identical: {same}\n")
+    print(f"{'':<28} {'before':>9} {'after':>9}")
+    for name in ("gw_logs", "season_states", "gw_log_archives"):
+        print(f"{name + ' MiB':<28} {before_sizes.get(name, 0):>9.1f} {after_sizes.get(name, 0):>9.1f}")
+    print(f"{'database file MiB':<28} {sum(before_sizes.values()):>9.1f} {sum(after_sizes.values()):>9.1f}")
+    for k in before_reads:
+        print(f"{k:<28} {before_reads[k]:>9.2f} {after_reads[k]:>9.2f}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
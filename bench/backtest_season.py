@@ -0,0 +1,87 @@
+# bench/backtest_season.py
+"""
+Point-in-time backtest over a synthetic season: records one snapshot per GW (captured
+an hour before each deadline) plus an end-of-season one, then runs backtest.py on it.
+
+    python -m bench.backtest_season --gws 1-38 --seeds 1,2,3 --processes 2
+    python -m bench.backtest_season --dir /tmp/season --gws 1-10    # reuse recorded snapshots
+
+Uses the stub LLM unless --llm is given.
+"""
+from __future__ import annotations
+import argparse, json, os, sys, tempfile, time
+from datetime import datetime, timedelta, timezone
+
+from bench.synthetic import SyntheticSeason, N_GWS
+from fpl.transport import SnapshotStore, RecordTransport, Reply
+
+
+class _SeasonSource:
+    """Transport that answers from a SyntheticSeason (recording without an HTTP server)."""
+    local = True
+
+    def __init__(self, season: SyntheticSeason):
+        self.season = season
+
+    def get(self, url: str, path: str, timeout: float):
+        parts = [p for p in path.split("?")[0].split("/") if p]
+        if parts == ["bootstrap-static"]:
+            body = self.season.bootstrap()
+        elif parts == ["fixtures"]:
+            body = self.season.fixtures_payload()
+        elif len(parts) == 2 and parts[0] == "element-summary":
+            body = self.season.player_history(int(parts[1]))
+        else:
+            return Reply(404, b"", {}, url)
+        return Reply(200, json.dumps(body).encode("utf-8"), {}, url)
+
+
+def record_season(store: SnapshotStore, seed: int) -> float:
+    t0 = time.perf_counter()
+    deadlines = {e["id"]: datetime.fromisoformat(e["deadline_time"].replace("Z", "+00:00"))
+                 for e in SyntheticSeason(seed=seed).bootstrap()["events"]}
+    for gw in range(1, N_GWS + 2):
+        at = deadlines[gw] - timedelta(hours=1) if gw <= N_GWS else deadlines[N_GWS] + timedelta(days=7)
+        season = SyntheticSeason(seed=seed, current_gw=gw)
+        tag = f"synthetic-gw{gw:02d}" if gw <= N_GWS else "synthetic-final"
+        rec = RecordTransport(store, tag, inner=_SeasonSource(season),
+                              clock=lambda at=at: at.astimezone(timezone.utc).isoformat(timespec="seconds"))
+        rec.get("", "bootstrap-static/", 0)
+        rec.get("", "fixtures/", 0)
+        for el in season.elements:
+            rec.get("", f"element-summary/{el['id']}/", 0)
+        rec.flush()
+    return time.perf_counter() - t0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--dir", default="", help="snapshot directory (recorded if empty)")
+    ap.add_argument("--seed", type=int, default=7, help="synthetic season seed")
+    ap.add_argument("--gws", default="1-38")
+    ap.add_argument("--strategies", default="default")
+    ap.add_argument("--seeds", default="1,2")
+    ap.add_argument("--llm", default="bench.stub_llm:StubLLM")
+    ap.add_argument("--processes", type=int, default=2)
+    ap.add_argument("--no-history", action="store_true")
+    args = ap.parse_args(argv)
+
+    store = SnapshotStore(args.dir or tempfile.mkdtemp(prefix="fpl-season-"))
+    if not store.tags():
+        secs = record_season(store, args.seed)
+        size = sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(store.root) for f in fs)
+        print(f"recorded {len(store.tags())} snapshots in {secs:.1f}s ({size / 2**20:.1f} MiB) → {store.root}")
+
+    import backtest   # sets up its throwaway database before fpl.ai_manager is imported
+    cli = ["--snapshots", store.root, "--gws", args.gws, "--strategies", args.strategies,
+           "--seeds", args.seeds, "--llm", args.llm, "--processes", str(args.processes)]
+    if args.no_history:
+        cli.append("--no-history")
+    t0 = time.perf_counter()
+    rc = backtest.main(cli)
+    print(f"total {time.perf_counter() - t0:.1f}s")
+    return rc
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+# bench/catchup.py
+"""
+Sequential vs pipelined GW catch-up on a synthetic season with a stub LLM.
+
+    python -m bench.catchup --gws 10 --llm-latency 0.3 --history-latency 0.02
+"""
+from __future__ import annotations
+import argparse, sys
+
+import bench.tmpenv
+
+import streamlit as st
+
+from bench.synthetic import SyntheticSeason
+from bench.offline import install
+from bench.stub_llm import StubLLM
+from fpl.kb import build_full_kb
+from fpl.ai_manager import decision
+from fpl.ai_manager.persist_db import init_db
+
+
+def _run(mode: str, gws: int, season: SyntheticSeason, kb, players_df, stub: StubLLM) -> dict:
+    full_kb, kb_meta = kb
+    st.session_state.openai_key = "stub"
+    st.session_state.full_kb = full_kb
+    squad = decision._json_from_text(stub.invoke([{"content": "draft"}]).content)["squad_ids"]
+    st.session_state.auto_mgr = {
+        "squad": squad, "bank": 5.0, "free_transfers": 1,
+        "last_gw_processed": int(kb_meta["gw"]) - gws, "last_ft_accrual_gw": 0,
+        "chips": {"TC": True, "BB": True, "FH": True, "WC1": True, "WC2": True}, "log": [],
+    }
+    # fresh history cache per mode so both pay the same fetch cost
+    season._history.clear()
+    return decision.run_ai_auto_until_current(
+        user_id=f"bench-{mode}", kb_meta=kb_meta, players_df=players_df,
+        model_name="stub", pipelined=(mode == "pipelined"),
+    )
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--gws", type=int, default=10)
+    ap.add_argument("--current-gw", type=int, default=20)
+    ap.add_argument("--llm-latency", type=float, default=0.3)
+    ap.add_argument("--history-latency", type=float, default=0.02)
+    args = ap.parse_args(argv)
+
+    season = SyntheticSeason(current_gw=args.current_gw)
+    install(season, history_latency=args.history_latency)
+    init_db()
+    full_kb, kb_meta, players_df, _ = build_full_kb(include_history=False)
+    stub = StubLLM(players_df, latency=args.llm_latency)
+    decision._llm = lambda model_name: stub
+
+    print(f"{'mode':<10} {'gws':>4} {'search':>8} {'sim':>8} {'plan':>8} {'decide':>8} {'validate':>9} {'score':>8} {'persist':>8} {'wall':>8}")
+    for mode in ("sequential", "pipelined"):
+        t = _run(mode, args.gws, season, (full_kb, kb_meta), players_df, stub)
+        print(f"{mode:<10} {t['gws']:>4} {t['search']:>8.3f} {t['simulate']:>8.3f} {t['plan']:>8.3f} {t['decide']:>8.3f} {t['validate']:>9.3f} "
+              f"{t['score']:>8.3f} {t['persist']:>8.3f} {t['wall']:>8.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
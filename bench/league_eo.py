@@ -0,0 +1,69 @@
+# bench/league_eo.py
+"""
+League picks → effective ownership against a local stub FPL server.
+
+    python -m bench.league_eo --league 314 --entries 2000 --gw 19
+    python -m bench.league_eo --recorded data/recorded_league   # serve recorded pages instead
+
+Recorded pages are JSON files {"path": "/api/...", "body": ...}; --record DIR writes the
+pages this run served in that format.
+"""
+from __future__ import annotations
+import argparse, hashlib, json, os, sys, threading, time
+import numpy as np
+
+from bench.api_load import StubFPL, load_recorded
+from bench.synthetic import SyntheticSeason
+import fpl.api as api
+from fpl import leagues
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--league", type=int, default=leagues.OVERALL_LEAGUE_ID)
+    ap.add_argument("--entries", type=int, default=2000)
+    ap.add_argument("--gw", type=int, default=19)
+    ap.add_argument("--delay", type=float, default=0.01, help="stub server latency per request")
+    ap.add_argument("--rate", type=float, default=200.0, help="client requests/sec (FPL_API_RATE)")
+    ap.add_argument("--recorded", default="", help="directory of recorded pages to serve")
+    ap.add_argument("--record", default="", help="write the served pages to this directory")
+    args = ap.parse_args(argv)
+
+    season = SyntheticSeason(current_gw=args.gw + 1)
+    srv = StubFPL(season, delay=args.delay, recorded=load_recorded(args.recorded) if args.recorded else None)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    api.FPL_API = srv.base_url
+    api._limiter = api.RateLimiter(rate=args.rate)
+    player_ids = np.array([e["id"] for e in season.elements])
+
+    t0 = time.perf_counter()
+    entries = leagues.league_entries(args.league, max_entries=args.entries)
+    t_pages = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    pm = leagues.pick_matrix(entries["entry"], args.gw, player_ids)
+    t_picks = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    eo = pm.frame()
+    t_eo = time.perf_counter() - t0
+    srv.shutdown()
+
+    print(f"entries={len(entries)} pages={-(-len(entries) // leagues.PAGE_SIZE)} "
+          f"standings={t_pages:.2f}s picks={t_picks:.2f}s ({len(pm.entry_ids) / max(t_picks, 1e-9):.0f}/s) "
+          f"eo={t_eo * 1e3:.1f}ms matrix={pm.nbytes / 1024:.0f} KiB")
+    print("chip usage %:", {k: round(v, 1) for k, v in pm.chip_usage().items()})
+    print(eo.sort_values("eo", ascending=False).head(10).round(1).to_string())
+    print("upstream requests:", sum(srv.hits.values()), "api_stats:", api.api_stats())
+
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+        for path in srv.hits:
+            body = srv.payload(path)
+            name = hashlib.sha1(path.encode("utf-8")).hexdigest()[:16] + ".json"
+            with open(os.path.join(args.record, name), "w", encoding="utf-8") as f:
+                json.dump({"path": path, "body": body}, f)
+        print(f"recorded {len(srv.hits)} pages → {args.record}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
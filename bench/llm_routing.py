@@ -0,0 +1,114 @@
+# bench/llm_routing.py
+"""
+Batch weekly runs with and without LLM routing, on a stub backend with two tiers.
+
+    python -m bench.llm_routing --users 6 --gws 6 --fast-latency 0.08 --strong-latency 0.4 --fast-fail 0.15
+
+"fast" answers quickly but a fraction of its replies are malformed JSON or pick an
+illegal transfer; "strong" is slow and always valid. Compares strong-only, fast-only
+and routed (fast, repair / escalate to strong on a failed check): mean latency per
+weekly decision, failures that reached the AI manager, escalations and tokens.
+"""
+from __future__ import annotations
+import argparse, json, random, sys, time
+from types import SimpleNamespace
+
+import bench.tmpenv
+
+from bench.synthetic import SyntheticSeason
+from bench.offline import install
+from bench.stub_llm import StubLLM
+from fpl.kb import build_full_kb
+from fpl.ai_manager import decision, routing
+from fpl.ai_manager.persist_db import init_db
+
+
+class TierStub(StubLLM):
+    """StubLLM with its own latency and, for the fast tier, seeded bad replies."""
+
+    def __init__(self, players_df, latency: float, fail_rate: float, seed: int):
+        super().__init__(players_df, latency=latency)
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.forwards = [int(i) for i in players_df.loc[players_df["pos"] == "FWD", "id"]]
+
+    def invoke(self, messages):
+        usr = messages[-1]["content"]
+        if "REPLY TO FIX:" in usr:   # repair route: strip the stray brace the bad reply carried
+            self.calls += 1
+            time.sleep(self.latency)
+            bad = usr.split("REPLY TO FIX:\n", 1)[1].rsplit("\n\nReturn the same content", 1)[0]
+            return SimpleNamespace(content=bad.replace("{{", "{", 1))
+        resp = super().invoke(messages)
+        if "CURRENT 15:" not in usr or self.rng.random() >= self.fail_rate:
+            return resp
+        dec = json.loads(resp.content)
+        if self.rng.random() < 0.5:
+            return SimpleNamespace(content="{" + resp.content)          # malformed JSON
+        # illegal transfer: a forward in for the goalkeeper
+        squad = set(dec["xi_ids"]) | set(dec["bench_order"])
+        dec.update(made=True, out_ids=dec["xi_ids"][:1],
+                   in_ids=[self.rng.choice([i for i in self.forwards if i not in squad])])
+        return SimpleNamespace(content=json.dumps(dec))
+
+
+def _run(mode: str, users: int, gws: int, kb, players_df, args) -> dict:
+    full_kb, kb_meta = kb
+    stubs = {"fast": TierStub(players_df, args.fast_latency, args.fast_fail, seed=1),
+             "strong": TierStub(players_df, args.strong_latency, 0.0, seed=2)}
+    decision._llm = lambda model_name: stubs[model_name]
+    routing.FPL_LLM_STRONG_MODEL = "strong"
+    routing.FPL_LLM_FAST_MODEL = {"strong-only": "strong", "fast-only": "fast", "routed": "fast"}[mode]
+    routing.ROUTES["weekly"].escalate = mode != "fast-only"
+    routing.reset_stats()
+    draft = decision._json_from_text(stubs["strong"].invoke([{"content": "draft"}]).content)["squad_ids"]
+
+    decide, done, lost = 0.0, 0, 0
+    for u in range(users):
+        values = {"openai_key": "stub", "full_kb": full_kb, "auto_mgr": {
+            "squad": list(draft), "bank": 5.0, "free_transfers": 1,
+            "last_gw_processed": int(kb_meta["gw"]) - gws, "last_ft_accrual_gw": 0,
+            "chips": {"TC": True, "BB": True, "FH": True, "WC1": True, "WC2": True}, "log": []}}
+        with decision.session_scope(values) as s:
+            # a failed week stops the run: resume from the next GW like the next scheduled run would
+            while int(s.auto_mgr["last_gw_processed"]) < int(kb_meta["gw"]):
+                before = int(s.auto_mgr["last_gw_processed"])
+                t = decision.run_ai_auto_until_current(f"{mode}-{u}", kb_meta, players_df, "strong")
+                decide += t["decide"]
+                done += t["gws"]
+                if int(s.auto_mgr["last_gw_processed"]) == before:
+                    lost += 1
+                    s.auto_mgr["last_gw_processed"] = before + 1
+    rows = [r for r in routing.route_stats() if r["task"] in ("weekly", "repair")]
+    calls = sum(r["calls"] for r in rows)
+    return {"mode": mode, "decisions": done, "lost_gws": lost, "mean_decide_s": decide / max(1, done + lost),
+            "llm_calls": calls, "escalations": sum(r["escalations"] for r in rows),
+            "escalation_rate": sum(r["escalations"] for r in rows) / max(1, done + lost),
+            "fast_failures": sum(r["failures"] for r in rows if r["model"] == "fast"),
+            "tokens_k": sum(r["tokens"] for r in rows) / 1000}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--users", type=int, default=6)
+    ap.add_argument("--gws", type=int, default=6)
+    ap.add_argument("--current-gw", type=int, default=20)
+    ap.add_argument("--fast-latency", type=float, default=0.08)
+    ap.add_argument("--strong-latency", type=float, default=0.4)
+    ap.add_argument("--fast-fail", type=float, default=0.15, help="share of bad fast-tier weekly replies")
+    args = ap.parse_args(argv)
+
+    install(SyntheticSeason(current_gw=args.current_gw))
+    init_db()
+    full_kb, kb_meta, players_df, _ = build_full_kb(include_history=False)
+    print(f"{'mode':<12} {'decisions':>9} {'lost GWs':>8} {'mean s':>7} {'LLM calls':>9} {'escalated':>9} "
+          f"{'esc rate':>8} {'fast fails':>10} {'ktokens':>8}")
+    for mode in ("strong-only", "fast-only", "routed"):
+        r = _run(mode, args.users, args.gws, (full_kb, kb_meta), players_df, args)
+        print(f"{r['mode']:<12} {r['decisions']:>9} {r['lost_gws']:>8} {r['mean_decide_s']:>7.3f} {r['llm_calls']:>9} "
+              f"{r['escalations']:>9} {r['escalation_rate']:>8.2f} {r['fast_failures']:>10} {r['tokens_k']:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+# bench/offline.py
+# Point fpl.api (and the modules that imported from it) at a SyntheticSeason.
+from __future__ import annotations
+import sys, time
+
+from bench.synthetic import SyntheticSeason
+
+_FETCHERS = ("fetch_bootstrap", "fetch_fixtures", "fetch_player_history",
+             "fetch_league_standings", "fetch_entry_picks")
+
+
+def install(season: SyntheticSeason, history_latency: float = 0.0) -> None:
+    """
+    Replace the fetch_* functions everywhere they were imported. `history_latency`
+    is slept per element-summary call to stand in for the live HTTP round trip.
+    """
+    def fetch_bootstrap():
+        return season.bootstrap()
+
+    def fetch_fixtures():
+        return season.fixtures_payload()
+
+    def fetch_player_history(player_id: int):
+        if history_latency:
+            time.sleep(history_latency)
+        return season.player_history(player_id)
+
+    def fetch_league_standings(league_id: int, page: int = 1):
+        return season.league_standings(league_id, page)
+
+    def fetch_entry_picks(entry_id: int, gw: int):
+        return season.entry_picks(entry_id, gw)
+
+    fns = {"fetch_bootstrap": fetch_bootstrap, "fetch_fixtures": fetch_fixtures,
+           "fetch_player_history": fetch_player_history,
+           "fetch_league_standings": fetch_league_standings, "fetch_entry_picks": fetch_entry_picks}
+    for mod in list(sys.modules.values()):
+        name = getattr(mod, "__name__", "") or ""
+        if not (name == "fpl" or name.startswith("fpl.") or name.startswith("ui.")):
+            continue
+        for fn in _FETCHERS:
+            if hasattr(mod, fn):
+                setattr(mod, fn, fns[fn])
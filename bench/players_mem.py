@@ -0,0 +1,54 @@
+# bench/players_mem.py
+"""
+Per-session players frame footprint: the old all-columns frame vs the lean typed one.
+
+    python -m bench.players_mem
+
+Streamlit's cache_data hands every session its own unpickled copy, so both the
+in-memory size and the pickled size matter.
+"""
+from __future__ import annotations
+import os, pickle, sys, tempfile
+
+os.environ.setdefault("FPL_TRENDS_DIR", tempfile.mkdtemp(prefix="fpl-bench-"))
+
+import pandas as pd
+
+from bench.synthetic import SyntheticSeason
+from bench.offline import install
+from fpl.kb import POS, build_full_kb
+
+
+def _legacy_frame(bs: dict) -> pd.DataFrame:
+    """The players frame as build_full_kb produced it before the lean schema."""
+    players = pd.DataFrame(bs.get("elements", []))
+    team_short = pd.DataFrame(bs["teams"]).set_index("id")["short_name"].to_dict()
+    players["team_short"] = players["team"].map(team_short)
+    players["price"] = players["now_cost"] / 10.0
+    players["pos"] = players["element_type"].map(POS)
+    players["selected_by"] = pd.to_numeric(players.get("selected_by_percent", 0), errors="coerce").fillna(0.0)
+    players["chance_next"] = pd.to_numeric(players.get("chance_of_playing_next_round"), errors="coerce")
+    players["chance_this"] = pd.to_numeric(players.get("chance_of_playing_this_round"), errors="coerce")
+    players["status_label"] = players["status"]
+    return players
+
+
+def _report(name: str, df: pd.DataFrame):
+    mem = df.memory_usage(deep=True).sum()
+    pkl = len(pickle.dumps(df))
+    print(f"{name:<8} rows={len(df):>4} cols={df.shape[1]:>3} memory={mem / 1024:>8.1f} KiB pickled={pkl / 1024:>8.1f} KiB")
+    return mem
+
+
+def main(argv=None) -> int:
+    season = SyntheticSeason()
+    install(season)
+    before = _report("legacy", _legacy_frame(season.bootstrap()))
+    _, _, players, _ = build_full_kb(include_history=False)
+    after = _report("lean", players)
+    print(f"reduction: {before / max(after, 1):.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
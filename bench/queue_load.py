@@ -0,0 +1,127 @@
+# bench/queue_load.py
+"""
+Job queue on SQLite with several worker processes, a synthetic season and the stub LLM.
+
+    python -m bench.queue_load --users 40 --processes 4 --gws 3 --fail-rate 0.05
+
+Saves --users seasons --gws behind the current GW, enqueues them all (twice, to
+check enqueue is idempotent), drains the queue with --processes workers, then
+checks every user reached the current GW with exactly one log row per GW.
+"""
+from __future__ import annotations
+import argparse, logging, multiprocessing as mp, os, queue, random, sys, time
+
+import bench.tmpenv   # first: throwaway DB and trend dir (spawned workers reuse it)
+os.environ.setdefault("FPL_JOB_BACKOFF", "0.2")
+os.environ.setdefault("FPL_JOB_POLL", "0.1")
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+import worker as job_worker
+from bench.synthetic import SyntheticSeason
+from bench.offline import install
+from bench.stub_llm import StubLLM
+from fpl.kb import build_full_kb
+from fpl.ai_manager import decision
+from fpl.ai_manager.persist_db import (
+    engine, init_db, save_state, enqueue_all, get_gw_logs, load_state, job_stats, raw_query,
+)
+
+
+class _FlakyLLM(StubLLM):
+    """StubLLM that raises on a fraction of calls, to exercise retries."""
+
+    def __init__(self, players_df, latency: float, fail_rate: float, seed: int):
+        super().__init__(players_df, latency=latency)
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+
+    def invoke(self, messages):
+        if self.rng.random() < self.fail_rate:
+            raise RuntimeError("stub LLM: injected failure")
+        return super().invoke(messages)
+
+
+def _bench_worker(i: int, current_gw: int, llm_latency: float, fail_rate: float, out):
+    logging.basicConfig(level=logging.WARNING)
+    engine.dispose(close=False)
+    install(SyntheticSeason(current_gw=current_gw))
+    w = job_worker.Worker(name=f"bench-{i}")
+    stubs = {}
+
+    def llm(model_name):
+        if w.snap.epoch not in stubs:
+            stubs[w.snap.epoch] = _FlakyLLM(w.snap.players_df, llm_latency, fail_rate, seed=i)
+        return stubs[w.snap.epoch]
+
+    decision._llm = llm
+    out.put(w.work(drain=True, poll=0.1))
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--users", type=int, default=40)
+    ap.add_argument("--processes", type=int, default=4)
+    ap.add_argument("--gws", type=int, default=3, help="GWs each user is behind")
+    ap.add_argument("--current-gw", type=int, default=20)
+    ap.add_argument("--llm-latency", type=float, default=0.0)
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="fraction of LLM calls that raise")
+    args = ap.parse_args(argv)
+
+    season = SyntheticSeason(current_gw=args.current_gw)
+    install(season)
+    init_db()
+    _, kb_meta, players_df, _ = build_full_kb(include_history=False)
+    stub = StubLLM(players_df)
+    squad = decision._json_from_text(stub.invoke([{"content": "draft"}]).content)["squad_ids"]
+    users = [f"bench-{u:04d}" for u in range(args.users)]
+    for u in users:
+        save_state(u, {"squad": squad, "bank": 5.0, "free_transfers": 1,
+                       "last_gw_processed": args.current_gw - args.gws, "last_ft_accrual_gw": 0,
+                       "chips": {"TC": True, "BB": True, "FH": True, "WC1": True, "WC2": True}, "log": []})
+    enqueue_all(args.current_gw)
+    enqueue_all(args.current_gw)
+    engine.dispose()
+
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    t0 = time.perf_counter()
+    procs = [ctx.Process(target=_bench_worker, args=(i, args.current_gw, args.llm_latency, args.fail_rate, out))
+             for i in range(args.processes)]
+    for p in procs: p.start()
+    stats = []
+    while len(stats) < len(procs) and (any(p.is_alive() for p in procs) or not out.empty()):
+        try:
+            stats.append(out.get(timeout=1.0))
+        except queue.Empty:
+            pass
+    for p in procs: p.join()
+    wall = time.perf_counter() - t0
+
+    bad = []
+    for u in users:
+        logs = get_gw_logs(u)
+        gws = [int(e.get("gw")) for e in logs]
+        state = load_state(u)
+        if state.get("last_gw_processed") != args.current_gw or sorted(gws) != list(
+                range(args.current_gw - args.gws + 1, args.current_gw + 1)):
+            bad.append((u, state.get("last_gw_processed"), gws))
+    attempts = raw_query("SELECT SUM(attempts) AS n FROM jobs")[0]["n"]
+    q = job_stats(window_secs=wall + 60)
+    if len(stats) < len(procs):
+        print(f"{len(procs) - len(stats)} worker(s) died")
+        return 1
+    total = {k: sum(s[k] for s in stats) for k in stats[0]}
+
+    print(f"users={args.users} processes={args.processes} gws_behind={args.gws} fail_rate={args.fail_rate}")
+    print(f"wall={wall:.2f}s  jobs/s={total['done'] / wall:.2f}  GW runs/s={total['done'] * args.gws / wall:.2f}  "
+          f"attempts={attempts}  outcomes={ {k: total[k] for k in ('done', 'noop', 'retry', 'lost')} }")
+    print(f"queue wait p50={q['queue_wait_p50']:.2f}s p95={q['queue_wait_p95']:.2f}s  by_status={q['by_status']}")
+    for i, s in enumerate(stats):
+        print(f"  worker {i}: jobs={s['jobs']} done={s['done']} retry={s['retry']} busy={s['busy']:.2f}s")
+    for b in bad[:5]:
+        print("  MISMATCH:", b)
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# bench/replay.py
+"""
+Full KB build (with player history) live against a stub FPL server, recorded to a
+snapshot, then replayed with the server shut down.
+
+    python -m bench.replay --delay 0.02 --rate 50
+    python -m bench.replay --latency 0.001 --error-rate 0.05   # replay with injected faults
+
+Checks that replay makes zero network requests and produces the same KB text.
+"""
+from __future__ import annotations
+import argparse, os, re, sys, tempfile, threading, time
+
+from bench.api_load import StubFPL
+from bench.synthetic import SyntheticSeason
+import fpl.api as api
+from fpl.kb import build_full_kb
+from fpl.transport import SnapshotStore, RecordTransport, ReplayTransport
+
+
+def _kb_text(kb: str) -> str:
+    return re.sub(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2})?\S*", "<time>", kb)   # build stamps differ
+
+
+def _build(last_n: int) -> tuple[float, str]:
+    t0 = time.perf_counter()
+    kb = build_full_kb(include_history=True, last_n=last_n)[0]
+    return time.perf_counter() - t0, kb
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--gw", type=int, default=20)
+    ap.add_argument("--last-n", type=int, default=5)
+    ap.add_argument("--delay", type=float, default=0.02, help="stub server latency per request")
+    ap.add_argument("--rate", type=float, default=50.0, help="live requests/sec (FPL_API_RATE)")
+    ap.add_argument("--latency", type=float, default=0.0, help="injected replay latency per request")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="injected replay 503 rate")
+    ap.add_argument("--dir", default="", help="snapshot directory (default: a temp dir)")
+    args = ap.parse_args(argv)
+
+    store = SnapshotStore(args.dir or tempfile.mkdtemp(prefix="fpl-snap-"))
+    srv = StubFPL(SyntheticSeason(current_gw=args.gw), delay=args.delay)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    api.FPL_API = srv.base_url
+    api._limiter = api.RateLimiter(rate=args.rate)
+
+    rec = RecordTransport(store, tag=f"bench-gw{args.gw:02d}")
+    api.set_transport(rec)
+    t_live, kb_live = _build(args.last_n)
+    rec.flush()
+    live_hits = sum(srv.hits.values())
+    srv.shutdown()
+    srv.server_close()
+
+    rep = ReplayTransport(store, rec.tag, latency=args.latency, error_rate=args.error_rate, seed=1)
+    api.set_transport(rep)
+    t_replay, kb_replay = _build(args.last_n)
+    api.set_transport(ReplayTransport(store, rec.tag, latency=args.latency, error_rate=args.error_rate, seed=2))
+    t_replay2, _ = _build(args.last_n)
+    replay_hits = sum(srv.hits.values()) - live_hits
+
+    blobs = sum(len(fs) for _, _, fs in os.walk(store.blob_dir))
+    size = sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(store.blob_dir) for f in fs)
+    same = _kb_text(kb_live) == _kb_text(kb_replay)
+    print(f"snapshot {rec.tag}: gw={rec.manifest['gw']} entries={len(rec.manifest['entries'])} "
+          f"blobs={blobs} ({size / 1024:.0f} KiB gzip) at {store.root}")
+    print(f"live   {t_live:7.3f}s  upstream_requests={live_hits}")
+    print(f"replay {t_replay:7.3f}s  ({t_live / max(t_replay, 1e-9):.0f}x)  second run {t_replay2:.3f}s  "
+          f"network_requests={replay_hits} misses={rep.misses}")
+    print(f"kb identical: {same} ({len(kb_live)} chars)")
+    return 0 if same and replay_hits == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
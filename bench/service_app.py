@@ -0,0 +1,23 @@
+# bench/service_app.py
+"""server.app with the stub LLM wired in (uvicorn bench.service_app:app). FPL data comes from FPL_API_BASE."""
+from __future__ import annotations
+import os
+
+import server
+from bench.stub_llm import StubLLM
+from fpl.ai_manager import decision
+
+LLM_LATENCY = float(os.getenv("FPL_STUB_LLM_LATENCY", "0"))
+_stubs: dict[int, StubLLM] = {}
+
+
+def _stub_llm(model_name: str) -> StubLLM:
+    snap = server.KB.current
+    if snap.epoch not in _stubs:
+        _stubs.clear()
+        _stubs[snap.epoch] = StubLLM(snap.players_df, latency=LLM_LATENCY)
+    return _stubs[snap.epoch]
+
+
+decision._llm = _stub_llm
+app = server.app
@@ -0,0 +1,159 @@
+# bench/service_load.py
+"""
+Load test for the async API (server.py) against a stub FPL server and the stub LLM.
+
+    python -m bench.service_load --workers 2 --concurrency 32 --duration 10 --runs 8
+
+Starts the stub FPL server here, the service as a subprocess (uvicorn, --workers),
+then drives a read mix for --duration seconds and --runs AI manager runs, and
+reports requests/sec and p50/p95 latency per endpoint.
+"""
+from __future__ import annotations
+import argparse, asyncio, os, socket, subprocess, sys, threading, time
+from urllib.parse import urlencode
+import httpx
+import numpy as np
+
+import bench.tmpenv   # first: throwaway DB and trend dir, shared with the service subprocess
+
+from bench.api_load import StubFPL
+from bench.synthetic import SyntheticSeason
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_service(port: int, workers: int, env: dict) -> subprocess.Popen:
+    cmd = [sys.executable, "server.py", "--app", "bench.service_app:app",
+           "--port", str(port), "--workers", str(workers)]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.Popen(cmd, cwd=root, env=env)
+
+
+async def _wait_ready(client: httpx.AsyncClient, timeout: float = 60.0):
+    t_end = time.monotonic() + timeout
+    while time.monotonic() < t_end:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("service did not come up")
+
+
+def _read_mix(season: SyntheticSeason) -> list[tuple[str, str]]:
+    names = sorted(season.elements, key=lambda e: -float(e["selected_by_percent"]))[:5]
+    mix = [
+        ("players", "/players?pos=MID&max_price=8&limit=20"),
+        ("leaderboards", "/leaderboards?metric=form&pos=MID"),
+        ("leaderboards", "/leaderboards?" + urlencode({"metric": "pts_per_m", "pos": "DEF", "band": "Budget (≤ £5.0m)"})),
+        ("fixtures", f"/fixtures?gw={season.current_gw}"),
+        ("kb", "/kb?text=0"),
+        ("users", "/users"),
+    ]
+    mix += [("similar", f"/similar/{e['web_name']}?max_price=9") for e in names]
+    return mix
+
+
+async def _drive(client: httpx.AsyncClient, reqs, concurrency: int, duration: float | None) -> dict:
+    """Issue `reqs` round-robin from `concurrency` tasks (until `duration` if set, else once each)."""
+    lat: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    nxt = 0
+    t_end = time.monotonic() + duration if duration else None
+
+    async def one():
+        nonlocal nxt
+        while True:
+            if t_end is None and nxt >= len(reqs):
+                return
+            if t_end is not None and time.monotonic() >= t_end:
+                return
+            name, method, url, kw = reqs[nxt % len(reqs)]
+            nxt += 1
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(method, url, **kw)
+                ok = r.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            lat.setdefault(name, []).append(time.perf_counter() - t0)
+            if not ok:
+                errors[name] = errors.get(name, 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(concurrency)))
+    return {"wall": time.perf_counter() - t0, "lat": lat, "errors": errors}
+
+
+def _report(title: str, res: dict):
+    n = sum(len(v) for v in res["lat"].values())
+    allv = np.concatenate([np.asarray(v) for v in res["lat"].values()]) if n else np.zeros(1)
+    print(f"{title}: {n} requests in {res['wall']:.2f}s = {n / max(res['wall'], 1e-9):.1f} req/s "
+          f"p50={np.percentile(allv, 50) * 1000:.1f}ms p95={np.percentile(allv, 95) * 1000:.1f}ms "
+          f"errors={sum(res['errors'].values())}")
+    print(f"  {'endpoint':<14} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'err':>4}")
+    for name, v in sorted(res["lat"].items()):
+        a = np.asarray(v) * 1000
+        print(f"  {name:<14} {len(a):>6} {np.percentile(a, 50):>8.1f} {np.percentile(a, 95):>8.1f} "
+              f"{a.max():>8.1f} {res['errors'].get(name, 0):>4}")
+
+
+async def _main(args, season: SyntheticSeason, base: str) -> int:
+    async with httpx.AsyncClient(base_url=base, timeout=120.0,
+                                 limits=httpx.Limits(max_connections=args.concurrency)) as client:
+        await _wait_ready(client)
+        # every worker builds its own snapshot on first use; spread a burst so each one warms up
+        t0 = time.perf_counter()
+        await asyncio.gather(*(client.get("/kb?text=0") for _ in range(4 * args.workers)))
+        print(f"warm-up (KB build per worker): {time.perf_counter() - t0:.2f}s")
+
+        reads = [(name, "GET", url, {}) for name, url in _read_mix(season)]
+        res = await _drive(client, reads, args.concurrency, args.duration)
+        _report(f"reads  workers={args.workers} concurrency={args.concurrency}", res)
+        bad = sum(res["errors"].values())
+
+        if args.runs:
+            runs = [("run", "POST", f"/users/bench-{i}/run", {"headers": {"X-OpenAI-Key": "stub", "Authorization": "Bearer bench"}, "json": {}})
+                    for i in range(args.runs)]
+            res = await _drive(client, runs, min(args.concurrency, args.runs), None)
+            _report(f"runs   users={args.runs}", res)
+            bad += sum(res["errors"].values())
+    return 1 if bad else 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds of read traffic")
+    ap.add_argument("--runs", type=int, default=4, help="AI manager runs (one new user each)")
+    ap.add_argument("--current-gw", type=int, default=20)
+    ap.add_argument("--fpl-delay", type=float, default=0.0, help="stub FPL latency per request")
+    ap.add_argument("--llm-latency", type=float, default=0.0, help="stub LLM latency per call")
+    args = ap.parse_args(argv)
+
+    season = SyntheticSeason(current_gw=args.current_gw)
+    srv = StubFPL(season, delay=args.fpl_delay)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+    port = _free_port()
+    # the database and trend dir come from bench.tmpenv through os.environ
+    env = dict(os.environ, FPL_API_BASE=srv.base_url, FPL_API_RATE="1000", FPL_API_CONCURRENCY="32",
+               FPL_STUB_LLM_LATENCY=str(args.llm_latency), FPL_EO_LEAGUE="", FPL_API_TOKEN="bench")
+    proc = _start_service(port, args.workers, env)
+    try:
+        return asyncio.run(_main(args, season, f"http://127.0.0.1:{port}"))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+        srv.shutdown()
+        print(f"stub FPL: {sum(srv.hits.values())} upstream requests over {len(srv.hits)} urls")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
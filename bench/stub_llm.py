@@ -0,0 +1,131 @@
+# bench/stub_llm.py
+# Deterministic stand-in for ChatOpenAI: reads the prompt, returns legal JSON.
+from __future__ import annotations
+import json, re, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+import pandas as pd
+
+from fpl.ai_manager.core import SQUAD_SHAPE, MAX_PER_CLUB
+
+_ID_ROW = re.compile(r"^\s*(\d+)\s", re.M)
+_OPTION = re.compile(r"^T1: out_ids=\[([\d, ]*)\] in_ids=\[([\d, ]*)\]", re.M)
+
+
+class StubLLM:
+    """
+    Mimics `.invoke(messages).content`. Draft prompts get the cheapest legal 15
+    (ranked by form); weekly prompts take the top transfer option (T1) when offered,
+    else hold, then play 4-4-2 and captain the top-form MID. FH/WC explanations get a
+    fixed line.
+    `latency` (seconds) is slept on every call to stand in for network + generation.
+    """
+
+    def __init__(self, players_df: pd.DataFrame, latency: float = 0.0):
+        self.df = players_df.set_index("id", drop=False)
+        self.latency = float(latency)
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        usr = messages[-1]["content"] if isinstance(messages[-1], dict) else str(messages[-1])
+        if "SQUAD REBUILD:" in usr:
+            return SimpleNamespace(content="stub: optimizer squad")
+        if "CURRENT 15:" in usr:
+            return SimpleNamespace(content=json.dumps(self._weekly(usr)))
+        return SimpleNamespace(content=json.dumps(self._draft()))
+
+    # ---------- weekly ----------
+    def _weekly(self, usr: str) -> dict:
+        block = usr.split("CURRENT 15:", 1)[1].split("\n\n", 1)[0]
+        ids = [int(x) for x in _ID_ROW.findall(block)]
+        outs, ins = [], []
+        m = _OPTION.search(usr)
+        if m:
+            outs = [int(x) for x in m.group(1).split(",") if x.strip()]
+            ins = [int(x) for x in m.group(2).split(",") if x.strip()]
+            ids = [i for i in ids if i not in outs] + ins
+        sub = self.df.loc[[i for i in ids if i in self.df.index]]
+        form = pd.to_numeric(sub["form"], errors="coerce").fillna(0.0)
+        sub = sub.assign(_f=form).sort_values("_f", ascending=False)
+        xi, bench = [], []
+        for pos, n in (("GK", 1), ("DEF", 4), ("MID", 4), ("FWD", 2)):
+            grp = sub[sub["pos"] == pos]["id"].astype(int).tolist()
+            xi += grp[:n]
+            bench += grp[n:]
+        mids = sub[(sub["pos"] == "MID") & sub["id"].isin(xi)]
+        cap = int(mids["id"].iloc[0]) if not mids.empty else xi[0]
+        return {
+            "made": bool(outs), "out_ids": outs, "in_ids": ins, "chip": "NONE",
+            "xi_ids": xi, "bench_order": bench, "captain_id": cap,
+            "reason": "stub: top option" if outs else "stub: hold",
+        }
+
+    # ---------- draft ----------
+    def _draft(self, budget: float = 100.0) -> dict:
+        df = self.df[self.df["status"] == "a"].copy()
+        df["_f"] = pd.to_numeric(df["form"], errors="coerce").fillna(0.0)
+        df = df.sort_values(["price", "_f"], ascending=[True, False])
+        picked, clubs = [], {}
+        for pos, need in SQUAD_SHAPE.items():
+            for _, r in df[df["pos"] == pos].iterrows():
+                if need == 0:
+                    break
+                if clubs.get(r["team_short"], 0) >= MAX_PER_CLUB:
+                    continue
+                picked.append(int(r["id"]))
+                clubs[r["team_short"]] = clubs.get(r["team_short"], 0) + 1
+                need -= 1
+        return {"squad_ids": picked, "captain_id": None, "reason": "stub: cheapest legal 15"}
+
+
+class StubOpenAI(ThreadingHTTPServer):
+    """
+    OpenAI-compatible POST /v1/chat/completions on localhost, for code that builds its
+    own ChatOpenAI (set OPENAI_BASE_URL to `base_url`). AI-manager prompts are answered
+    by StubLLM over `players_df`; anything else (chat) gets a short canned reply.
+    """
+    daemon_threads = True
+
+    def __init__(self, players_df: pd.DataFrame, latency: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _OpenAIHandler)
+        self.llm = StubLLM(players_df, latency=latency)
+        self.latency = float(latency)
+        self.calls = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def complete(self, messages: list[dict]) -> str:
+        self.calls += 1
+        text = "\n".join(str(m.get("content") or "") for m in messages)
+        if "CURRENT 15:" in text or '"squad_ids"' in text:
+            return self.llm.invoke(messages).content
+        if self.latency:
+            time.sleep(self.latency)
+        return "Stub answer: captain your highest-xP premium and keep the free transfer."
+
+
+class _OpenAIHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        content = self.server.complete(body.get("messages") or [])
+        raw = json.dumps({
+            "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": sum(len(str(m.get("content") or "")) for m in body.get("messages") or []) // 4,
+                      "completion_tokens": len(content) // 4, "total_tokens": 0},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
@@ -0,0 +1,261 @@
+# bench/suite.py
+"""
+Offline benchmark suite: synthetic season, stub LLM, throwaway SQLite; results as JSON.
+
+    python -m bench.suite                          # all benchmarks → bench/results/<time>-<commit>.json
+    python -m bench.suite --only kb,validate       # a subset (name prefixes)
+    python -m bench.suite --compare previous       # diff against the newest earlier result file
+    python -m bench.suite --compare old.json --threshold 0.2
+
+Each benchmark reports min/median/mean/max seconds over --repeat runs (per call for
+the micro ones). With --compare, medians more than --threshold slower are flagged
+and the exit status is 1.
+"""
+from __future__ import annotations
+import argparse, glob, json, os, platform, statistics, subprocess, sys, time
+from datetime import datetime, timezone
+
+import bench.tmpenv
+os.environ["FPL_EO_LEAGUE"] = ""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from bench.synthetic import SyntheticSeason, N_GWS
+from bench.offline import install
+from bench.stub_llm import StubLLM
+from fpl.kb import build_full_kb
+from fpl.ai_manager import decision
+from fpl.ai_manager.persist_db import init_db, save_state, append_gw_log
+from fpl.ai_manager.transfers import TransferSearch
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+ALL_CHIPS = {"TC": True, "BB": True, "FH": True, "WC1": True, "WC2": True}
+
+
+def _stats(samples: list[float], per: int = 1) -> dict:
+    s = [x / per for x in samples]
+    return {"n": len(s), "per_call": per > 1, "min": min(s), "median": statistics.median(s),
+            "mean": statistics.fmean(s), "max": max(s)}
+
+
+def _time(fn, repeat: int, number: int = 1) -> dict:
+    """Run `fn` `number` times per sample, `repeat` samples; seconds per call."""
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        out.append(time.perf_counter() - t0)
+    return _stats(out, per=number)
+
+
+def _state(squad: list[int], last_gw: int) -> dict:
+    return {"squad": squad, "bank": 5.0, "free_transfers": 1, "last_gw_processed": last_gw,
+            "last_ft_accrual_gw": 0, "chips": dict(ALL_CHIPS), "log": []}
+
+
+class Ctx:
+    """Shared fixtures: one season at GW38 (37 finished GWs of history) and its KB."""
+
+    def __init__(self, seed: int):
+        self.season = SyntheticSeason(seed=seed, current_gw=N_GWS)
+        install(self.season)
+        init_db()
+        self.full_kb, self.kb_meta, self.players_df, _ = build_full_kb(include_history=False)
+        self.stub = StubLLM(self.players_df)
+        decision._llm = lambda model_name: self.stub
+        self.squad = decision._json_from_text(self.stub.invoke([{"content": "draft"}]).content)["squad_ids"]
+        st.session_state.openai_key = "stub"
+        st.session_state.full_kb = self.full_kb
+        self.runs = 0
+
+    def user(self, prefix: str) -> str:
+        self.runs += 1
+        return f"{prefix}-{self.runs}"
+
+
+# ---------- benchmarks: name -> fn(ctx, repeat) -> dict ----------
+def bench_kb_no_history(ctx: Ctx, repeat: int) -> dict:
+    return _time(lambda: build_full_kb(include_history=False), repeat)
+
+
+def bench_kb_history(ctx: Ctx, repeat: int) -> dict:
+    build_full_kb(include_history=True, last_n=5)   # warm the synthetic history payloads
+    return _time(lambda: build_full_kb(include_history=True, last_n=5), repeat)
+
+
+def bench_validate_initial(ctx: Ctx, repeat: int) -> dict:
+    return _time(lambda: decision._validate_initial(ctx.players_df, ctx.squad), repeat, number=200)
+
+
+def bench_validate_lineup(ctx: Ctx, repeat: int) -> dict:
+    pos = ctx.players_df.set_index("id").loc[ctx.squad, "pos"]
+    xi = [p for p in ctx.squad if pos[p] == "GK"][:1] + [p for p in ctx.squad if pos[p] == "DEF"][:4] \
+        + [p for p in ctx.squad if pos[p] == "MID"][:4] + [p for p in ctx.squad if pos[p] == "FWD"][:2]
+    bench = [p for p in ctx.squad if p not in xi]
+    return _time(lambda: decision._validate_lineup(ctx.players_df, ctx.squad, xi, bench), repeat, number=200)
+
+
+def bench_transfer_shortlist(ctx: Ctx, repeat: int) -> dict:
+    """TransferSearch build + shortlist for one squad (what the AI loop runs each GW)."""
+    return _time(lambda: TransferSearch(ctx.players_df, ctx.squad, 5.0, 1).shortlist(), repeat, number=20)
+
+
+def bench_transfer_is_legal(ctx: Ctx, repeat: int) -> dict:
+    """is_legal on a move the shortlist did not offer (the direct rules path)."""
+    df = ctx.players_df
+    out_id = ctx.squad[5]
+    pos = df.loc[df["id"] == out_id, "pos"].iloc[0]
+    in_id = int(df[(df["pos"] == pos) & ~df["id"].isin(ctx.squad)].sort_values("price")["id"].iloc[0])
+    search = TransferSearch(df, ctx.squad, 5.0, 1)
+    return _time(lambda: search.is_legal([out_id], [in_id]), repeat, number=200)
+
+
+def _catchup(ctx: Ctx, uid: str) -> dict:
+    st.session_state.auto_mgr = _state(ctx.squad, 0)
+    return decision.run_ai_auto_until_current(user_id=uid, kb_meta=ctx.kb_meta, players_df=ctx.players_df,
+                                              model_name="stub")
+
+
+def bench_catchup_38(ctx: Ctx, repeat: int) -> dict:
+    """run_ai_auto_until_current from GW1 to GW38 (stub LLM, no latency)."""
+    stages = []
+
+    def run():
+        stages.append(_catchup(ctx, ctx.user("catchup")))
+
+    out = _time(run, repeat)
+    out["gws"] = int(stages[-1]["gws"])
+    out["stages_median"] = {k: statistics.median(t[k] for t in stages) for k in stages[-1] if k != "gws"}
+    return out
+
+
+def bench_refresh_points(ctx: Ctx, repeat: int) -> dict:
+    uid = ctx.user("refresh")
+    _catchup(ctx, uid)
+    state = st.session_state.auto_mgr
+
+    def run():
+        for e in state["log"]:
+            e["points"] = -1   # force every GW to be rescored and rewritten
+        decision.refresh_logged_points(uid)
+
+    out = _time(run, repeat)
+    out["gws"] = len(state["log"])
+    return out
+
+
+def bench_db_save_state(ctx: Ctx, repeat: int) -> dict:
+    uid = ctx.user("db")
+    state = _state(ctx.squad, N_GWS)
+    state["log"] = [{"gw": g, "xi_ids": ctx.squad[:11], "reason": "x" * 200} for g in range(1, N_GWS + 1)]
+    return _time(lambda: save_state(uid, state), repeat, number=20)
+
+
+def bench_db_append_log(ctx: Ctx, repeat: int) -> dict:
+    uid = ctx.user("db")
+    entry = {"gw": 1, "xi_ids": ctx.squad[:11], "bench_ids": ctx.squad[11:], "reason": "x" * 200}
+    gws = iter(range(10 ** 9))
+    return _time(lambda: append_gw_log(uid, next(gws) % N_GWS + 1, entry), repeat, number=20)
+
+
+BENCHES = {
+    "kb_build_no_history": bench_kb_no_history,
+    "kb_build_history": bench_kb_history,
+    "validate_initial": bench_validate_initial,
+    "validate_lineup": bench_validate_lineup,
+    "transfer_shortlist": bench_transfer_shortlist,
+    "transfer_is_legal": bench_transfer_is_legal,
+    "catchup_38": bench_catchup_38,
+    "refresh_logged_points": bench_refresh_points,
+    "db_save_state": bench_db_save_state,
+    "db_append_gw_log": bench_db_append_log,
+}
+
+
+# ---------- results ----------
+def _git_commit() -> str:
+    try:
+        root = os.path.dirname(RESULTS_DIR)
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def _environment() -> dict:
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "numpy": np.__version__, "pandas": pd.__version__}
+
+
+def _previous(exclude: str) -> str | None:
+    files = sorted(f for f in glob.glob(os.path.join(RESULTS_DIR, "*.json")) if os.path.abspath(f) != exclude)
+    return files[-1] if files else None
+
+
+def compare(old: dict, new: dict, threshold: float) -> list[str]:
+    """Benchmarks whose median got slower than `threshold` (fraction); prints the table."""
+    slower = []
+    print(f"\n{'benchmark':<24} {'old':>10} {'new':>10} {'change':>8}   (vs {old.get('commit')} {old.get('started')})")
+    for name, r in new["results"].items():
+        o = old.get("results", {}).get(name)
+        if not o:
+            print(f"{name:<24} {'-':>10} {r['median']:>10.5f} {'new':>8}")
+            continue
+        change = r["median"] / o["median"] - 1 if o["median"] else 0.0
+        flag = ""
+        if change > threshold:
+            slower.append(name)
+            flag = "  SLOWER"
+        print(f"{name:<24} {o['median']:>10.5f} {r['median']:>10.5f} {change:>+8.1%}{flag}")
+    return slower
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--only", default="", help="comma-separated benchmark name prefixes")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", default="", help="result file (default: bench/results/<time>-<commit>.json)")
+    ap.add_argument("--compare", default="", help="result file to diff against, or 'previous'")
+    ap.add_argument("--threshold", type=float, default=0.15, help="median slowdown that counts as a regression")
+    args = ap.parse_args(argv)
+
+    names = [n for n in BENCHES if not args.only or any(n.startswith(p.strip()) for p in args.only.split(","))]
+    started = datetime.now(timezone.utc)
+    commit = _git_commit()
+    ctx = Ctx(args.seed)
+
+    results = {}
+    print(f"{'benchmark':<24} {'median s':>10} {'min s':>10} {'max s':>10}")
+    for name in names:
+        # the 38-GW runs are seconds each; keep them to a few samples
+        repeat = min(args.repeat, 3) if name in ("catchup_38", "refresh_logged_points", "kb_build_history") else args.repeat
+        r = BENCHES[name](ctx, repeat)
+        results[name] = r
+        unit = " /call" if r["per_call"] else ""
+        print(f"{name:<24} {r['median']:>10.5f} {r['min']:>10.5f} {r['max']:>10.5f}{unit}")
+
+    doc = {"suite": "fpl-bench", "version": 1, "commit": commit, "started": started.isoformat(timespec="seconds"),
+           "seed": args.seed, "repeat": args.repeat, "env": _environment(), "results": results}
+    out = args.out or os.path.join(RESULTS_DIR, f"{started:%Y%m%d-%H%M%S}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+    print(f"\nwrote {out}")
+
+    if args.compare:
+        path = _previous(os.path.abspath(out)) if args.compare == "previous" else args.compare
+        if not path:
+            print("no earlier result to compare against")
+            return 0
+        with open(path, encoding="utf-8") as f:
+            old = json.load(f)
+        return 1 if compare(old, doc, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
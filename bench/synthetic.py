@@ -0,0 +1,321 @@
+# bench/synthetic.py
+# Deterministic, FPL-shaped payloads for offline runs (no network).
+from __future__ import annotations
+import random
+from datetime import datetime, timedelta, timezone
+
+N_TEAMS = 20
+N_GWS = 38
+TEAM_SHORT = ["ARS","AVL","BOU","BRE","BHA","BUR","CHE","CRY","EVE","FUL",
+              "LEE","LIV","MCI","MUN","NEW","NFO","SUN","TOT","WHU","WOL"]
+# players per team and position (GK, DEF, MID, FWD) → 35 per team, 700 total
+PER_TEAM = {1: 4, 2: 12, 3: 13, 4: 6}
+PRICE_RANGE = {1: (40, 60), 2: (40, 70), 3: (45, 140), 4: (45, 145)}
+SEASON_START = datetime(2025, 8, 15, 19, 0, tzinfo=timezone.utc)
+LEAGUE_PAGE = 50
+LEAGUE_SIZES = {314: 10_000}   # overall league stand-in; other league ids get DEFAULT_LEAGUE_SIZE
+DEFAULT_LEAGUE_SIZE = 2_500
+CHIP_ODDS = [("bboost", 0.03), ("3xc", 0.03), ("freehit", 0.02), ("wildcard", 0.03)]
+
+# bootstrap elements carry ~90 fields upstream; pad with the long tail we never read.
+_FILLER_INT = [
+    "code","team_code","cost_change_event","cost_change_event_fall","cost_change_start",
+    "cost_change_start_fall","dreamteam_count","in_dreamteam","special","squad_number",
+    "transfers_in","transfers_out","value_form","value_season","own_goals","penalties_saved",
+    "penalties_missed","yellow_cards","red_cards","saves","bps","influence_rank",
+    "influence_rank_type","creativity_rank","creativity_rank_type","threat_rank","threat_rank_type",
+    "ict_index_rank","ict_index_rank_type","corners_and_indirect_freekicks_order",
+    "direct_freekicks_order","penalties_order","now_cost_rank","now_cost_rank_type","form_rank",
+    "form_rank_type","points_per_game_rank","points_per_game_rank_type","selected_rank",
+    "selected_rank_type","starts","clearances_blocks_interceptions","recoveries","tackles",
+    "defensive_contribution","region","team_join_date","birth_date","has_temporary_code",
+    "opta_code","removed","can_transact","can_select",
+]
+_FILLER_STR = [
+    "expected_goals","expected_assists","expected_goal_involvements","expected_goals_conceded",
+    "expected_goals_per_90","saves_per_90","expected_assists_per_90",
+    "expected_goal_involvements_per_90","expected_goals_conceded_per_90","goals_conceded_per_90",
+    "starts_per_90","clean_sheets_per_90","defensive_contribution_per_90","photo",
+    "corners_and_indirect_freekicks_text","direct_freekicks_text","penalties_text","news_added",
+]
+
+
+def _kickoff(gw: int, slot: int) -> datetime:
+    return SEASON_START + timedelta(days=7 * (gw - 1), hours=3 * (slot % 4))
+
+
+def _schedule(rng: random.Random) -> list[tuple[int, int, int]]:
+    """Double round robin: 380 (gw, home, away) triples, 10 per GW."""
+    teams = list(range(1, N_TEAMS + 1))
+    rounds = []
+    for r in range(N_TEAMS - 1):
+        pairs = []
+        for i in range(N_TEAMS // 2):
+            a, b = teams[i], teams[-1 - i]
+            pairs.append((a, b) if (r + i) % 2 == 0 else (b, a))
+        rounds.append(pairs)
+        teams = [teams[0]] + [teams[-1]] + teams[1:-1]
+    rng.shuffle(rounds)
+    out = []
+    for gw, pairs in enumerate(rounds, start=1):
+        out += [(gw, h, a) for h, a in pairs]
+    for gw, pairs in enumerate(rounds, start=N_TEAMS):
+        out += [(gw, a, h) for h, a in pairs]
+    return out
+
+
+class SyntheticSeason:
+    """
+    A full synthetic season: 20 teams, 700 players, 380 fixtures, per-player history.
+    `current_gw` is the live GW; GWs before it are finished and carry history rows.
+    """
+
+    def __init__(self, seed: int = 7, current_gw: int = 20):
+        self.seed = int(seed)
+        self.current_gw = int(current_gw)
+        rng = random.Random(self.seed)
+        self.strength = {t: rng.randint(2, 5) for t in range(1, N_TEAMS + 1)}
+        self.fixtures = self._build_fixtures(rng)
+        self.elements = self._build_elements(rng)
+        self._history: dict[int, dict] = {}
+        self._pick_pools: dict[int, tuple[list, list]] = {}
+
+    # ---------- fixtures ----------
+    def _build_fixtures(self, rng: random.Random) -> list[dict]:
+        fx = []
+        for i, (gw, h, a) in enumerate(_schedule(rng), start=1):
+            finished = gw < self.current_gw
+            fx.append({
+                "id": i,
+                "code": 2500000 + i,
+                "event": gw,
+                "team_h": h,
+                "team_a": a,
+                "team_h_difficulty": self.strength[a],
+                "team_a_difficulty": self.strength[h],
+                "kickoff_time": _kickoff(gw, i).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "finished": finished,
+                "finished_provisional": finished,
+                "started": finished,
+                "minutes": 90 if finished else 0,
+                "team_h_score": rng.randint(0, 4) if finished else None,
+                "team_a_score": rng.randint(0, 3) if finished else None,
+                "stats": [],
+            })
+        return fx
+
+    # ---------- players ----------
+    def _build_elements(self, rng: random.Random) -> list[dict]:
+        els = []
+        pid = 0
+        for team in range(1, N_TEAMS + 1):
+            for et, n in PER_TEAM.items():
+                lo, hi = PRICE_RANGE[et]
+                for k in range(n):
+                    pid += 1
+                    starter = k < {1: 1, 2: 5, 3: 5, 4: 2}[et]
+                    cost = rng.randint(lo, hi) if starter else rng.randint(lo, lo + 15)
+                    quality = (cost - lo) / max(1, hi - lo)
+                    form = round(max(0.0, rng.gauss(2.0 + 5.0 * quality, 1.2)), 1) if starter else round(rng.random(), 1)
+                    mins = rng.randint(1200, 1710) if starter else rng.randint(0, 400)
+                    tot = int(mins / 90 * (2.0 + 4.0 * quality) + rng.randint(0, 10))
+                    status = rng.choices("adisu", weights=[88, 5, 4, 2, 1])[0]
+                    chance = None if status == "a" else rng.choice([0, 25, 50, 75])
+                    el = {
+                        "id": pid,
+                        "web_name": f"{TEAM_SHORT[team - 1].title()}{et}{k:02d}",
+                        "first_name": f"First{pid}",
+                        "second_name": f"Second{pid}",
+                        "team": team,
+                        "element_type": et,
+                        "now_cost": cost,
+                        "status": status,
+                        "news": "" if status == "a" else f"Knock - {chance}% chance of playing",
+                        "chance_of_playing_next_round": chance,
+                        "chance_of_playing_this_round": chance,
+                        "form": f"{form:.1f}",
+                        "points_per_game": f"{tot / max(1, self.current_gw - 1):.1f}",
+                        "ep_next": f"{form:.1f}",
+                        "ep_this": f"{form:.1f}",
+                        "selected_by_percent": f"{min(80.0, max(0.1, rng.expovariate(1 / (3 + 25 * quality ** 2)))):.1f}",
+                        "total_points": tot,
+                        "event_points": rng.randint(0, 12) if starter else 0,
+                        "minutes": mins,
+                        "goals_scored": int(mins / 90 * quality * (0.1 if et == 2 else 0.5 if et == 3 else 0.7)),
+                        "assists": int(mins / 90 * quality * 0.3),
+                        "clean_sheets": int(mins / 90 * 0.3) if et <= 2 else int(mins / 90 * 0.25),
+                        "goals_conceded": int(mins / 90 * 1.2),
+                        "bonus": rng.randint(0, 15) if starter else 0,
+                        "influence": f"{mins / 90 * (10 + 20 * quality):.1f}",
+                        "creativity": f"{mins / 90 * (5 + 25 * quality):.1f}",
+                        "threat": f"{mins / 90 * (3 + 30 * quality):.1f}",
+                        "ict_index": f"{mins / 90 * (2 + 7 * quality):.1f}",
+                        "transfers_in_event": rng.randint(0, 200000),
+                        "transfers_out_event": rng.randint(0, 200000),
+                    }
+                    for f in _FILLER_INT:
+                        el[f] = rng.randint(0, 500)
+                    for f in _FILLER_STR:
+                        el[f] = f"{rng.random() * 5:.2f}"
+                    els.append(el)
+        return els
+
+    # ---------- payloads ----------
+    def bootstrap(self) -> dict:
+        events = []
+        for gw in range(1, N_GWS + 1):
+            events.append({
+                "id": gw,
+                "name": f"Gameweek {gw}",
+                "deadline_time": (_kickoff(gw, 0) - timedelta(hours=2)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "finished": gw < self.current_gw,
+                "data_checked": gw < self.current_gw,
+                "is_previous": gw == self.current_gw - 1,
+                "is_current": gw == self.current_gw,
+                "is_next": gw == self.current_gw + 1,
+                "average_entry_score": 50 if gw < self.current_gw else 0,
+            })
+        teams = [{
+            "id": t,
+            "code": 100 + t,
+            "name": f"Team {TEAM_SHORT[t - 1]}",
+            "short_name": TEAM_SHORT[t - 1],
+            "strength": self.strength[t],
+            "strength_overall_home": 1000 + 50 * self.strength[t],
+            "strength_overall_away": 1000 + 50 * self.strength[t],
+        } for t in range(1, N_TEAMS + 1)]
+        element_types = [
+            {"id": 1, "singular_name_short": "GKP", "squad_select": 2},
+            {"id": 2, "singular_name_short": "DEF", "squad_select": 5},
+            {"id": 3, "singular_name_short": "MID", "squad_select": 5},
+            {"id": 4, "singular_name_short": "FWD", "squad_select": 3},
+        ]
+        return {
+            "events": events,
+            "teams": teams,
+            "elements": [dict(e) for e in self.elements],
+            "element_types": element_types,
+            "total_players": 11000000,
+        }
+
+    def fixtures_payload(self) -> list[dict]:
+        return [dict(f) for f in self.fixtures]
+
+    def league_standings(self, league_id: int, page: int = 1) -> dict:
+        """Classic-league standings page (50 rows, `has_next` paging) like /leagues-classic/{id}/standings/."""
+        size = LEAGUE_SIZES.get(int(league_id), DEFAULT_LEAGUE_SIZE)
+        lo, hi = (int(page) - 1) * LEAGUE_PAGE, min(size, int(page) * LEAGUE_PAGE)
+        results = [{
+            "id": int(league_id) * 100_000 + rank,
+            "entry": int(league_id) * 100_000 + rank,
+            "entry_name": f"Team {rank}",
+            "player_name": f"Manager {rank}",
+            "rank": rank,
+            "last_rank": rank,
+            "rank_sort": rank,
+            "total": 1500 - rank // 10,
+            "event_total": 60,
+        } for rank in range(lo + 1, hi + 1)]
+        return {
+            "league": {"id": int(league_id), "name": f"League {league_id}"},
+            "standings": {"has_next": hi < size, "page": int(page), "results": results},
+        }
+
+    def entry_picks(self, entry_id: int, gw: int) -> dict:
+        """15 picks drawn by ownership (captain by form), like /entry/{id}/event/{gw}/picks/."""
+        rng = random.Random(self.seed * 7_919 + int(entry_id) * 97 + int(gw))
+        chip = None
+        roll = rng.random()
+        for name, p in CHIP_ODDS:
+            if roll < p:
+                chip = name
+                break
+            roll -= p
+        if not self._pick_pools:
+            for et in (1, 2, 3, 4):
+                pool = [e for e in self.elements if e["element_type"] == et]
+                self._pick_pools[et] = (pool, [float(e["selected_by_percent"]) + 0.1 for e in pool])
+        picks = []
+        for et, (n, n_xi) in {1: (2, 1), 2: (5, 4), 3: (5, 4), 4: (3, 2)}.items():
+            pool, weights = self._pick_pools[et]
+            chosen = []
+            while len(chosen) < n:
+                e = rng.choices(pool, weights)[0]
+                if e not in chosen:
+                    chosen.append(e)
+            picks += [(e, i < n_xi) for i, e in enumerate(chosen)]
+        xi = [e for e, starts in picks if starts]
+        cap = max(xi, key=lambda e: float(e["form"]) + rng.random() * 3)
+        vice = max((e for e in xi if e is not cap), key=lambda e: float(e["form"]))
+        order = [e for e, s in picks if s] + [e for e, s in picks if not s]
+        out = []
+        for pos, e in enumerate(order, start=1):
+            mult = 1 if pos <= 11 else (1 if chip == "bboost" else 0)
+            if e is cap:
+                mult = 3 if chip == "3xc" else 2
+            out.append({"element": e["id"], "position": pos, "multiplier": mult,
+                        "is_captain": e is cap, "is_vice_captain": e is vice})
+        return {"active_chip": chip, "automatic_subs": [],
+                "entry_history": {"event": int(gw), "points": 50}, "picks": out}
+
+    def player_history(self, pid: int) -> dict:
+        pid = int(pid)
+        if pid not in self._history:
+            self._history[pid] = self._build_history(pid)
+        return self._history[pid]
+
+    def _build_history(self, pid: int) -> dict:
+        el = self.elements[pid - 1]
+        rng = random.Random(self.seed * 100003 + pid)
+        team, et = el["team"], el["element_type"]
+        starter_p = min(0.95, el["minutes"] / (90.0 * max(1, self.current_gw - 1)))
+        quality = el["total_points"] / max(1.0, el["minutes"] / 90.0) / 6.0
+        hist, upcoming = [], []
+        for f in self.fixtures:
+            if team not in (f["team_h"], f["team_a"]):
+                continue
+            home = f["team_h"] == team
+            if not f["finished"]:
+                upcoming.append({
+                    "id": f["id"], "event": f["event"], "team_h": f["team_h"], "team_a": f["team_a"],
+                    "is_home": home, "difficulty": f["team_h_difficulty"] if home else f["team_a_difficulty"],
+                    "kickoff_time": f["kickoff_time"],
+                })
+                continue
+            plays = rng.random() < starter_p
+            mins = rng.choice([90, 90, 90, 85, 75, 62]) if plays else rng.choice([0, 0, 0, 12, 25])
+            goals = sum(rng.random() < quality * {1: 0.0, 2: 0.05, 3: 0.2, 4: 0.35}[et] for _ in range(2)) if mins else 0
+            assists = int(rng.random() < quality * 0.2) if mins else 0
+            conceded = f["team_a_score"] if home else f["team_h_score"]
+            cs = int(mins >= 60 and conceded == 0)
+            bonus = rng.choice([0, 0, 0, 0, 1, 2, 3]) if mins >= 60 else 0
+            pts = (0 if mins == 0 else 2 if mins >= 60 else 1)
+            pts += goals * {1: 6, 2: 6, 3: 5, 4: 4}[et] + assists * 3 + bonus
+            pts += cs * {1: 4, 2: 4, 3: 1, 4: 0}[et]
+            hist.append({
+                "element": pid,
+                "fixture": f["id"],
+                "opponent_team": f["team_a"] if home else f["team_h"],
+                "total_points": int(pts),
+                "was_home": home,
+                "kickoff_time": f["kickoff_time"],
+                "team_h_score": f["team_h_score"],
+                "team_a_score": f["team_a_score"],
+                "round": f["event"],
+                "minutes": mins,
+                "goals_scored": int(goals),
+                "assists": assists,
+                "clean_sheets": cs,
+                "goals_conceded": int(conceded) if mins else 0,
+                "bonus": bonus,
+                "bps": bonus * 8 + rng.randint(0, 20),
+                "influence": f"{rng.random() * 40:.1f}",
+                "creativity": f"{rng.random() * 40:.1f}",
+                "threat": f"{rng.random() * 40:.1f}",
+                "ict_index": f"{rng.random() * 12:.1f}",
+                "value": el["now_cost"],
+                "selected": rng.randint(1000, 5000000),
+                "transfers_in": rng.randint(0, 100000),
+                "transfers_out": rng.randint(0, 100000),
+            })
+        return {"history": hist, "fixtures": upcoming, "history_past": []}
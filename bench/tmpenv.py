@@ -0,0 +1,14 @@
+# bench/tmpenv.py
+"""
+Throwaway database and trend dir for a bench: import this before anything from fpl
+or config, and DATABASE_URL / FPL_TRENDS_DIR point into a fresh temp dir, so the
+bench never touches data/. Child processes (spawned workers, a service under load)
+inherit the same dir through FPL_BENCH_DIR.
+"""
+import os, tempfile
+
+if "FPL_BENCH_DIR" not in os.environ:
+    os.environ["FPL_BENCH_DIR"] = tempfile.mkdtemp(prefix="fpl-bench-")
+DIR = os.environ["FPL_BENCH_DIR"]
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(DIR, "bench.db")
+os.environ["FPL_TRENDS_DIR"] = os.path.join(DIR, "trends")
@@ -0,0 +1,70 @@
+# bench/wildcard.py
+"""
+Full-squad optimizer (fpl.ai_manager.wildcard.best_squad) against the planner's greedy
+squad on the synthetic player pool: solve time and projected points, FH and WC objectives.
+
+    python -m bench.wildcard --budgets 900 1000 1050 --hot-clubs 0 1 2 3
+
+--hot-clubs scales the projections of that many clubs by --hot-boost, which pushes
+more of the unconstrained best squad into a few clubs (the club cap then binds hard).
+Uses a throwaway trend dir; never touches data/.
+"""
+from __future__ import annotations
+import argparse, os, statistics, sys, tempfile, time
+import numpy as np
+
+os.environ["FPL_TRENDS_DIR"] = os.path.join(tempfile.mkdtemp(prefix="fpl-wildcard-"), "trends")
+
+from bench.synthetic import SyntheticSeason
+from bench.offline import install
+from fpl.kb import build_full_kb
+from fpl.ai_manager.planner import greedy_squad
+from fpl.ai_manager.transfers import TransferSearch
+from fpl.ai_manager.wildcard import best_squad, squad_value
+
+
+def _timed(fn, reps: int):
+    samples, out = [], None
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        out = fn()
+        samples.append(time.perf_counter() - t0)
+    return out, statistics.median(samples)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--current-gw", type=int, default=20)
+    ap.add_argument("--budgets", type=int, nargs="+", default=[900, 1000, 1050], help="tenths of £m")
+    ap.add_argument("--hot-clubs", type=int, nargs="+", default=[0, 1, 2, 3])
+    ap.add_argument("--hot-boost", type=float, default=1.6)
+    ap.add_argument("--reps", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    install(SyntheticSeason(current_gw=args.current_gw))
+    players_df = build_full_kb(include_history=False)[2]
+    search = TransferSearch(players_df, [], 0.0, 1)
+    pos = players_df["pos"].astype(str).to_numpy()
+    clubs = players_df["team_short"].value_counts().index[:max(args.hot_clubs)]
+    print(f"{len(players_df)} players\n")
+    print(f"{'objective':<10} {'hot':>3} {'budget':>6} {'greedy xP':>9} {'exact xP':>9} {'gain':>6} "
+          f"{'greedy ms':>9} {'exact ms':>8} {'nodes':>5} {'exact':>5}")
+    worst = 0.0
+    for col in ("xp_next", "xp_horizon"):
+        for hot in args.hot_clubs:
+            df = players_df.copy()
+            df.loc[df["team_short"].isin(clubs[:hot]), col] *= args.hot_boost
+            score = df[col].to_numpy(dtype=np.float64)
+            for budget in args.budgets:
+                rows, g_s = _timed(lambda: greedy_squad(score, pos, search.cost, search.club, budget), args.reps)
+                pick, e_s = _timed(lambda: best_squad(df, col, budget), args.reps)
+                g_val = squad_value(df, search.ids[rows].tolist(), col) if rows is not None else float("nan")
+                worst = max(worst, e_s)
+                print(f"{col:<10} {hot:>3} {budget:>6} {g_val:>9.1f} {pick.value:>9.1f} {pick.value - g_val:>+6.1f} "
+                      f"{g_s * 1000:>9.1f} {e_s * 1000:>8.1f} {pick.nodes:>5} {str(pick.exact):>5}")
+    print(f"\nslowest exact solve: {worst * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
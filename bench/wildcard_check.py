@@ -0,0 +1,104 @@
+# bench/wildcard_check.py
+"""
+wildcard.best_squad against brute force on small random pools: same objective value,
+and the pick is legal (shape, budget, club cap, locks, bans). Exits 1 on any mismatch.
+
+    python -m bench.wildcard_check --trials 400
+
+Each pool has 3 GK, 6-7 DEF, 6-7 MID and 4-5 FWD over 5-8 clubs, a budget of
+£85-115m, up to 2 locks and 2 bans, and a random bench weight. Brute force enumerates
+every squad of the right shape and scores its best formation.
+"""
+from __future__ import annotations
+import argparse, itertools, random, sys, time
+import numpy as np
+import pandas as pd
+
+from fpl.ai_manager.core import SQUAD_SHAPE, MAX_PER_CLUB, VALID_FORMATIONS
+from fpl.ai_manager.wildcard import best_squad
+
+
+def random_pool(rng: random.Random) -> tuple[pd.DataFrame, int, list[int], list[int], float]:
+    counts = {"GK": 3, "DEF": rng.choice([6, 7]), "MID": rng.choice([6, 7]), "FWD": rng.choice([4, 5])}
+    clubs = rng.choice([5, 6, 8])
+    rows, pid = [], 1
+    for pos, n in counts.items():
+        for _ in range(n):
+            rows.append({"id": pid, "pos": pos, "price": rng.randint(40, 120) / 10,
+                         "team_short": f"C{rng.randrange(clubs)}", "score": rng.randint(0, 40) / 4})
+            pid += 1
+    df = pd.DataFrame(rows)
+    lock = rng.sample(list(df["id"]), rng.choice([0, 0, 1, 2]))
+    ban = rng.sample([p for p in df["id"] if p not in lock], rng.choice([0, 1, 2]))
+    return df, rng.randint(850, 1150), lock, ban, rng.choice([0.0, 0.1, 0.3, 1.0])
+
+
+def brute_force(df: pd.DataFrame, budget10: int, lock, ban, bench_weight: float) -> float | None:
+    """Best objective over every legal squad (vectorized over the product of per-position combinations)."""
+    ids = df["id"].to_numpy()
+    cost = np.rint(df["price"].to_numpy() * 10).astype(np.int64)
+    club = df["team_short"].astype("category").cat.codes.to_numpy()
+    score = df["score"].to_numpy(dtype=np.float64)
+    parts = []
+    for pos, n in SQUAD_SHAPE.items():
+        rows = [r for r in np.flatnonzero(df["pos"].to_numpy() == pos) if ids[r] not in ban]
+        parts.append(np.array(list(itertools.combinations(rows, n)), dtype=np.int64).reshape(-1, n))
+    grid = np.meshgrid(*[np.arange(len(p)) for p in parts], indexing="ij")
+    sel = np.concatenate([p[g.ravel()] for p, g in zip(parts, grid)], axis=1)
+    per_club = np.zeros((len(sel), int(club.max()) + 1), dtype=np.int64)
+    for j in range(sel.shape[1]):
+        np.add.at(per_club, (np.arange(len(sel)), club[sel[:, j]]), 1)
+    ok = (cost[sel].sum(axis=1) <= budget10) & (per_club.max(axis=1) <= MAX_PER_CLUB)
+    for p in lock:
+        ok &= (ids[sel] == p).any(axis=1)
+    if not ok.any():
+        return None
+    sel = sel[ok]
+    by_pos, o = [], 0
+    for n in SQUAD_SHAPE.values():
+        by_pos.append(-np.sort(-score[sel[:, o:o + n]], axis=1))
+        o += n
+    total = score[sel].sum(axis=1)
+    best = np.full(len(sel), -np.inf)
+    for d, m, f in VALID_FORMATIONS:
+        xi = by_pos[0][:, 0] + by_pos[1][:, :d].sum(1) + by_pos[2][:, :m].sum(1) + by_pos[3][:, :f].sum(1)
+        best = np.maximum(best, xi + bench_weight * (total - xi))
+    return float(best.max())
+
+
+def legal(df: pd.DataFrame, pick, budget10: int, lock, ban) -> bool:
+    sq = df[df["id"].isin(pick.ids)]
+    return (len(sq) == sum(SQUAD_SHAPE.values()) and round(sq["price"].sum() * 10) <= budget10
+            and sq["team_short"].value_counts().max() <= MAX_PER_CLUB and set(lock) <= set(pick.ids)
+            and not set(ban) & set(pick.ids) and sq["pos"].value_counts().to_dict() == SQUAD_SHAPE)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--trials", type=int, default=400)
+    ap.add_argument("--seed", type=int, default=0, help="first trial's seed (trial i uses seed + i)")
+    args = ap.parse_args(argv)
+
+    bad, t_exact, t_brute = 0, 0.0, 0.0
+    for trial in range(args.seed, args.seed + args.trials):
+        df, budget10, lock, ban, w = random_pool(random.Random(trial))
+        t0 = time.perf_counter()
+        want = brute_force(df, budget10, lock, ban, w)
+        t1 = time.perf_counter()
+        pick = best_squad(df, "score", budget10, lock=lock, ban=ban, bench_weight=w)
+        t_brute, t_exact = t_brute + t1 - t0, t_exact + time.perf_counter() - t1
+        if want is None or pick is None:
+            good = want is None and pick is None
+        else:
+            good = abs(want - pick.value) < 1e-6 and pick.exact and legal(df, pick, budget10, lock, ban)
+        if not good:
+            bad += 1
+            print(f"MISMATCH seed={trial}: brute force {want}, best_squad "
+                  f"{pick and (round(pick.value, 6), pick.nodes, pick.exact)}")
+    print(f"{args.trials} trials, {bad} mismatches; best_squad {t_exact * 1000 / args.trials:.1f} ms/trial, "
+          f"brute force {t_brute * 1000 / args.trials:.1f} ms/trial")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
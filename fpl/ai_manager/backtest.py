@@ -0,0 +1,214 @@
+# fpl/ai_manager/backtest.py
+# Point-in-time season backtests. Each GW's decision sees only the newest snapshot
+# (fpl/transport.py) captured before that GW's deadline; points come from the
+# end-of-season snapshot. Configurations run in parallel across a process pool.
+from __future__ import annotations
+import hashlib, importlib, json, multiprocessing as mp, os, shutil, tempfile, time, traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from types import SimpleNamespace
+import pandas as pd
+
+import fpl.api as api
+from fpl.transport import SnapshotStore, ReplayTransport
+from fpl.snapshot import build_snapshot
+from fpl.trends import TrendStore, set_store
+from fpl.ai_manager import decision
+from fpl.ai_manager.decision import session_scope, ensure_initial_squad_with_ai, run_ai_auto_until_current
+
+# strategy name -> extra instructions handed to every weekly decision
+STRATEGIES = {
+    "default": None,
+    "hold": "Roll transfers unless a starter is injured or suspended; never take a points hit.",
+    "aggressive": "Use the free transfer every week, and take a -4 hit when the move gains 6+ projected points "
+                  "over the horizon.",
+    "differential": "When projections are close, prefer players owned by under 10% of managers.",
+}
+
+
+def _ts(iso: str | None) -> float:
+    return datetime.fromisoformat(iso.replace("Z", "+00:00")).timestamp() if iso else 0.0
+
+
+class SeasonTimeline:
+    """Which snapshot each GW's decision may see, and the final snapshot it is scored against."""
+
+    def __init__(self, store: SnapshotStore, final_tag: str | None = None):
+        self.store = store
+        tags = store.tags()
+        if not tags:
+            raise FileNotFoundError(f"no snapshots under {store.root}")
+        self.final = final_tag or tags[0]["tag"]
+        self.final_replay = ReplayTransport(store, self.final)
+        boot = self.final_replay.get("", "bootstrap-static/", 0).json()
+        self.deadlines = {int(e["id"]): _ts(e["deadline_time"]) for e in boot.get("events", [])}
+        # a snapshot counts from when its capture finished
+        captures = []
+        for t in tags:
+            if t["tag"] == self.final:
+                continue
+            man = store.load_manifest(t["tag"])
+            captures.append((_ts(man.get("finished") or man.get("created")), t["tag"]))
+        self.captures = sorted(captures)
+        self.captured_at = {tag: at for at, tag in captures}
+
+    def tag_for(self, gw: int) -> str | None:
+        deadline = self.deadlines.get(int(gw))
+        if deadline is None:
+            return None
+        before = [tag for at, tag in self.captures if at < deadline]
+        return before[-1] if before else None
+
+    def first_gw(self) -> int | None:
+        return next((gw for gw in sorted(self.deadlines) if self.tag_for(gw)), None)
+
+    def history(self, pid: int) -> dict:
+        """End-of-season element-summary (what _event_points scores with)."""
+        r = self.final_replay.get("", f"element-summary/{int(pid)}/", 0)
+        return r.json() if r.status_code == 200 else {}
+
+
+class CachedLLM:
+    """Disk cache in front of an LLM: the same model/seed/prompt replays the stored reply."""
+
+    def __init__(self, inner, cache_dir: str, key: str):
+        self.inner, self.cache_dir, self.key = inner, cache_dir, key
+        self.hits = 0
+        self.misses = 0
+
+    def invoke(self, messages):
+        h = hashlib.sha256(json.dumps([self.key, messages], sort_keys=True).encode("utf-8")).hexdigest()
+        path = os.path.join(self.cache_dir, h[:2], f"{h}.json")
+        if os.path.exists(path):
+            self.hits += 1
+            with open(path, encoding="utf-8") as f:
+                return SimpleNamespace(content=json.load(f)["content"], usage_metadata=None)
+        self.misses += 1
+        resp = self.inner.invoke(messages)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"content": resp.content}, f)
+        os.replace(tmp, path)
+        return resp
+
+
+class _Meter:
+    def __init__(self, inner):
+        self.inner = inner
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return self.inner.invoke(messages)
+
+
+def _llm_factory(spec: str, model: str, seed: int, cache_dir: str):
+    """
+    "live" (ChatOpenAI, OPENAI_API_KEY), "cached" (live behind CachedLLM), or
+    "package.module:Factory" called with each GW's players_df (e.g. bench.stub_llm:StubLLM).
+    """
+    live_llm = decision._llm
+    if spec == "live":
+        return lambda players_df: live_llm(model)
+    if spec == "cached":
+        return lambda players_df: CachedLLM(live_llm(model), cache_dir, f"{model}:{seed}")
+    mod, _, name = spec.partition(":")
+    factory = getattr(importlib.import_module(mod), name)
+    return lambda players_df: factory(players_df)
+
+
+def _chips(log: list[dict]) -> dict[str, int]:
+    return {e["chip"]: int(e["gw"]) for e in log if e.get("chip") not in (None, "NONE")}
+
+
+def run_config(cfg: dict, snapshot_dir: str, final_tag: str | None = None, start_gw: int | None = None,
+               end_gw: int | None = None, include_history: bool = True, cache_dir: str = "data/llm_cache") -> dict:
+    """One configuration GW by GW; returns its summary row (error text instead of raising)."""
+    name = cfg.get("name") or f"{cfg.get('strategy', 'default')}/{cfg.get('model')}/{cfg.get('seed', 0)}"
+    model, seed, strategy = cfg.get("model", "gpt-5-mini"), int(cfg.get("seed", 0)), cfg.get("strategy", "default")
+    instructions = cfg.get("instructions", STRATEGIES.get(strategy))
+    row = {"name": name, "strategy": strategy, "model": model, "seed": seed, "llm": cfg.get("llm", "cached"),
+           "points": 0, "gws": 0, "failed_gws": 0, "hits": 0, "transfers": 0, "solver_lineups": 0,
+           "chips": {}, "llm_calls": 0, "wall_s": 0.0, "kb_s": 0.0, "error": None}
+    t_wall = time.perf_counter()
+    # Own trend store, stamped with each snapshot's capture time: the shared one holds
+    # wall-clock rows (and other configs' GWs) that a point-in-time decision must not see.
+    trends_root = tempfile.mkdtemp(prefix="fpl-backtest-trends-")
+    trends = TrendStore(trends_root)
+    prev_store = set_store(trends)
+    try:
+        store = SnapshotStore(snapshot_dir)
+        timeline = SeasonTimeline(store, final_tag)
+        decision._points_history = timeline.history
+        make_llm = _llm_factory(row["llm"], model, seed, cache_dir)
+        meter = None
+        decision._llm = lambda model_name: meter
+
+        uid = f"backtest:{name}:{os.getpid()}:{int(time.time())}"
+        state = None
+        first = start_gw or timeline.first_gw()
+        last = end_gw or max(timeline.deadlines)
+        for gw in range(int(first), int(last) + 1):
+            tag = timeline.tag_for(gw)
+            if tag is None:
+                row["failed_gws"] += 1
+                continue
+            t0 = time.perf_counter()
+            api.set_transport(ReplayTransport(store, tag))
+            trends.clock = lambda at=timeline.captured_at[tag]: at
+            snap = build_snapshot(include_history=include_history)
+            row["kb_s"] += time.perf_counter() - t0
+            meter = _Meter(make_llm(snap.players_df))
+            values = snap.session_values(os.getenv("OPENAI_API_KEY") or "backtest", state)
+            if state is None:
+                values.pop("auto_mgr")
+            with session_scope(values) as s:
+                if state is None:
+                    ensure_initial_squad_with_ai(uid, snap.players_df, snap.full_kb, model)
+                    state = s.auto_mgr
+                    if not state.get("squad"):
+                        raise RuntimeError(f"draft failed: {state.get('seed_origin')}")
+                run_ai_auto_until_current(uid, dict(snap.kb_meta, gw=gw), snap.players_df, model,
+                                          extra_instructions=instructions, pipelined=False, seed=seed)
+            row["llm_calls"] += meter.calls
+            if int(state.get("last_gw_processed") or 0) < gw:
+                # no decision for this GW: keep it out of later GWs' point-in-time window
+                row["failed_gws"] += 1
+                state["last_gw_processed"] = gw
+
+        log = state["log"] if state else []
+        row["gws"] = len(log)
+        row["points"] = sum(int(e.get("points") or 0) for e in log)
+        row["hits"] = sum(int(e.get("hit") or 0) for e in log)
+        row["transfers"] = sum(len(e.get("moves") or []) for e in log)
+        row["solver_lineups"] = sum(str((e.get("lineup_check") or {}).get("source", "")).startswith("solver")
+                                    for e in log)
+        row["chips"] = _chips(log)
+    except Exception:
+        row["error"] = traceback.format_exc(limit=5)
+    finally:
+        set_store(prev_store)
+        shutil.rmtree(trends_root, ignore_errors=True)
+    row["wall_s"] = round(time.perf_counter() - t_wall, 2)
+    row["kb_s"] = round(row["kb_s"], 2)
+    return row
+
+
+def grid(strategies: list[str], models: list[str], seeds: list[int], llm: str) -> list[dict]:
+    return [{"strategy": s, "model": m, "seed": seed, "llm": llm} for s in strategies for m in models for seed in seeds]
+
+
+def run_backtests(configs: list[dict], snapshot_dir: str, processes: int = 2, **kw) -> pd.DataFrame:
+    """All configurations across a process pool; one row each, best total first."""
+    rows = []
+    if processes <= 1:
+        rows = [run_config(cfg, snapshot_dir, **kw) for cfg in configs]
+    else:
+        ctx = mp.get_context("spawn")   # fresh interpreters: no forked Streamlit/DB/thread state
+        with ProcessPoolExecutor(max_workers=processes, mp_context=ctx) as pool:
+            futures = [pool.submit(run_config, cfg, snapshot_dir, **kw) for cfg in configs]
+            rows = [f.result() for f in as_completed(futures)]
+    df = pd.DataFrame(rows)
+    df["chips"] = df["chips"].map(lambda c: " ".join(f"{k}@{v}" for k, v in sorted(c.items(), key=lambda kv: kv[1])))
+    return df.sort_values(["points", "name"], ascending=[False, True], ignore_index=True)
@@ -2,11 +2,83 @@
 import streamlit as st
 import pandas as pd
 from langchain_openai import ChatOpenAI
-from fpl.api import fetch_player_history
+from fpl import metrics
+from fpl.api import fetch_fixtures, fetch_player_history
 from fpl.ai_manager.core import SQUAD_SHAPE, MAX_PER_CLUB, VALID_FORMATIONS
-from fpl.ai_manager.persist_db import save_state, append_gw_log
+from fpl.ai_manager.persist_db import (save_state, append_gw_log, load_state, claim_user_job, release_user_job,
+                                      JobHeartbeat, JOB_LEASE_SECS)
+from fpl.ai_manager.transfers import TransferSearch, format_shortlist
+from fpl.ai_manager.lineup import solve_lineup, squad_scores, lineup_score
+from fpl.ai_manager.planner import plan_season
+from fpl.ai_manager.wildcard import SQUAD_CHIPS, chip_request, chip_squad, squad_budget10
+from fpl.ai_manager import routing
+from fpl.simulate import GwSimulator, SIM_RUNS
+
+import re, json, copy, time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+CHIP_MIN_GAIN = 4.0   # xP a planned FH/WC squad must add over the current 15 (asked-for chips always play)
+UNDO_KEYS = ("squad", "bank", "free_transfers", "chips", "purchase_prices")   # what a GW's decision can change
+
+# ---------- session ----------
+# Streamlit's session_state by default. The API service (server.py) binds a plain
+# per-request Session instead, so the same orchestration runs outside a script run.
+class Session(dict):
+    """dict with attribute access, like st.session_state."""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+_SESSION: ContextVar[Session | None] = ContextVar("fpl_session", default=None)
+
+
+def _session():
+    s = _SESSION.get()
+    return st.session_state if s is None else s
+
+
+@contextmanager
+def session_scope(values: dict):
+    """Run decision calls against `values` instead of st.session_state (this thread/task only)."""
+    s = Session(values)
+    token = _SESSION.set(s)
+    try:
+        yield s
+    finally:
+        _SESSION.reset(token)
+
+
+@contextmanager
+def user_run_lease(user_id: str, holder: str, lease_secs: float = JOB_LEASE_SECS):
+    """
+    Hold the user's job lease around a run outside worker.py (app buttons, the API), so it
+    never overlaps a worker or another caller. Yields the heartbeat (pass `hb.alive` as
+    keep_going) after reloading the saved state into the session, or None while busy.
+    """
+    job = claim_user_job(user_id, holder, lease_secs)
+    if job is None:
+        yield None
+        return
+    hb = JobHeartbeat(job["id"], job["lease_token"], lease_secs)
+    hb.start()
+    try:
+        saved = load_state(user_id)   # a worker may have advanced it since the session loaded it
+        if saved is not None:
+            _session().auto_mgr = saved
+        yield hb
+    finally:
+        hb.stop()
+        release_user_job(job, (_session().get("auto_mgr") or {}).get("last_gw_processed"))
 
-import re, json
 # ---------- utils ----------
 def _json_from_text(s: str) -> dict:
     m = re.search(r"\{.*\}", s, re.S)
@@ -17,6 +89,7 @@ def _json_from_text(s: str) -> dict:
     except Exception:
         return {}
 
+@metrics.timed("decision_seconds", step="validate_initial")
 def _validate_initial(players_df: pd.DataFrame, ids: list[int], budget: float = 100.0) -> tuple[bool,str]:
     if not isinstance(ids, list) or len(ids) != 15:
         return False, "Need 15 ids."
@@ -38,6 +111,7 @@ def _validate_initial(players_df: pd.DataFrame, ids: list[int], budget: float =
         return False, "Exceeds 3/club."
     return True, ""
 
+@metrics.timed("decision_seconds", step="validate_lineup")
 def _validate_lineup(players_df: pd.DataFrame, squad_ids: list[int], xi_ids: list[int], bench_order: list[int]) -> tuple[bool,str]:
     all_ids = set(squad_ids)
     xi = list(map(int, xi_ids or []))
@@ -60,41 +134,13 @@ def _validate_lineup(players_df: pd.DataFrame, squad_ids: list[int], xi_ids: lis
         return False, "XI must have exactly 1 GK."
     return True, ""
 
-def _validate_transfer(players_df: pd.DataFrame, squad_ids: list[int], bank: float,
-                       out_id: int | None, in_id: int | None) -> tuple[bool,str,float,list[int]]:
-    if out_id is None and in_id is None:
-        return True, "Hold.", bank, squad_ids
-    if out_id is None or in_id is None:
-        return False, "Missing ids.", bank, squad_ids
-
-    out_id, in_id = int(out_id), int(in_id)
-    if out_id not in squad_ids:
-        return False, "Out id not in squad.", bank, squad_ids
-    if in_id in squad_ids:
-        return False, "In id already in squad.", bank, squad_ids
-
-    out = players_df.loc[players_df["id"] == out_id]
-    inn = players_df.loc[players_df["id"] == in_id]
-    if out.empty or inn.empty:
-        return False, "Unknown id(s).", bank, squad_ids
-    if out.iloc[0]["pos"] != inn.iloc[0]["pos"]:
-        return False, "Must be like-for-like.", bank, squad_ids
-
-    tmp = players_df[players_df["id"].isin([sid for sid in squad_ids if sid != out_id] + [in_id])]
-    if tmp["team_short"].value_counts().max() > MAX_PER_CLUB:
-        return False, "Would exceed 3/club.", bank, squad_ids
-
-    delta = float(inn.iloc[0]["price"]) - float(out.iloc[0]["price"])
-    if delta > bank + 1e-6:
-        return False, "Over budget.", bank, squad_ids
-
-    new_bank = bank - float(delta)
-    new_squad = [sid for sid in squad_ids if sid != out_id] + [in_id]
-    return True, "Applied.", new_bank, new_squad
+# Where GW points come from. Backtests (fpl/ai_manager/backtest.py) point this at the
+# end-of-season snapshot while decisions see only point-in-time data.
+_points_history = None
 
 def _event_points(pid: int, gw: int) -> int:
     try:
-        h = fetch_player_history(pid).get("history", [])
+        h = (_points_history or fetch_player_history)(pid).get("history", [])
         for g in h:
             if int(g.get("round", -1)) == int(gw):
                 return int(g.get("total_points", 0))
@@ -102,6 +148,7 @@ def _event_points(pid: int, gw: int) -> int:
         pass
     return 0
 
+@metrics.timed("decision_seconds", step="compute_points")
 def _compute_points(xi_ids: list[int], cap_id: int, bench_ids: list[int], gw: int, chip: str) -> int:
     xi_pts = sum(_event_points(int(pid), gw) for pid in xi_ids)
     cap_pts = _event_points(int(cap_id), gw) if cap_id else 0
@@ -112,11 +159,19 @@ def _compute_points(xi_ids: list[int], cap_id: int, bench_ids: list[int], gw: in
         total += sum(_event_points(int(pid), gw) for pid in bench_ids)
     return int(total)
 
+def _xp_cols(players_df: pd.DataFrame) -> list[str]:
+    """Projected-points columns (fpl.projection), when the KB build attached them."""
+    return [c for c in ("xp_next", "xp_horizon") if c in players_df.columns]
+
 def _llm(model_name: str) -> ChatOpenAI:
-    return ChatOpenAI(openai_api_key=st.session_state.openai_key, model_name=model_name, temperature=0.2)
+    return ChatOpenAI(openai_api_key=_session().openai_key, model_name=model_name, temperature=0.2)
+
+def _parse(raw: str) -> dict:
+    return _json_from_text(raw) or {"error": "parse"}
 
 # ---------- prompts ----------
 
+@metrics.timed("decision_seconds", step="draft_initial_squad")
 def draft_initial_squad(
     players_df: pd.DataFrame,
     kb_text: str,
@@ -130,11 +185,10 @@ def draft_initial_squad(
     minimally while honoring `extra_instructions`.
     Returns STRICT JSON: {"squad_ids":[...], "captain_id": <int|null>, "reason":"..."}
     """
-    if not st.session_state.openai_key:
+    if not _session().openai_key:
         return {"error": "no_api"}
 
-    llm = _llm(model_name)
-    table = players_df[["id","web_name","team_short","pos","price","form","status","selected_by","points_per_game"]].to_string(index=False)
+    table = players_df[["id","web_name","team_short","pos","price","form","status","selected_by","points_per_game"] + _xp_cols(players_df)].to_string(index=False)
 
     sys = (
         "You are an elite Fantasy Premier League drafter. Always obey constraints and "
@@ -164,7 +218,7 @@ Prefer status 'a' (available). Consider form, points_per_game, minutes reliabili
 ownership (template vs differential), and near-term fixtures.
 
 {prior_block}{note_block}
-PLAYERS (id, name, team, pos, price, form, status, selected_by, ppg):
+PLAYERS (id, name, team, pos, price, form, status, selected_by, ppg[, xp_next, xp_horizon]):
 {table}
 
 KNOWLEDGE BASE (fixtures + player lines):
@@ -181,10 +235,11 @@ Rules:
 - If PRIOR_SQUAD_IDS are given, keep changes minimal unless instructions mandate otherwise.
 """
 
-    raw = llm.invoke([{"role":"system","content":sys},{"role":"user","content":usr}]).content
-    return _json_from_text(raw) or {"error":"parse"}
+    return routing.call("draft", sys, usr, model_name, _llm, _parse,
+                        validate=lambda obj: _validate_initial(players_df, obj.get("squad_ids") or [], budget))
 
 
+@metrics.timed("decision_seconds", step="weekly_decision")
 def weekly_decision(
     players_df: pd.DataFrame,
     kb_text: str,
@@ -192,13 +247,17 @@ def weekly_decision(
     model_name: str,
     gw: int,
     extra_instructions: str | None = None,   # optional manager note for this run
+    leaderboards=None,                       # optional fpl.leaderboards.LeaderboardIndex
+    transfer_options: list[dict] | None = None,  # TransferSearch.shortlist(); None = free-form single transfer
+    captaincy: str | None = None,            # optional SimResult.prompt_block() for the current squad
+    season_plan: str | None = None,          # optional SeasonPlan.prompt_block() from fpl.ai_manager.planner
+    validate=None,                           # optional dec -> (ok, why); failures are repaired / escalated
 ) -> dict:
-    if not st.session_state.openai_key:
+    if not _session().openai_key:
         return {"error":"no_api"}
-    llm = _llm(model_name)
     squad_ids = state["squad"]
     sub = players_df[players_df["id"].isin(squad_ids)][
-        ["id","web_name","team_short","pos","price","status","form","points_per_game"]
+        ["id","web_name","team_short","pos","price","status","form","points_per_game"] + _xp_cols(players_df)
     ].sort_values(["pos","web_name"])
     table = sub.to_string(index=False)
     chips = [k for k,v in state.get("chips",{}).items() if v] or ["NONE"]
@@ -217,11 +276,45 @@ CURRENT 15:
 KB:
 {kb_text}
 """
+    if leaderboards is not None:
+        usr += f"\nLEADERBOARDS (top by form / points per £m, per position):\n{leaderboards.prompt_block()}\n"
+    if captaincy:
+        usr += (f"\nCAPTAINCY / CHIP SIMULATION ({SIM_RUNS:,} runs of the current squad's best XI; "
+                f"squad points per captain, mean and 10th/90th percentile):\n{captaincy}\n")
+    if season_plan:
+        usr += ("\nSEASON PLAN (chip / free-transfer timing over the remaining GWs; FH and WC are "
+                f"played by the squad optimizer when planned for this GW, not from this prompt):\n{season_plan}\n")
     if note:
         usr += f"\nMANAGER INSTRUCTIONS (user-provided):\n{note}\n"
 
+    if transfer_options:
+        usr += f"""
+TRANSFER OPTIONS (pre-checked: same position, within bank, ≤3 per club; gain = projected points in − out − hit;
+options tagged like-for-like swap an unavailable player for the statistically closest affordable one):
+{format_shortlist(transfer_options)}
+
+Choose exactly ONE option above (HOLD = no transfer) and copy its out_ids/in_ids, and optionally
+one chip (TC or BB; FH/WC are played by the squad optimizer). Pick a valid XI from the squad AFTER the transfer,
+bench order (4 ids), and a captain in the XI.
+
+Return JSON ONLY:
+{{
+  "made": true|false,
+  "option": "<T#>",
+  "out_ids": [ids from the chosen option, [] for HOLD],
+  "in_ids": [ids from the chosen option, [] for HOLD],
+  "chip": "NONE"|"TC"|"BB",
+  "xi_ids": [11 ids],
+  "bench_order": [4 ids],
+  "captain_id": <int>,
+  "reason": "<short>"
+}}
+Rules: XI must have 1 GK and a legal FPL formation; bench has remaining 4 players.
+"""
+        return routing.call("weekly", sys, usr, model_name, _llm, _parse, validate=validate)
+
     usr += """
-Choose AT MOST one transfer, and optionally one chip (TC or BB; FH/WC unsupported here).
+Choose AT MOST one transfer, and optionally one chip (TC or BB; FH/WC are played by the squad optimizer).
 Pick a valid XI, bench order (4 ids), and a captain in the XI.
 
 Return JSON ONLY:
@@ -237,20 +330,87 @@ Return JSON ONLY:
 }
 Rules: like-for-like swap; stay under budget and ≤3 per club; XI must have 1 GK and a legal FPL formation; bench has remaining 4 players.
 """
-    raw = llm.invoke([{"role":"system","content":sys},{"role":"user","content":usr}]).content
-    return _json_from_text(raw) or {"error":"parse"}
+    return routing.call("weekly_single", sys, usr, model_name, _llm, _parse, validate=validate)
+
+
+def _text_reply(raw: str) -> dict:
+    return {"reason": raw.strip()} if raw.strip() else {"error": "empty"}
+
+
+@metrics.timed("decision_seconds", step="explain_squad_chip")
+def explain_squad_chip(players_df: pd.DataFrame, state: dict, gw: int, chip: str, dec: dict,
+                       model_name: str, extra_instructions: str | None = None) -> str:
+    """Plain-text explanation of an optimizer-built FH/WC squad; the LLM doesn't change it."""
+    opt = dec["optimizer"]
+    fallback = (f"{chip}: optimizer squad, +{opt['gain']:.1f} xP over the current 15 "
+                f"({len(dec['in_ids'])} changes, £{opt['budget']:.1f}m).")
+    if not _session().openai_key:
+        return fallback
+    by_id = players_df.set_index("id")
+    xp_col = ("xp_next" if chip == "FH" else "xp_horizon") if "xp_horizon" in players_df.columns else "form"
+
+    def who(ids):
+        return "; ".join(f"{by_id.at[p, 'web_name']} ({by_id.at[p, 'team_short']} {by_id.at[p, 'pos']} "
+                         f"£{float(by_id.at[p, 'price']):.1f}m, {xp_col} {float(by_id.at[p, xp_col] or 0):.1f})"
+                         for p in ids if p in by_id.index) or "none"
+
+    note = (extra_instructions or "").strip()[:800]
+    usr = f"""
+SQUAD REBUILD: {chip} in GW {gw}, picked by an exact optimizer (max projected points {'for this GW' if chip == 'FH' else 'over the horizon'};
+2/5/5/3, ≤3 per club, budget £{opt['budget']:.1f}m = bank + selling value). Projected gain over the current 15: +{opt['gain']:.1f} xP.
+{'The previous squad returns next GW.' if chip == 'FH' else ''}
+OUT: {who(dec['out_ids'])}
+IN: {who(dec['in_ids'])}
+XI: {who(dec['xi_ids'])}
+CAPTAIN: {who([dec['captain_id']])}
+{f"MANAGER INSTRUCTIONS (user-provided):{chr(10)}{note}{chr(10)}" if note else ""}
+Explain this rebuild to the manager in 80–150 words: the key ins and outs, structure, fixtures and
+risks. Do not propose changes. Plain text only.
+"""
+    sys = "You are an FPL manager explaining a squad an optimizer picked. Plain text, no JSON."
+    obj = routing.call("explain", sys, usr, model_name, _llm, _text_reply)
+    return obj.get("reason") or fallback
+
+
+def squad_chip_decision(players_df: pd.DataFrame, state: dict, gw: int, chip: str, model_name: str,
+                        extra_instructions: str | None = None, min_gain: float | None = None) -> dict | None:
+    """
+    A FH/WC week in the weekly_decision schema: wildcard.chip_squad picks the 15,
+    the lineup solver the XI and captain, the LLM only explains. None when no legal
+    squad exists or it adds less than `min_gain` xP over the current one.
+    """
+    t0 = time.perf_counter()
+    pick, gain = chip_squad(players_df, state, chip, extra_instructions)
+    if pick is None or (min_gain is not None and gain < min_gain):
+        return None
+    best = solve_lineup(squad_scores(players_df, pick.ids))
+    if best is None:
+        return None
+    # pair outs and ins by position so the log reads as swaps
+    order = {p: i for i, p in enumerate(SQUAD_SHAPE)}
+    pos = dict(zip(players_df["id"].astype(int), players_df["pos"].astype(str)))
+    old = [int(p) for p in state["squad"]]
+    outs = sorted((p for p in old if p not in pick.ids), key=lambda p: (order.get(pos.get(p), 9), p))
+    ins = sorted((p for p in pick.ids if p not in old), key=lambda p: (order.get(pos.get(p), 9), p))
+    dec = {"made": bool(outs), "out_ids": outs, "in_ids": ins, "chip": chip,
+           "xi_ids": best["xi_ids"], "bench_order": best["bench_order"], "captain_id": best["captain_id"],
+           "optimizer": {"gain": round(gain, 2), "value": round(pick.value, 2), "spend": pick.cost10 / 10,
+                         "budget": squad_budget10(players_df, old, state["bank"], state.get("purchase_prices")) / 10,
+                         "nodes": pick.nodes, "exact": pick.exact, "seconds": round(time.perf_counter() - t0, 3)}}
+    dec["reason"] = explain_squad_chip(players_df, state, gw, chip, dec, model_name, extra_instructions)
+    return dec
 
 # ---------- orchestration ----------
 def ensure_initial_squad_with_ai(user_id: str, players_df: pd.DataFrame, kb_text: str,
                                  model_name: str, budget: float = 100.0):
     """If no squad, ask LLM to draft one. No greedy fallback."""
-    if "auto_mgr" in st.session_state and st.session_state.auto_mgr.get("squad"):
+    if "auto_mgr" in _session() and _session().auto_mgr.get("squad"):
         return
     obj = draft_initial_squad(players_df, kb_text, model_name, budget=budget)
 
     # error / no-api path
     if obj.get("error"):
-        st.session_state.auto_mgr = {
+        _session().auto_mgr = {
             "squad": [],
             "bank": budget,
             "free_transfers": 0,
@@ -260,14 +420,14 @@ def ensure_initial_squad_with_ai(user_id: str, players_df: pd.DataFrame, kb_text
             "log": [],
             "seed_origin": obj["error"],
         }
-        save_state(user_id, st.session_state.auto_mgr)
+        save_state(user_id, _session().auto_mgr)
         return
 
     # validate draft
     ids = obj.get("squad_ids") or []
     ok, why = _validate_initial(players_df, ids, budget)
     if not ok:
-        st.session_state.auto_mgr = {
+        _session().auto_mgr = {
             "squad": [],
             "bank": budget,
             "free_transfers": 0,
@@ -277,14 +437,15 @@ def ensure_initial_squad_with_ai(user_id: str, players_df: pd.DataFrame, kb_text
             "log": [],
             "seed_origin": f"ai_failed:{why}",
         }
-        save_state(user_id, st.session_state.auto_mgr)
+        save_state(user_id, _session().auto_mgr)
         return
 
     cost = float(players_df[players_df["id"].isin(ids)]["price"].sum())
    
-    st.session_state.auto_mgr = {
+    _session().auto_mgr = {
         "squad": list(map(int, ids)),
         "bank": float(budget - cost),
+        "purchase_prices": _prices_of(players_df, ids),
         "free_transfers": 0,
         "last_gw_processed": None,
         "last_ft_accrual_gw": 0,
@@ -295,20 +456,81 @@ def ensure_initial_squad_with_ai(user_id: str, players_df: pd.DataFrame, kb_text
         "budget": float(budget),              # ← NEW: persist budget for future redrafts
     }
 
-    save_state(user_id, st.session_state.auto_mgr)
+    save_state(user_id, _session().auto_mgr)
+
+def _moves_from_decision(dec: dict) -> tuple[list[int], list[int]]:
+    """(out_ids, in_ids) from either the options schema or the legacy single out_id/in_id."""
+    if dec.get("out_ids") is not None or dec.get("in_ids") is not None:
+        return list(map(int, dec.get("out_ids") or [])), list(map(int, dec.get("in_ids") or []))
+    out_id, in_id = dec.get("out_id"), dec.get("in_id")
+    if out_id is None and in_id is None:
+        return [], []
+    return ([int(out_id)] if out_id is not None else []), ([int(in_id)] if in_id is not None else [])
+
+def _prices_of(players_df: pd.DataFrame, ids) -> dict[str, float]:
+    """Current price per id, as stored in state["purchase_prices"] (JSON: string keys)."""
+    price = dict(zip(players_df["id"].astype(int), players_df["price"].astype(float)))
+    return {str(int(p)): price[int(p)] for p in ids if int(p) in price}
+
+def _state_snapshot(state: dict) -> dict:
+    """Deep copy of everything except the log (the log is re-attached at write time)."""
+    return copy.deepcopy({k: v for k, v in state.items() if k != "log"})
+
+def _hindsight_best(squad_pos: list[tuple[int, str]], gw: int, chip: str) -> int:
+    """Points the best possible XI/captain from this squad would have scored (same chip)."""
+    actual = [(pid, pos, _event_points(pid, gw)) for pid, pos in squad_pos]
+    best = solve_lineup(actual)
+    if best is None:
+        return 0
+    total = best["score"]
+    if chip == "TC":
+        total += next(sc for pid, _, sc in actual if pid == best["captain_id"])
+    if chip == "BB":
+        total += sum(sc for pid, _, sc in actual if pid in best["bench_order"])
+    return int(total)
+
+def _score_gw(xi_ids: list[int], cap_id: int, bench_ids: list[int], gw: int, chip: str,
+              squad_pos: list[tuple[int, str]] | None = None) -> tuple[int, int | None, float]:
+    t0 = time.perf_counter()
+    pts = _compute_points(xi_ids, cap_id, bench_ids, gw, chip)
+    best = _hindsight_best(squad_pos, gw, chip) if squad_pos else None
+    return pts, best, time.perf_counter() - t0
+
+def _finish_gw(user_id: str, state: dict, entry: dict, snap: dict, n_log: int,
+               scored: "Future | tuple[int, int | None, float]") -> tuple[float, float]:
+    """Fill in points for one GW and persist it. Runs on the writer thread when pipelined."""
+    pts, best, score_s = scored.result() if isinstance(scored, Future) else scored
+    entry["points"] = int(pts) - int(entry.get("hit") or 0)
+    if best is not None:
+        entry["lineup_check"]["best_points"] = int(best)
+        entry["lineup_check"]["points_left"] = max(0, int(best) - int(pts))
+    t0 = time.perf_counter()
+    snap["log"] = list(state["log"][:n_log])
+    save_state(user_id, snap)
+    append_gw_log(user_id, int(entry["gw"]), entry)
+    return score_s, time.perf_counter() - t0
 
 def run_ai_auto_until_current(user_id: str, kb_meta: dict, players_df: pd.DataFrame,
-                              model_name: str, extra_instructions: str | None = None):
+                              model_name: str, extra_instructions: str | None = None,
+                              pipelined: bool = True, seed: int | None = None, keep_going=None) -> dict:
     """
     Advance from last_gw_processed+1 → current GW.
     FT accrual happens at the START of each GW (except GW1) and only once per GW.
+
+    With `pipelined`, points fetching/scoring for GW n and the DB writes run on
+    background workers while the LLM call for GW n+1 is in flight. State (squad,
+    bank, FTs, chips) still advances strictly GW by GW on the calling thread, and
+    writes land in GW order. `seed` makes the Monte Carlo captaincy block reproducible.
+    `keep_going()` (a job lease check) is asked before each GW and again before its
+    decision is applied; once it says no, nothing more is written. Returns per-stage timings (seconds).
     """
-    if "auto_mgr" not in st.session_state:
-        return
-    state = st.session_state.auto_mgr
+    timings = {"gws": 0, "search": 0.0, "simulate": 0.0, "plan": 0.0, "decide": 0.0, "validate": 0.0, "score": 0.0, "persist": 0.0, "wall": 0.0}
+    if "auto_mgr" not in _session():
+        return timings
+    state = _session().auto_mgr
     gw_now = kb_meta.get("gw")
     if not gw_now or not state.get("squad"):
-        return
+        return timings
 
     if state.get("last_gw_processed") is None:
         state["last_gw_processed"] = int(gw_now) - 1
@@ -316,85 +538,223 @@ def run_ai_auto_until_current(user_id: str, kb_meta: dict, players_df: pd.DataFr
     # backward compatibility for older saves
     state.setdefault("last_ft_accrual_gw", 0)
 
-    for gw in range(int(state["last_gw_processed"]) + 1, int(gw_now) + 1):
-        if not st.session_state.openai_key:
-            break
-
-        # ✅ ACCRUE FT AT START (not GW1) and only once per GW
-        if gw > 1 and state.get("last_ft_accrual_gw") != gw:
-            state["free_transfers"] = min(5, state["free_transfers"] + 1)
-            state["last_ft_accrual_gw"] = gw
-
-        dec = weekly_decision(
-                players_df,
-                st.session_state.full_kb,
-                state,
-                model_name,
-                gw,
-                extra_instructions=extra_instructions if gw == gw_now else None,  # only apply to this run's current GW
-            )
-        if dec.get("error"):
-            break
-
-        made = bool(dec.get("made", False))
-        out_id, in_id = dec.get("out_id"), dec.get("in_id")
-        ok, msg, new_bank, new_squad = _validate_transfer(players_df, state["squad"], state["bank"], out_id, in_id)
-        if made and not ok:
-            # reject this week; don't log incomplete decision
-            break
-        if made and ok:
-            state["squad"] = new_squad
-            state["bank"] = float(new_bank)
-            state["free_transfers"] = max(0, state["free_transfers"] - 1)
-
-        xi_ids = list(map(int, dec.get("xi_ids") or []))
-        bench_order = list(map(int, dec.get("bench_order") or dec.get("bench_ids") or []))
-        ok, why = _validate_lineup(players_df, state["squad"], xi_ids, bench_order)
-        if not ok:
-            break
-
-        cap_id = int(dec.get("captain_id") or 0)
-        if cap_id not in xi_ids:
-            break
-
-        chip = dec.get("chip", "NONE")
-        if chip not in ("NONE", "TC", "BB"):
-            chip = "NONE"
-        if chip in ("TC", "BB") and not state["chips"].get(chip, False):
-            chip = "NONE"
-
-        pts = _compute_points(xi_ids, cap_id, bench_order, gw, chip)
-
-        used_chip = chip
-        if used_chip in ("TC", "BB"):
-            state["chips"][used_chip] = False
-
-        entry = {
-            "gw": int(gw),
-            "made": bool(made),
-            "transfer": {"out": int(out_id) if out_id else None, "in": int(in_id) if in_id else None} if made else None,
-            "chip": used_chip,
-            "xi_ids": xi_ids,
-            "bench_ids": bench_order,
-            "captain_id": cap_id,
-            "points": int(pts),
-            "bank": float(state["bank"]),
-            "free_transfers": int(state["free_transfers"]),  # value AFTER this GW’s decision
-            "squad_ids": list(map(int, state["squad"])),
-            "reason": dec.get("reason", ""),
-        }
-        state["log"].append(entry)
-        state["last_gw_processed"] = gw
+    # Read session values once: worker threads have no Streamlit script context.
+    kb_text = _session().full_kb
+    has_key = bool(_session().openai_key)
+    leaderboards = _session().get("leaderboards")
+    similarity = _session().get("similarity")
+    try:
+        fixtures = fetch_fixtures()
+        simulator = GwSimulator(players_df, fixtures, recent=kb_meta.get("recent"), base_gw=gw_now)
+    except Exception:
+        fixtures, simulator = None, None
 
-        save_state(user_id, state)
-        append_gw_log(user_id, gw, entry)
+    t_wall = time.perf_counter()
+    scorer = ThreadPoolExecutor(max_workers=4, thread_name_prefix="gw-score") if pipelined else None
+    writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gw-write") if pipelined else None
+    pending: list[Future] = []
+    try:
+        for gw in range(int(state["last_gw_processed"]) + 1, int(gw_now) + 1):
+            if not has_key or (keep_going is not None and not keep_going()):
+                break
+
+            # ✅ ACCRUE FT AT START (not GW1) and only once per GW
+            if gw > 1 and state.get("last_ft_accrual_gw") != gw:
+                state["free_transfers"] = min(5, state["free_transfers"] + 1)
+                state["last_ft_accrual_gw"] = gw
+
+            # a free hit lasts one GW: the squad it replaced comes back
+            fh = state.get("fh_revert")
+            if fh and int(fh["gw"]) < gw:
+                state["squad"], state["bank"] = list(fh["squad"]), float(fh["bank"])
+                state["purchase_prices"] = fh.get("purchase_prices", state.get("purchase_prices"))
+                del state["fh_revert"]
+            # what rewind_and_regenerate_current_gw puts back if this GW is redone
+            state["gw_undo"] = dict(copy.deepcopy({k: state.get(k) for k in UNDO_KEYS}), gw=int(gw))
+
+            t0 = time.perf_counter()
+            search = TransferSearch(players_df, state["squad"], state["bank"], state["free_transfers"],
+                                    purchase_prices=state.get("purchase_prices"))
+            options = search.shortlist(similar=similarity)
+            timings["search"] += time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            sim_best, captaincy = None, None
+            pre_scores = squad_scores(players_df, state["squad"])
+            pre = solve_lineup(pre_scores) if simulator is not None else None
+            if pre is not None:
+                chips_left = ("NONE",) + tuple(c for c in ("TC", "BB") if state["chips"].get(c))
+                xp_of = {pid: sc for pid, _, sc in pre_scores}
+                top = sorted(pre["xi_ids"], key=lambda pid: -xp_of[pid])[:5]
+                sim = simulator.simulate(pre["xi_ids"], pre["bench_order"], gw, captains=top,
+                                         vice_id=pre["vice_id"], chips=chips_left,
+                                         seed=None if seed is None else seed * 1000 + gw)
+                captaincy = sim.prompt_block()
+                best_row = sim.best()
+                sim_best = {"captain_id": int(best_row["captain_id"]), "chip": best_row["chip"],
+                            "mean": round(best_row["mean"], 1), "p10": best_row["p10"], "p90": best_row["p90"]}
+            timings["simulate"] += time.perf_counter() - t0
+
+            # the season plan only means something from the live GW onwards
+            plan = None
+            if gw == int(gw_now) and fixtures is not None:
+                t0 = time.perf_counter()
+                plan = plan_season(players_df, fixtures, state["squad"], state["bank"], state["free_transfers"],
+                                   state["chips"], gw, recent=kb_meta.get("recent"),
+                                   purchase_prices=state.get("purchase_prices"))
+                timings["plan"] += time.perf_counter() - t0
+
+            def _legal(dec, search=search):
+                outs, ins = _moves_from_decision(dec)
+                if dec.get("made") and not search.is_legal(outs, ins):
+                    return False, f"illegal transfer out_ids={outs} in_ids={ins}"
+                return True, ""
+
+            # FH / WC: asked for in the note, or planned for this GW and worth CHIP_MIN_GAIN
+            squad_chip, min_gain = None, None
+            if gw == int(gw_now):
+                squad_chip = chip_request(extra_instructions, gw)
+                if squad_chip is None and plan and plan.steps and plan.steps[0]["chip"] in SQUAD_CHIPS:
+                    squad_chip, min_gain = plan.steps[0]["chip"], CHIP_MIN_GAIN
+            if squad_chip and not state["chips"].get(squad_chip):
+                squad_chip = None
+
+            t0 = time.perf_counter()
+            dec = None
+            if squad_chip:
+                dec = squad_chip_decision(players_df, state, gw, squad_chip, model_name,
+                                          extra_instructions=extra_instructions, min_gain=min_gain)
+            if dec is None:
+                squad_chip = None
+                dec = weekly_decision(
+                    players_df,
+                    kb_text,
+                    state,
+                    model_name,
+                    gw,
+                    extra_instructions=extra_instructions if gw == gw_now else None,  # only apply to this run's current GW
+                    leaderboards=leaderboards,
+                    transfer_options=options,
+                    captaincy=captaincy,
+                    season_plan=plan.prompt_block() if plan and plan.steps else None,
+                    validate=_legal,
+                )
+            timings["decide"] += time.perf_counter() - t0
+            if dec.get("error") or (keep_going is not None and not keep_going()):
+                break
+
+            t0 = time.perf_counter()
+            made = bool(dec.get("made", False))
+            outs, ins = _moves_from_decision(dec)
+            if made and not search.is_legal(outs, ins):
+                # reject this week; don't log incomplete decision
+                break
+            # FH / WC moves are free and leave the banked FTs alone
+            hit = search.hit(len(outs)) if made and not squad_chip else 0
+            pre_squad, pre_bank = list(state["squad"]), float(state["bank"])
+            pre_prices = copy.deepcopy(state.get("purchase_prices"))
+            if made and outs:
+                new_squad, new_bank = search.apply(outs, ins)
+                state["squad"] = new_squad
+                state["bank"] = float(new_bank)
+                sold = set(outs)
+                prices = {k: v for k, v in (state.get("purchase_prices") or {}).items() if int(k) not in sold}
+                state["purchase_prices"] = dict(prices, **_prices_of(players_df, ins))
+                if not squad_chip:
+                    state["free_transfers"] = max(0, state["free_transfers"] - len(outs))
+
+            xi_ids = list(map(int, dec.get("xi_ids") or []))
+            bench_order = list(map(int, dec.get("bench_order") or dec.get("bench_ids") or []))
+            cap_id = int(dec.get("captain_id") or 0)
+            scores = squad_scores(players_df, state["squad"])
+            score_of = {pid: sc for pid, _, sc in scores}
+            best = solve_lineup(scores)
+            lineup_source = "solver" if squad_chip else "llm"
+            ok, why = _validate_lineup(players_df, state["squad"], xi_ids, bench_order)
+            if not ok:
+                # the solver's lineup stands in for an invalid LLM lineup
+                if best is None:
+                    break
+                xi_ids, bench_order, cap_id = best["xi_ids"], best["bench_order"], best["captain_id"]
+                lineup_source = f"solver ({why})"
+            elif cap_id not in xi_ids:
+                cap_id = max(xi_ids, key=lambda pid: (score_of.get(pid, 0.0), -pid))
+                lineup_source = "llm, solver captain"
+            chosen_xp = lineup_score(score_of, xi_ids, cap_id)
+            lineup_check = {
+                "source": lineup_source,
+                "xp": round(chosen_xp, 2),
+                "best_xp": round(best["score"], 2) if best else None,
+                "xp_left": round(max(0.0, best["score"] - chosen_xp), 2) if best else None,
+            }
+
+            chip = dec.get("chip", "NONE")
+            if chip not in ("NONE", "TC", "BB", squad_chip):
+                chip = "NONE"
+            if chip != "NONE" and not state["chips"].get(chip, False):
+                chip = "NONE"
+            timings["validate"] += time.perf_counter() - t0
+
+            used_chip = chip
+            if used_chip != "NONE":
+                state["chips"][used_chip] = False
+            if used_chip == "FH":
+                state["fh_revert"] = {"gw": int(gw), "squad": pre_squad, "bank": pre_bank,
+                                      "purchase_prices": pre_prices}
+
+            entry = {
+                "gw": int(gw),
+                "made": bool(made),
+                "transfer": {"out": outs[0] if outs else None, "in": ins[0] if ins else None} if made else None,
+                "moves": [{"out": o, "in": i} for o, i in zip(outs, ins)] if made and outs else None,
+                "hit": int(hit),
+                "chip": used_chip,
+                "xi_ids": xi_ids,
+                "bench_ids": bench_order,
+                "captain_id": cap_id,
+                "lineup_check": lineup_check,  # hindsight best_points/points_left added once scored
+                "sim": sim_best,  # simulator's best captain/chip for the pre-transfer squad
+                "plan": plan.steps if plan else None,  # planner output (live GW only)
+                "optimizer": dec.get("optimizer"),  # FH/WC squad optimizer stats (chip weeks only)
+                "points": 0,  # filled in by _finish_gw once scored
+                "bank": float(state["bank"]),
+                "free_transfers": int(state["free_transfers"]),  # value AFTER this GW’s decision
+                "squad_ids": list(map(int, state["squad"])),
+                "reason": dec.get("reason", ""),
+            }
+            state["log"].append(entry)
+            state["last_gw_processed"] = gw
+            snap = _state_snapshot(state)
+            n_log = len(state["log"])
+            timings["gws"] += 1
+
+            squad_pos = [(pid, pos) for pid, pos, _ in scores]
+            if pipelined:
+                scored = scorer.submit(_score_gw, xi_ids, cap_id, bench_order, gw, used_chip, squad_pos)
+                pending.append(writer.submit(_finish_gw, user_id, state, entry, snap, n_log, scored))
+            else:
+                score_s, persist_s = _finish_gw(user_id, state, entry, snap, n_log,
+                                                _score_gw(xi_ids, cap_id, bench_order, gw, used_chip, squad_pos))
+                timings["score"] += score_s
+                timings["persist"] += persist_s
+    finally:
+        if pipelined:
+            scorer.shutdown(wait=True)
+            writer.shutdown(wait=True)
+
+    for f in pending:
+        score_s, persist_s = f.result()
+        timings["score"] += score_s
+        timings["persist"] += persist_s
+    timings["wall"] = time.perf_counter() - t_wall
+    return timings
 
 def rewind_and_regenerate_current_gw(user_id: str, kb_meta: dict, players_df: pd.DataFrame,
-                                     model_name: str, extra_instructions: str | None = None):
+                                     model_name: str, extra_instructions: str | None = None, keep_going=None):
     """Set pointer back one and re-run a single GW (current), with optional user note."""
-    if "auto_mgr" not in st.session_state:
+    if "auto_mgr" not in _session():
         return False, "No state."
-    state = st.session_state.auto_mgr
+    state = _session().auto_mgr
     gw_now = kb_meta.get("gw")
     if not gw_now:
         return False, "No current GW."
@@ -403,6 +763,16 @@ def rewind_and_regenerate_current_gw(user_id: str, kb_meta: dict, players_df: pd
 
     # Remove in-memory log for gw_now (DB history is immutable)
     state["log"] = [e for e in state["log"] if int(e.get("gw", -1)) != int(gw_now)]
+    # this GW's moves and chips are undone: squad, bank, FTs, chips and prices as they were before it
+    undo = state.get("gw_undo")
+    fh = state.get("fh_revert")
+    if undo and int(undo["gw"]) == int(gw_now):
+        state.update({k: copy.deepcopy(undo.get(k)) for k in UNDO_KEYS})
+    elif fh and int(fh["gw"]) == int(gw_now):   # saves from before gw_undo: only a free hit can be undone
+        state["squad"], state["bank"] = list(fh["squad"]), float(fh["bank"])
+        state["chips"]["FH"] = True
+    if fh and int(fh["gw"]) == int(gw_now):
+        del state["fh_revert"]
     state["last_gw_processed"] = int(gw_now) - 1
     # DO NOT touch 'last_ft_accrual_gw' — guard prevents double accrual
     save_state(user_id, state)
@@ -413,13 +783,14 @@ def rewind_and_regenerate_current_gw(user_id: str, kb_meta: dict, players_df: pd
         players_df=players_df,
         model_name=model_name,
         extra_instructions=extra_instructions,
+        keep_going=keep_going,
     )
     return True, "Regenerated."
 def refresh_logged_points(user_id: str) -> int:
     """Recompute points for all logged GWs from official FPL history."""
-    if "auto_mgr" not in st.session_state:
+    if "auto_mgr" not in _session():
         return 0
-    state = st.session_state.auto_mgr
+    state = _session().auto_mgr
     updated = 0
     for entry in state.get("log", []):
         gw = int(entry["gw"])
@@ -427,7 +798,7 @@ def refresh_logged_points(user_id: str) -> int:
         bench_ids = list(map(int, entry.get("bench_ids") or entry.get("bench_order") or []))
         cap_id = int(entry.get("captain_id") or 0)
         chip = entry.get("chip", "NONE")
-        new_pts = _compute_points(xi_ids, cap_id, bench_ids, gw, chip)
+        new_pts = _compute_points(xi_ids, cap_id, bench_ids, gw, chip) - int(entry.get("hit") or 0)
         if new_pts != entry.get("points"):
             entry["points"] = int(new_pts)
             append_gw_log(user_id, gw, entry)  # upsert same PK (user_id, season, gw)
@@ -442,12 +813,12 @@ def force_redraft_gw1(
     extra_instructions: str | None = None,
 ) -> tuple[bool, str]:
     """Re-draft a full legal 15 for GW1 using the LLM and replace state.squad (no FT cost)."""
-    if "auto_mgr" not in st.session_state:
+    if "auto_mgr" not in _session():
         return False, "No state."
-    state = st.session_state.auto_mgr
+    state = _session().auto_mgr
     budget = float(state.get("budget", 100.0))
 
-    if not st.session_state.openai_key:
+    if not _session().openai_key:
         return False, "no_api"
 
     obj = draft_initial_squad(
@@ -470,6 +841,7 @@ def force_redraft_gw1(
     # replace squad + bank; DO NOT change FTs or chips
     state["squad"] = list(map(int, ids))
     state["bank"]  = float(budget - cost)
+    state["purchase_prices"] = _prices_of(players_df, ids)
     state.setdefault("free_transfers", 0)
     state.setdefault("chips", {"TC": True, "BB": True, "FH": True, "WC1": True, "WC2": True})
     state.setdefault("last_gw_processed", None)
@@ -0,0 +1,66 @@
+# fpl/ai_manager/lineup.py
+# Deterministic XI / bench order / captain solver over VALID_FORMATIONS.
+from __future__ import annotations
+from itertools import accumulate
+import pandas as pd
+
+from fpl.ai_manager.core import SQUAD_SHAPE, VALID_FORMATIONS
+
+_FORMATIONS = sorted(VALID_FORMATIONS)
+
+
+def solve_lineup(squad: list[tuple[int, str, float]]) -> dict | None:
+    """
+    Best XI for a 15-man squad given (id, pos, score) triples.
+    Per position the top-n by score always wins, so each formation is a prefix-sum
+    lookup and the whole solve is a handful of list ops (microseconds).
+    Bench: reserve GK first, then outfielders best-first (auto-sub priority).
+    `score` counts the captain twice.
+    """
+    by_pos = {p: [] for p in SQUAD_SHAPE}
+    for pid, pos, sc in squad:
+        if pos in by_pos:
+            by_pos[pos].append((float(sc), int(pid)))
+    for grp in by_pos.values():
+        grp.sort(key=lambda t: (-t[0], t[1]))
+    if not by_pos["GK"]:
+        return None
+    pre = {p: list(accumulate((s for s, _ in grp), initial=0.0)) for p, grp in by_pos.items()}
+
+    best = None
+    for d, m, f in _FORMATIONS:
+        if len(by_pos["DEF"]) < d or len(by_pos["MID"]) < m or len(by_pos["FWD"]) < f:
+            continue
+        tot = pre["GK"][1] + pre["DEF"][d] + pre["MID"][m] + pre["FWD"][f]
+        if best is None or tot > best[0]:
+            best = (tot, (d, m, f))
+    if best is None:
+        return None
+
+    d, m, f = best[1]
+    xi = by_pos["GK"][:1] + by_pos["DEF"][:d] + by_pos["MID"][:m] + by_pos["FWD"][:f]
+    outfield_bench = sorted(by_pos["DEF"][d:] + by_pos["MID"][m:] + by_pos["FWD"][f:],
+                            key=lambda t: (-t[0], t[1]))
+    ranked = sorted(xi, key=lambda t: (-t[0], t[1]))
+    return {
+        "xi_ids": [pid for _, pid in xi],
+        "bench_order": [pid for _, pid in by_pos["GK"][1:2] + outfield_bench],
+        "captain_id": ranked[0][1],
+        "vice_id": ranked[1][1] if len(ranked) > 1 else None,
+        "formation": best[1],
+        "score": best[0] + ranked[0][0],
+    }
+
+
+def squad_scores(players_df: pd.DataFrame, squad_ids: list[int], score_col: str | None = None
+                 ) -> list[tuple[int, str, float]]:
+    """(id, pos, score) for the squad; score defaults to xp_next, else form."""
+    col = score_col or ("xp_next" if "xp_next" in players_df.columns else "form")
+    sub = players_df[players_df["id"].isin([int(x) for x in squad_ids])]
+    vals = pd.to_numeric(sub[col], errors="coerce").fillna(0.0)
+    return list(zip(sub["id"].astype(int), sub["pos"].astype(str), vals.astype(float)))
+
+
+def lineup_score(scores: dict[int, float], xi_ids: list[int], captain_id: int | None) -> float:
+    """Score of a given XI with the captain counted twice."""
+    return sum(scores.get(int(p), 0.0) for p in xi_ids) + scores.get(int(captain_id or 0), 0.0)
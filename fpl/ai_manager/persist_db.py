@@ -1,11 +1,15 @@
 # fpl/ai_manager/persist_db.py
 from __future__ import annotations
-import os, pathlib
-from typing import Optional, List, Dict, Any
-from sqlalchemy import create_engine, Integer, String, DateTime, JSON, select
+import base64, gzip, hashlib, json, logging, os, pathlib, threading, time, uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any, Iterator
+from sqlalchemy import (event, create_engine, Integer, String, DateTime, JSON, Text, LargeBinary, select, update,
+                        delete, case, UniqueConstraint)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, Session
 from sqlalchemy.sql import func
 from config import DATABASE_URL, SEASON
+from fpl import metrics
 
 # Ensure parent directory for sqlite file exists (if using SQLite locally)
 if DATABASE_URL.startswith("sqlite:///"):
@@ -22,8 +26,29 @@ engine = create_engine(
     pool_pre_ping=True,
     pool_size=5,
     max_overflow=0,
+    # several job workers may share one SQLite file: wait for the write lock instead of failing
+    connect_args={"timeout": 30} if DATABASE_URL.startswith("sqlite") else {},
 )
 
+# Every DB round trip: count and latency by statement verb (SELECT/INSERT/UPDATE/…)
+@event.listens_for(engine, "before_cursor_execute")
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("t0", []).append(time.perf_counter())
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "?"
+    metrics.observe("db_query_seconds", time.perf_counter() - conn.info["t0"].pop(), verb=verb)
+
+@event.listens_for(engine, "handle_error")
+def _on_error(ctx):
+    if ctx.connection is not None and ctx.connection.info.get("t0"):
+        ctx.connection.info["t0"].pop()
+    metrics.inc("db_errors_total")
+
+metrics.register_collector(lambda: [("db_pool_checked_out", {}, engine.pool.checkedout())]
+                           if hasattr(engine.pool, "checkedout") else [])
+
 class Base(DeclarativeBase): pass
 
 class SeasonState(Base):
@@ -41,17 +66,68 @@ class GwLog(Base):
     entry:   Mapped[dict] = mapped_column(JSON, nullable=False)
     created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
+class GwLogArchive(Base):
+    """
+    A closed season's gw_logs for one user, compacted (see archive_season): a summary for
+    queries plus every entry in one gzipped columnar blob, read back by get_gw_logs.
+    """
+    __tablename__ = "gw_log_archives"
+    user_id:      Mapped[str] = mapped_column(String, primary_key=True)
+    season:       Mapped[str] = mapped_column(String, primary_key=True)
+    gws:          Mapped[int] = mapped_column(Integer, nullable=False)
+    first_gw:     Mapped[int] = mapped_column(Integer, nullable=False)
+    last_gw:      Mapped[int] = mapped_column(Integer, nullable=False)
+    total_points: Mapped[int] = mapped_column(Integer, nullable=False)
+    summary:      Mapped[dict] = mapped_column(JSON, nullable=False)
+    blob:         Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    raw_bytes:    Mapped[int] = mapped_column(Integer, nullable=False)
+    archived_at:  Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+class Job(Base):
+    """
+    One row per (user, season): "advance this user to at least target_gw". Re-enqueueing
+    raises target_gw and requeues a finished row, so a user never has two runs in flight.
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (UniqueConstraint("user_id", "season", name="uq_jobs_user_season"),)
+    id:          Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id:     Mapped[str] = mapped_column(String, nullable=False)
+    season:      Mapped[str] = mapped_column(String, nullable=False, default=SEASON)
+    target_gw:   Mapped[int] = mapped_column(Integer, nullable=False)
+    status:      Mapped[str] = mapped_column(String, nullable=False, default="queued", index=True)  # queued/running/done/failed
+    attempts:    Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    run_after:   Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    enqueued_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    started_at:  Mapped[Optional[datetime]] = mapped_column(DateTime)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    lease_until: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    lease_token: Mapped[Optional[str]] = mapped_column(String)
+    worker:      Mapped[Optional[str]] = mapped_column(String)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    error:       Mapped[Optional[str]] = mapped_column(Text)
+    result:      Mapped[Optional[dict]] = mapped_column(JSON)
+
 def init_db():
     Base.metadata.create_all(engine)
 
+@metrics.timed("db_op_seconds", op="load_state")
 def load_state(user_id: str, season: str = SEASON) -> Optional[dict]:
     with Session(engine) as s:
         row = s.get(SeasonState, {"user_id": user_id, "season": season})
-        return row.state if row else None
+        if row is None:
+            return None
+        if row.state.get("log_archived"):
+            # the flag stays in the returned state so save_state keeps the log compacted
+            return dict(row.state, log=_merged_logs(s, user_id, season))
+        return row.state
 
+@metrics.timed("db_op_seconds", op="save_state")
 def save_state(user_id: str, state: dict, season: str = SEASON):
     with Session(engine) as s:
         row = s.get(SeasonState, {"user_id": user_id, "season": season})
+        if state.get("log_archived") or (row and row.state.get("log_archived")):
+            # archived season: its log lives in gw_log_archives + gw_logs (append_gw_log), not here
+            state = dict(state, log=[], log_archived=True)
         if row:
             row.state = state
         else:
@@ -59,17 +135,31 @@ def save_state(user_id: str, state: dict, season: str = SEASON):
         s.merge(row)
         s.commit()
 
+@metrics.timed("db_op_seconds", op="append_gw_log")
 def append_gw_log(user_id: str, gw: int, entry: dict, season: str = SEASON):
     with Session(engine) as s:
         s.merge(GwLog(user_id=user_id, season=season, gw=gw, entry=entry))
         s.commit()
 
+@metrics.timed("db_op_seconds", op="get_gw_logs")
 def get_gw_logs(user_id: str, season: str = SEASON) -> list[dict]:
+    """A season's log entries by GW: its archive (if any) plus the hot gw_logs rows."""
+    with Session(engine) as s:
+        return _merged_logs(s, user_id, season)
+
+@metrics.timed("db_op_seconds", op="get_gw_logs_page")
+def get_gw_logs_page(user_id: str, offset: int = 0, limit: int = 5, season: str = SEASON) -> tuple[int, list[dict]]:
+    """(total logged GWs, one page of entries newest first) — the log view never loads the whole season."""
     with Session(engine) as s:
+        if s.get(GwLogArchive, {"user_id": user_id, "season": season}) is not None:
+            entries = _merged_logs(s, user_id, season)[::-1]
+            return len(entries), entries[offset:offset + limit]
+        where = (GwLog.user_id == user_id, GwLog.season == season)
+        total = s.execute(select(func.count()).select_from(GwLog).where(*where)).scalar_one()
         rows = s.execute(
-            select(GwLog).where(GwLog.user_id==user_id, GwLog.season==season).order_by(GwLog.gw.asc())
+            select(GwLog.entry).where(*where).order_by(GwLog.gw.desc()).offset(offset).limit(limit)
         ).scalars().all()
-        return [r.entry for r in rows]
+        return int(total), list(rows)
 
 # Optional utilities (handy in admin tab)
 def list_users() -> List[str]:
@@ -77,8 +167,482 @@ def list_users() -> List[str]:
         users = s.execute(select(SeasonState.user_id).distinct()).scalars().all()
     return users
 
-def raw_query(sql: str) -> list[Dict[str, Any]]:
+# ---------- season archive ----------
+# A closed season's gw_logs rows move into one gw_log_archives row per user: summary
+# columns plus a gzipped columnar blob (one list per entry key). The season_states row
+# keeps everything but its log, so the hot tables only grow with the live season.
+ARCHIVE_FORMAT = 1
+
+def _pack_logs(entries: list[dict]) -> bytes:
+    keys = sorted({k for e in entries for k in e})
+    doc = {"v": ARCHIVE_FORMAT, "n": len(entries), "columns": {k: [e.get(k) for e in entries] for k in keys},
+           "present": {k: [k in e for e in entries] for k in keys if not all(k in e for e in entries)}}
+    return gzip.compress(json.dumps(doc, separators=(",", ":")).encode("utf-8"), compresslevel=9, mtime=0)
+
+def _unpack_logs(blob: bytes) -> list[dict]:
+    doc = json.loads(gzip.decompress(blob))
+    if doc.get("v") != ARCHIVE_FORMAT:
+        raise ValueError(f"unknown gw_log archive format {doc.get('v')!r}")
+    cols, present = doc["columns"], doc.get("present", {})
+    return [{k: v[i] for k, v in cols.items() if k not in present or present[k][i]} for i in range(doc["n"])]
+
+def _archived_logs(s: Session, user_id: str, season: str) -> list[dict]:
+    row = s.get(GwLogArchive, {"user_id": user_id, "season": season})
+    return _unpack_logs(row.blob) if row else []
+
+def _merged_logs(s: Session, user_id: str, season: str) -> list[dict]:
+    """Archived entries plus hot gw_logs rows (written after archiving win), by GW."""
+    rows = s.execute(
+        select(GwLog.gw, GwLog.entry).where(GwLog.user_id == user_id, GwLog.season == season).order_by(GwLog.gw.asc())
+    ).all()
+    archived = _archived_logs(s, user_id, season)
+    if not archived:
+        return [entry for _, entry in rows]
+    by_gw = {int(e["gw"]): e for e in archived}
+    by_gw.update({int(gw): entry for gw, entry in rows})
+    return [by_gw[g] for g in sorted(by_gw)]
+
+def _log_summary(entries: list[dict]) -> dict:
+    chips = {e["chip"]: int(e["gw"]) for e in entries if e.get("chip") not in (None, "NONE")}
+    return {"points": sum(int(e.get("points") or 0) for e in entries),
+            "hits": sum(int(e.get("hit") or 0) for e in entries),
+            "transfers": sum(len(e.get("moves") or []) for e in entries),
+            "best_gw": max(entries, key=lambda e: int(e.get("points") or 0))["gw"] if entries else None,
+            "chips": chips}
+
+@metrics.timed("db_op_seconds", op="archive_user_season")
+def archive_user_season(user_id: str, season: str) -> dict | None:
+    """Compact one user's season (one transaction); None if it has no hot log rows."""
+    with Session(engine) as s:
+        rows = s.execute(
+            select(GwLog).where(GwLog.user_id == user_id, GwLog.season == season).order_by(GwLog.gw.asc())
+        ).scalars().all()
+        if not rows:
+            return None
+        entries = [r.entry for r in rows]
+        prior = s.get(GwLogArchive, {"user_id": user_id, "season": season})
+        if prior is not None:
+            # re-archiving after late writes: merge, newest row per GW wins
+            by_gw = {int(e["gw"]): e for e in _unpack_logs(prior.blob)}
+            by_gw.update({int(r.gw): r.entry for r in rows})
+            entries = [by_gw[g] for g in sorted(by_gw)]
+        raw = sum(len(json.dumps(e, separators=(",", ":"))) for e in entries)
+        blob = _pack_logs(entries)
+        summary = _log_summary(entries)
+        s.merge(GwLogArchive(user_id=user_id, season=season, gws=len(entries), first_gw=int(entries[0]["gw"]),
+                             last_gw=int(entries[-1]["gw"]), total_points=summary["points"], summary=summary,
+                             blob=blob, raw_bytes=raw, archived_at=_utcnow()))
+        s.execute(delete(GwLog).where(GwLog.user_id == user_id, GwLog.season == season))
+        state_row = s.get(SeasonState, {"user_id": user_id, "season": season})
+        if state_row is not None:
+            state_row.state = dict(state_row.state, log=[], log_archived=True)
+        s.commit()
+        return {"user_id": user_id, "gws": len(entries), "raw_bytes": raw, "blob_bytes": len(blob)}
+
+def archive_season(season: str, users: list[str] | None = None, allow_live: bool = False) -> dict:
+    """
+    Compact a closed season for every user with hot log rows (or just `users`).
+    Each user is its own transaction, so a crash leaves users archived or untouched,
+    and a re-run picks up where it stopped. Refuses the live season unless allow_live
+    (readers merge archive and hot rows, so archiving it early loses nothing).
+    """
+    if season == SEASON and not allow_live:
+        raise ValueError(f"{season} is the live season (config.SEASON); pass allow_live to archive it anyway")
+    if users is None:
+        with Session(engine) as s:
+            users = list(s.execute(select(GwLog.user_id).where(GwLog.season == season).distinct()).scalars())
+    done = [r for r in (archive_user_season(u, season) for u in users) if r]
+    return {"season": season, "users": len(done), "gws": sum(r["gws"] for r in done),
+            "raw_bytes": sum(r["raw_bytes"] for r in done), "blob_bytes": sum(r["blob_bytes"] for r in done)}
+
+def season_summaries(user_id: str) -> list[dict]:
+    """Archived seasons for a user, without unpacking any blob."""
+    with Session(engine) as s:
+        rows = s.execute(select(GwLogArchive.season, GwLogArchive.gws, GwLogArchive.first_gw, GwLogArchive.last_gw,
+                                GwLogArchive.total_points, GwLogArchive.summary, GwLogArchive.archived_at)
+                         .where(GwLogArchive.user_id == user_id).order_by(GwLogArchive.season)).all()
+    return [dict(r._mapping) for r in rows]
+
+# ---------- bounded admin queries ----------
+# Rows stream in chunks (server-side cursor on Postgres, fetchmany on SQLite) and stop at
+# a row / byte / time budget, so no query can pull a whole table into the app process.
+QUERY_MAX_ROWS = int(os.getenv("FPL_QUERY_MAX_ROWS", "5000"))
+QUERY_MAX_BYTES = int(os.getenv("FPL_QUERY_MAX_BYTES", str(32 * 2**20)))
+QUERY_TIMEOUT = float(os.getenv("FPL_QUERY_TIMEOUT", "30"))
+QUERY_CHUNK_ROWS = 500
+
+class QueryTimeout(Exception):
+    pass
+
+class QueryPage:
+    """One bounded page of a query: rows as dicts or a pyarrow Table, plus the token for the next page."""
+
+    def __init__(self, columns: list[str], chunks: list, arrow: bool, rows: int, nbytes: int,
+                 truncated: str | None, next_token: str | None, elapsed: float):
+        self.columns, self.chunks, self.arrow = columns, chunks, arrow
+        self.rows, self.nbytes, self.truncated = rows, nbytes, truncated
+        self.next_token, self.elapsed = next_token, elapsed
+
+    def records(self) -> list[Dict[str, Any]]:
+        if self.arrow:
+            return [r for c in self.chunks for r in c.to_pylist()]
+        return [r for c in self.chunks for r in c]
+
+    def table(self):
+        """pyarrow Table (st.dataframe shows it without a pandas copy)."""
+        import pyarrow as pa
+        if not self.arrow:
+            return pa.Table.from_pylist(_arrow_safe(self.records()))
+        if not self.chunks:
+            return pa.table({c: pa.array([], pa.null()) for c in self.columns})
+        return pa.concat_tables([pa.Table.from_batches([b]) for b in self.chunks], promote_options="default")
+
+def _arrow_safe(records: list[dict]) -> list[dict]:
+    # JSON columns come back as dicts/lists whose shapes differ per row: keep them as JSON text
+    return [{k: json.dumps(v, default=str) if isinstance(v, (dict, list)) else v for k, v in r.items()}
+            for r in records]
+
+def _value_bytes(v) -> int:
+    if v is None:
+        return 1
+    if isinstance(v, (str, bytes)):
+        return len(v)
+    if isinstance(v, (dict, list)):
+        return len(json.dumps(v, default=str))
+    return 8
+
+def _sql_key(sql: str) -> str:
+    return hashlib.sha1(sql.encode("utf-8")).hexdigest()[:12]
+
+def _encode_token(sql: str, offset: int) -> str:
+    raw = json.dumps({"q": _sql_key(sql), "o": offset}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _decode_token(sql: str, token: str | None) -> int:
+    if not token:
+        return 0
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except Exception as e:
+        raise ValueError(f"bad page token: {e}") from None
+    if data.get("q") != _sql_key(sql):
+        raise ValueError("page token belongs to a different query")
+    return int(data["o"])
+
+def _pageable(sql: str) -> bool:
+    return sql.lstrip().split(None, 1)[0].upper() in ("SELECT", "WITH") if sql.strip() else False
+
+def iter_query(sql: str, params: dict | tuple | None = None, offset: int = 0, limit: int | None = None,
+               chunk_rows: int = QUERY_CHUNK_ROWS, timeout: float = QUERY_TIMEOUT, readonly: bool = True,
+               arrow: bool = False, columns_out: list | None = None) -> Iterator:
+    """
+    Stream a query in chunks: lists of row dicts, or pyarrow RecordBatches with arrow=True.
+    SELECT/WITH statements are wrapped in LIMIT/OFFSET when offset/limit are given (add an
+    ORDER BY for stable pages). The statement is cancelled by the database after `timeout`
+    seconds (Postgres statement_timeout, SQLite progress handler) and the stream stops
+    with QueryTimeout at the same deadline; readonly=True runs it in a read-only transaction.
+    columns_out, if given, receives the column names before the first chunk.
+    """
+    sql = sql.strip().rstrip(";")
+    if (offset or limit is not None) and _pageable(sql):
+        # SQLite needs a LIMIT before OFFSET (-1 = none); Postgres takes LIMIT ALL
+        cap = str(int(limit)) if limit is not None else ("-1" if engine.dialect.name == "sqlite" else "ALL")
+        sql = f"SELECT * FROM ({sql}) AS _q LIMIT {cap} OFFSET {int(offset)}"
+    deadline = time.monotonic() + timeout
+
+    def _timed_out(e: Exception):
+        return QueryTimeout(f"query exceeded {timeout:g}s") if time.monotonic() > deadline else e
+
     with engine.connect() as conn:
-        res = conn.exec_driver_sql(sql)
-        cols = res.keys()
-        return [dict(zip(cols, row)) for row in res.fetchall()]
+        dialect = engine.dialect.name
+        dbapi = conn.connection.driver_connection
+        try:
+            if dialect == "postgresql":
+                if readonly:
+                    conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+                conn.exec_driver_sql(f"SET LOCAL statement_timeout = {max(1, int(timeout * 1000))}")
+            elif dialect == "sqlite":
+                if readonly:
+                    dbapi.execute("PRAGMA query_only = ON")
+                dbapi.set_progress_handler(lambda: int(time.monotonic() > deadline), 10000)
+            try:
+                res = conn.execution_options(stream_results=True, max_row_buffer=chunk_rows).exec_driver_sql(sql, params)
+            except Exception as e:
+                raise _timed_out(e) from e
+            if not res.returns_rows:
+                return
+            cols = list(res.keys())
+            if columns_out is not None:
+                columns_out[:] = cols
+            while True:
+                if time.monotonic() > deadline:
+                    raise QueryTimeout(f"query exceeded {timeout:g}s")
+                try:
+                    rows = res.fetchmany(chunk_rows)
+                except Exception as e:
+                    raise _timed_out(e) from e
+                if not rows:
+                    return
+                chunk = [dict(zip(cols, r)) for r in rows]
+                if arrow:
+                    import pyarrow as pa
+                    chunk = pa.RecordBatch.from_pylist(_arrow_safe(chunk))
+                yield chunk
+        finally:
+            if dialect == "sqlite":
+                # pooled connection: leave it as we found it
+                dbapi.set_progress_handler(None, 0)
+                if readonly:
+                    dbapi.execute("PRAGMA query_only = OFF")
+            conn.rollback()
+
+@metrics.timed("db_op_seconds", op="query_page")
+def query_page(sql: str, params: dict | tuple | None = None, page_token: str | None = None,
+               max_rows: int = QUERY_MAX_ROWS, max_bytes: int = QUERY_MAX_BYTES, timeout: float = QUERY_TIMEOUT,
+               readonly: bool = True, arrow: bool = False) -> QueryPage:
+    """
+    One page of at most max_rows rows / ~max_bytes bytes. `truncated` says which budget
+    stopped it ("rows", "bytes" or "timeout"); `next_token` resumes a SELECT after it.
+    """
+    t0 = time.perf_counter()
+    offset = _decode_token(sql, page_token)
+    cols: list[str] = []
+    chunks, rows, nbytes, truncated = [], 0, 0, None
+    stream = iter_query(sql, params, offset=offset, limit=max_rows + 1, timeout=timeout, readonly=readonly,
+                        columns_out=cols, chunk_rows=min(QUERY_CHUNK_ROWS, max_rows + 1))
+    try:
+        for chunk in stream:
+            keep = []
+            for r in chunk:
+                size = sum(_value_bytes(v) for v in r.values())
+                if rows >= max_rows:
+                    truncated = "rows"
+                elif nbytes + size > max_bytes and rows:
+                    truncated = "bytes"
+                if truncated:
+                    break
+                keep.append(r)
+                rows += 1
+                nbytes += size
+            if keep:
+                if arrow:
+                    import pyarrow as pa
+                    keep = pa.RecordBatch.from_pylist(_arrow_safe(keep))
+                chunks.append(keep)
+            if truncated:
+                break
+    except QueryTimeout:
+        truncated = "timeout"
+    finally:
+        stream.close()
+    metrics.inc("db_query_rows_total", rows)
+    next_token = _encode_token(sql, offset + rows) if truncated and rows and _pageable(sql) else None
+    return QueryPage(cols, chunks, arrow, rows, nbytes, truncated, next_token, time.perf_counter() - t0)
+
+def raw_query(sql: str, max_rows: int = QUERY_MAX_ROWS) -> list[Dict[str, Any]]:
+    """Up to max_rows rows as dicts (bounded; use query_page / iter_query to page or stream)."""
+    return query_page(sql, max_rows=max_rows, readonly=False).records()
+
+
+# ---------- job queue ----------
+# Leasing is one UPDATE … WHERE id = (SELECT … FOR UPDATE SKIP LOCKED LIMIT 1) RETURNING.
+# On Postgres the subquery skips rows other workers hold; SQLite ignores FOR UPDATE but
+# runs the whole UPDATE under its single writer lock, which gives the same guarantee.
+JOB_MAX_ATTEMPTS = int(os.getenv("FPL_JOB_MAX_ATTEMPTS", "5"))
+JOB_BACKOFF = float(os.getenv("FPL_JOB_BACKOFF", "30"))   # seconds, doubled per failed attempt
+JOB_LEASE_SECS = float(os.getenv("FPL_JOB_LEASE", "120"))
+
+def _utcnow() -> datetime:
+    # naive UTC: SQLite has no timezone support and compares these as text
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def enqueue_job(user_id: str, target_gw: int, season: str = SEASON) -> int:
+    """Ask for `user_id` to be advanced to `target_gw`. Idempotent; returns the job id."""
+    try:
+        return _enqueue(user_id, target_gw, season)
+    except IntegrityError:   # another process inserted the row first
+        return _enqueue(user_id, target_gw, season)
+
+def _enqueue(user_id: str, target_gw: int, season: str) -> int:
+    now = _utcnow()
+    with Session(engine) as s:
+        job = s.execute(select(Job).where(Job.user_id == user_id, Job.season == season)
+                        .with_for_update()).scalar_one_or_none()
+        if job is None:
+            job = Job(user_id=user_id, season=season, target_gw=int(target_gw), status="queued",
+                      attempts=0, run_after=now, enqueued_at=now)
+            s.add(job)
+        elif int(target_gw) > job.target_gw or job.status == "failed":
+            job.target_gw = max(job.target_gw, int(target_gw))
+            if job.status != "running":   # a running job requeues itself on finish
+                job.status, job.attempts, job.run_after, job.enqueued_at, job.error = "queued", 0, now, now, None
+        s.commit()
+        return job.id
+
+def enqueue_all(target_gw: int, season: str = SEASON) -> int:
+    """One job per user with a saved season state; returns how many users were enqueued."""
+    users = list_users()
+    for u in users:
+        enqueue_job(u, target_gw, season)
+    return len(users)
+
+def lease_job(worker: str, lease_secs: float = 120.0, season: str = SEASON) -> Optional[dict]:
+    """Claim the oldest runnable job (queued and due, or running with an expired lease)."""
+    now = _utcnow()
+    runnable = ((Job.status == "queued") & (Job.run_after <= now)) | \
+               ((Job.status == "running") & (Job.lease_until < now))
+    pick = (select(Job.id).where(Job.season == season, runnable)
+            .order_by(Job.run_after, Job.id).limit(1)
+            .with_for_update(skip_locked=True).scalar_subquery())
+    token = uuid.uuid4().hex
+    stmt = (update(Job).where(Job.id == pick, runnable)
+            .values(status="running", attempts=Job.attempts + 1, started_at=now, heartbeat_at=now,
+                    lease_until=now + timedelta(seconds=lease_secs), lease_token=token, worker=worker)
+            .returning(Job.id, Job.user_id, Job.season, Job.target_gw, Job.attempts, Job.enqueued_at,
+                       Job.lease_token))
+    with Session(engine) as s:
+        row = s.execute(stmt).mappings().first()
+        s.commit()
+    return dict(row) if row else None
+
+def heartbeat_job(job_id: int, token: str, lease_secs: float = 120.0) -> bool:
+    """Extend the lease; False if it was lost (expired and taken by another worker)."""
+    now = _utcnow()
+    with Session(engine) as s:
+        n = s.execute(update(Job).where(Job.id == job_id, Job.lease_token == token, Job.status == "running")
+                      .values(heartbeat_at=now, lease_until=now + timedelta(seconds=lease_secs))).rowcount
+        s.commit()
+    return n == 1
+
+class JobHeartbeat(threading.Thread):
+    """Renews a lease every third of its length until stopped; `lost` once renewal fails."""
+
+    def __init__(self, job_id: int, token: str, lease_secs: float = JOB_LEASE_SECS):
+        super().__init__(daemon=True, name=f"hb-{job_id}")
+        self.job_id, self.token, self.lease_secs = job_id, token, lease_secs
+        self.lost = False
+        self._halt = threading.Event()
+
+    def alive(self) -> bool:
+        return not self.lost
+
+    def run(self):
+        while not self._halt.wait(self.lease_secs / 3):
+            try:
+                if not heartbeat_job(self.job_id, self.token, self.lease_secs):
+                    self.lost = True
+                    return
+            except Exception:
+                logging.getLogger("fpl.jobs").exception("heartbeat failed for job %s", self.job_id)
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+def claim_user_job(user_id: str, holder: str, lease_secs: float = JOB_LEASE_SECS,
+                   season: str = SEASON) -> Optional[dict]:
+    """
+    Lease `user_id`'s job row for a run outside the worker pool (app button, API),
+    creating the row if needed. None while a worker or another caller holds a live lease.
+    """
+    now = _utcnow()
+    with Session(engine) as s:
+        try:
+            s.add(Job(user_id=user_id, season=season, target_gw=0, status="done", attempts=0,
+                      run_after=now, enqueued_at=now))
+            s.commit()
+        except IntegrityError:   # the usual case: the row exists
+            s.rollback()
+        job = s.execute(select(Job.id, Job.status, Job.target_gw).where(Job.user_id == user_id, Job.season == season)).first()
+        token = uuid.uuid4().hex
+        free = (Job.status != "running") | (Job.lease_until < now)
+        # compare-and-set on the status read above, so a concurrent claim or lease wins cleanly
+        n = s.execute(update(Job).where(Job.id == job.id, Job.status == job.status, free)
+                      .values(status="running", started_at=now, heartbeat_at=now, worker=holder,
+                              lease_until=now + timedelta(seconds=lease_secs), lease_token=token)).rowcount
+        s.commit()
+    return ({"id": job.id, "lease_token": token, "prev_status": job.status, "prev_target": job.target_gw}
+            if n == 1 else None)
+
+def release_user_job(job: dict, done_gw: int | None) -> bool:
+    """
+    End a claim_user_job lease. Unless this run reached the row's target, a row that was
+    waiting for a worker (or was enqueued meanwhile) goes back to the queue; a finished
+    or failed row keeps its status.
+    """
+    now = _utcnow()
+    behind = Job.target_gw > (done_gw if done_gw is not None else -1)
+    pending = job["prev_status"] in ("queued", "running")
+    requeue = behind if pending else behind & (Job.target_gw > job["prev_target"])
+    with Session(engine) as s:
+        n = s.execute(update(Job).where(Job.id == job["id"], Job.lease_token == job["lease_token"],
+                                        Job.status == "running")
+                      .values(status=case((requeue, "queued"), (behind, job["prev_status"]), else_="done"),
+                              attempts=case((requeue, 0), else_=Job.attempts), finished_at=now, run_after=now,
+                              lease_until=None, lease_token=None)).rowcount
+        s.commit()
+    return n == 1
+
+def finish_job(job_id: int, token: str, done_gw: int | None, result: dict | None = None) -> bool:
+    """Mark done, or requeue if target_gw was raised past `done_gw` while running."""
+    now = _utcnow()
+    again = Job.target_gw > (done_gw if done_gw is not None else -1)
+    with Session(engine) as s:
+        n = s.execute(update(Job).where(Job.id == job_id, Job.lease_token == token, Job.status == "running")
+                      .values(status=case((again, "queued"), else_="done"), finished_at=now, lease_until=None,
+                              lease_token=None, attempts=case((again, 0), else_=Job.attempts),
+                              run_after=now, enqueued_at=case((again, now), else_=Job.enqueued_at),
+                              error=None, result=result)).rowcount
+        s.commit()
+    return n == 1
+
+def fail_job(job_id: int, token: str, error: str, max_attempts: int = JOB_MAX_ATTEMPTS,
+             backoff: float = JOB_BACKOFF) -> bool:
+    """Requeue with exponential backoff, or mark failed after `max_attempts`."""
+    now = _utcnow()
+    with Session(engine) as s:
+        job = s.execute(select(Job).where(Job.id == job_id, Job.lease_token == token,
+                                          Job.status == "running")).scalar_one_or_none()
+        if job is None:
+            return False
+        job.error = error[-4000:]
+        job.lease_token, job.lease_until, job.finished_at = None, None, now
+        if job.attempts >= max_attempts:
+            job.status = "failed"
+        else:
+            job.status = "queued"
+            job.run_after = now + timedelta(seconds=backoff * 2 ** (job.attempts - 1))
+        s.commit()
+    return True
+
+def pending_jobs(season: str = SEASON) -> int:
+    """Jobs queued or running (including ones waiting out a retry backoff)."""
+    with Session(engine) as s:
+        return s.execute(select(func.count()).select_from(Job)
+                         .where(Job.season == season, Job.status.in_(("queued", "running")))).scalar_one()
+
+def job_stats(season: str = SEASON, window_secs: float = 300.0) -> dict:
+    """Queue depth by status, throughput over the last `window_secs`, and queue latency."""
+    now = _utcnow()
+    with Session(engine) as s:
+        jobs = s.execute(select(Job.status, Job.enqueued_at, Job.started_at, Job.finished_at)
+                         .where(Job.season == season)).all()
+    by_status: dict[str, int] = {}
+    waits, done_recent = [], 0
+    for st_, enq, started, finished in jobs:
+        by_status[st_] = by_status.get(st_, 0) + 1
+        if st_ == "queued":
+            waits.append((now - enq).total_seconds())
+        elif started is not None and started >= enq:
+            waits.append((started - enq).total_seconds())
+        if st_ == "done" and finished is not None and (now - finished).total_seconds() <= window_secs:
+            done_recent += 1
+    waits.sort()
+    return {
+        "by_status": by_status,
+        "done_per_min": done_recent / window_secs * 60 if window_secs > 0 else None,
+        "queue_wait_p50": waits[len(waits) // 2] if waits else None,
+        "queue_wait_p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else None,
+        "oldest_queued": max((now - enq).total_seconds() for st_, enq, _, _ in jobs if st_ == "queued")
+                         if by_status.get("queued") else None,
+    }
@@ -0,0 +1,198 @@
+# fpl/ai_manager/planner.py
+# Season planner: when to play each remaining chip and when to use or roll free
+# transfers, by dynamic programming over (GW, free transfers, chips left).
+#
+# Per-GW values come from the projection over every remaining GW for the current
+# squad: TC = captain xP, BB = bench xP, FH = best one-week squad XI − own XI.
+# n transfers in a GW are credited with the per-GW share of the n best non-overlapping
+# single moves for the window starting that GW (a move that stays in the squad keeps
+# earning that share each week, so crediting it week by week doesn't double count).
+# WC = best squad over the window − own XI over the window, less what one FT a week
+# would have earned over the same span. The squad itself is not part of the DP state,
+# so the plan is re-run each GW.
+from __future__ import annotations
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+from fpl.ai_manager.core import SQUAD_SHAPE, MAX_PER_CLUB
+from fpl.ai_manager.lineup import solve_lineup
+from fpl.ai_manager.transfers import HIT_COST, TransferSearch
+from fpl.projection import HORIZON, project
+
+CHIP_NAMES = ("TC", "BB", "FH", "WC1", "WC2")
+WC1_LAST_GW = 19           # first wildcard must be used by this GW, the second after it
+MAX_FT = 5
+MAX_MOVES = 3              # transfers considered per GW (beyond the free ones each costs HIT_COST)
+
+
+def _xi_values(ids: np.ndarray, pos: np.ndarray, rows: np.ndarray, xp: np.ndarray):
+    """Per GW: (XI xP incl. captain, captain xP, bench xP) for the squad rows."""
+    xi, cap, bench = [], [], []
+    for t in range(xp.shape[1]):
+        col = xp[rows, t]
+        best = solve_lineup(list(zip(ids[rows].tolist(), pos[rows].tolist(), col.tolist())))
+        if best is None:
+            xi.append(0.0)
+            cap.append(0.0)
+            bench.append(0.0)
+            continue
+        of = dict(zip(ids[rows].tolist(), col.tolist()))
+        xi.append(best["score"])
+        cap.append(of[best["captain_id"]])
+        bench.append(sum(of[p] for p in best["bench_order"]))
+    return np.array(xi), np.array(cap), np.array(bench)
+
+
+def greedy_squad(score: np.ndarray, pos: np.ndarray, cost10: np.ndarray, club: np.ndarray,
+                 budget10: int) -> np.ndarray | None:
+    """
+    Rows of a legal 15 with high total `score`: best per position under the club cap,
+    then the cheapest-per-point downgrades until it fits the budget. A quick estimate
+    for FH/WC values in the plan; the chip itself is played with wildcard.best_squad.
+    """
+    order = np.argsort(-score, kind="stable")
+    picked, clubs = [], np.zeros(int(club.max()) + 1, dtype=np.int16)
+    need = dict(SQUAD_SHAPE)
+    for r in order:
+        p = pos[r]
+        if need.get(p, 0) and clubs[club[r]] < MAX_PER_CLUB:
+            picked.append(r)
+            clubs[club[r]] += 1
+            need[p] -= 1
+            if not any(need.values()):
+                break
+    sq = np.array(picked, dtype=np.int64)
+    if len(sq) != sum(SQUAD_SHAPE.values()):
+        return None
+    in_sq = np.zeros(len(score), dtype=bool)
+    in_sq[sq] = True
+    while cost10[sq].sum() > budget10:
+        C = np.flatnonzero(~in_sq)
+        saved = cost10[sq][:, None] - cost10[C][None, :]
+        lost = score[sq][:, None] - score[C][None, :]
+        club_ok = clubs[club[C]][None, :] - (club[sq][:, None] == club[C][None, :]) < MAX_PER_CLUB
+        ok = (pos[sq][:, None] == pos[C][None, :]) & (saved > 0) & club_ok
+        if not ok.any():
+            return None
+        ratio = np.where(ok, np.maximum(lost, 0.0) / np.maximum(saved, 1), np.inf)
+        o, i = np.unravel_index(np.argmin(ratio), ratio.shape)
+        out_r, in_r = sq[o], C[i]
+        clubs[club[out_r]] -= 1
+        clubs[club[in_r]] += 1
+        in_sq[out_r], in_sq[in_r] = False, True
+        sq[o] = in_r
+    return sq
+
+
+def _top_moves(search: TransferSearch, k: int = MAX_MOVES) -> list[float]:
+    """Gains of the k best single transfers that share no player, best first (≤0 dropped)."""
+    so, si, gain, spend = search.singles()
+    order = np.argsort(-gain, kind="stable")
+    used_out, used_in, out, bank = set(), set(), [], search.bank10
+    for j in order:
+        if len(out) >= k or gain[j] <= 0:
+            break
+        if so[j] in used_out or si[j] in used_in or spend[j] > bank:
+            continue
+        used_out.add(so[j])
+        used_in.add(si[j])
+        bank -= spend[j]
+        out.append(float(gain[j]))
+    return out
+
+
+class SeasonPlan:
+    """One row per remaining GW: chip, transfers, FTs before/after, hit and value."""
+
+    def __init__(self, steps: list[dict], value: float, baseline: float):
+        self.steps = steps
+        self.value = value          # xP over the remaining GWs following the plan
+        self.baseline = baseline    # xP with no chips and no transfers
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.steps)
+
+    def prompt_block(self, max_lines: int = 8) -> str:
+        lines = []
+        for s in self.steps[:max_lines]:
+            what = f"{s['transfers']} transfer(s)" if s["transfers"] else "roll"
+            if s["chip"] in ("FH", "WC1", "WC2"):
+                what = f"{s['chip']} (rebuild squad)"
+            elif s["chip"]:
+                what += f" + {s['chip']}"
+            lines.append(f"GW{s['gw']}: {what} | FT {s['ft_before']}→{s['ft_after']}"
+                         + (f" | hit -{s['hit']}" if s["hit"] else "") + f" | +{s['gain']:.1f} xP")
+        chips = [f"{s['chip']} GW{s['gw']}" for s in self.steps if s["chip"]]
+        lines.append(f"CHIP TIMING: {', '.join(chips) or 'hold all'} | plan +{self.value - self.baseline:.1f} xP vs no moves")
+        return "\n".join(lines)
+
+
+def plan_season(players_df: pd.DataFrame, fixtures: list[dict], squad_ids: list[int], bank: float,
+                free_transfers: int, chips: dict, from_gw: int, recent: pd.DataFrame | None = None,
+                window: int = HORIZON, purchase_prices: dict | None = None) -> SeasonPlan:
+    """Exact DP (memoized on GW, FTs, chips left) over the value model described above."""
+    proj = project(players_df, fixtures, gw=from_gw, horizon=99, recent=recent)
+    gws, xp = proj.gws, proj.xp.astype(np.float64)
+    if not gws:
+        return SeasonPlan([], 0.0, 0.0)
+    L = len(gws)
+
+    search = TransferSearch(players_df, squad_ids, bank, free_transfers=99,   # hits are charged by the DP
+                            purchase_prices=purchase_prices)
+    ids, pos = search.ids, players_df["pos"].astype(str).to_numpy()
+    rows = search.squad_rows
+    budget10 = int(search.sell[rows].sum()) + search.bank10
+
+    xi, cap, bench = _xi_values(ids, pos, rows, xp)
+    win = np.stack([xp[:, t:t + window].sum(axis=1) for t in range(L)], axis=1)
+    fh, wc, moves = np.zeros(L), np.zeros(L), []
+    for t in range(L):
+        span_t = min(window, L - t)
+        moves.append([g / span_t for g in _top_moves(search.rescore(win[:, t]))])
+        for col, out, span in ((xp[:, t], fh, 1), (win[:, t], wc, window)):
+            sq = greedy_squad(col, pos, search.cost, search.club, budget10)
+            if sq is None:
+                continue
+            new_xi = _xi_values(ids, pos, sq, xp[:, t:t + span])[0]
+            out[t] = float(new_xi.sum() - xi[t:t + span].sum())
+    one_ft = np.array([m[0] if m else 0.0 for m in moves])
+    wc = np.maximum(0.0, wc - np.array([one_ft[t:t + window].sum() for t in range(L)]))
+    fh = np.maximum(0.0, fh)
+
+    chip_gain = {"TC": cap, "BB": bench, "FH": fh, "WC1": wc, "WC2": wc}
+    start_chips = tuple(c for c in CHIP_NAMES if chips.get(c))
+
+    def chip_ok(c: str, gw: int) -> bool:
+        return not ((c == "WC1" and gw > WC1_LAST_GW) or (c == "WC2" and gw <= WC1_LAST_GW))
+
+    @lru_cache(maxsize=None)
+    def best(t: int, ft: int, left: tuple[str, ...]) -> tuple[float, tuple]:
+        if t >= L:
+            return 0.0, ()
+        options = []
+        for c in (None,) + left:
+            if c and not chip_ok(c, gws[t]):
+                continue
+            rest = tuple(x for x in left if x != c)
+            if c in ("FH", "WC1", "WC2"):
+                # unlimited free transfers this GW; banked FTs are kept
+                v, path = best(t + 1, min(MAX_FT, ft + 1), rest)
+                options.append((chip_gain[c][t] + v, ((c, 0, 0, ft),) + path))
+                continue
+            for n in range(0, min(MAX_MOVES, len(moves[t])) + 1):
+                hit = HIT_COST * max(0, n - ft)
+                gain = sum(moves[t][:n]) - hit + (chip_gain[c][t] if c else 0.0)
+                v, path = best(t + 1, min(MAX_FT, max(0, ft - n) + 1), rest)
+                options.append((gain + v, ((c, n, hit, ft),) + path))
+        return max(options, key=lambda o: o[0])
+
+    total, path = best(0, int(free_transfers), start_chips)
+    steps = []
+    for t, (c, n, hit, ft) in enumerate(path):
+        gain = sum(moves[t][:n]) - hit + (chip_gain[c][t] if c else 0.0)
+        ft_after = min(MAX_FT, ft + 1) if c in ("FH", "WC1", "WC2") else min(MAX_FT, max(0, ft - n) + 1)
+        steps.append({"gw": int(gws[t]), "chip": c or "", "transfers": n, "ft_before": ft,
+                      "ft_after": ft_after, "hit": hit, "gain": round(float(gain), 2)})
+    baseline = float(xi.sum())
+    return SeasonPlan(steps, baseline + float(total), baseline)
@@ -0,0 +1,171 @@
+# fpl/ai_manager/routing.py
+# Per-task LLM routing. Each call site names a task; the task's route picks the fast or
+# strong model and carries a latency budget. Output that fails the caller's validation
+# is repaired (unparseable JSON) or escalated to the strong model. Per-route latency,
+# tokens, failures and escalations are tallied here and in fpl.metrics.
+from __future__ import annotations
+import re, threading, time
+from typing import Callable
+
+from config import FPL_LLM_FAST_MODEL, FPL_LLM_STRONG_MODEL, FPL_LLM_ROUTES
+from fpl import metrics
+
+FAST, STRONG = "fast", "strong"
+
+
+class Route:
+    def __init__(self, task: str, tier: str, budget_s: float, escalate: bool = True):
+        self.task, self.tier, self.budget_s, self.escalate = task, tier, float(budget_s), escalate
+
+
+# budget_s: what the call site can afford to wait (calls over it are counted, not cut off)
+ROUTES = {
+    "draft": Route("draft", STRONG, 90.0),                 # full 15 from the whole player table
+    "weekly": Route("weekly", FAST, 20.0),                 # pick one pre-checked option + XI
+    "weekly_single": Route("weekly_single", FAST, 20.0),   # free-form single transfer
+    "repair": Route("repair", FAST, 10.0, escalate=False), # turn a malformed reply into JSON
+    "explain": Route("explain", FAST, 20.0, escalate=False),  # account of an optimizer FH/WC squad
+    "chat": Route("chat", FAST, 15.0, escalate=False),
+}
+
+
+def _apply_overrides(spec: str):
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        task, _, tier = part.partition("=")
+        if task in ROUTES and tier in (FAST, STRONG):
+            ROUTES[task].tier = tier
+
+
+_apply_overrides(FPL_LLM_ROUTES)
+
+
+def tier_model(tier: str, model_name: str) -> str:
+    """The configured model for a tier; model_name (the caller's default) when unset."""
+    return (FPL_LLM_FAST_MODEL if tier == FAST else FPL_LLM_STRONG_MODEL) or model_name
+
+
+def model_for(task: str, model_name: str) -> str:
+    route = ROUTES.get(task)
+    return tier_model(route.tier, model_name) if route else model_name
+
+
+# ---------- per-route tallies ----------
+_lock = threading.Lock()
+_stats: dict[tuple[str, str], dict] = {}
+
+
+def record(task: str, model: str, seconds: float, prompt_tokens: float, completion_tokens: float):
+    route = ROUTES.get(task)
+    over = bool(route and seconds > route.budget_s)
+    with _lock:
+        s = _stats.setdefault((task, model), {"calls": 0, "seconds": 0.0, "max_s": 0.0, "prompt_tokens": 0.0,
+                                              "completion_tokens": 0.0, "failures": 0, "escalations": 0,
+                                              "over_budget": 0})
+        s["calls"] += 1
+        s["seconds"] += seconds
+        s["max_s"] = max(s["max_s"], seconds)
+        s["prompt_tokens"] += prompt_tokens
+        s["completion_tokens"] += completion_tokens
+        s["over_budget"] += over
+    metrics.observe("llm_route_seconds", seconds, task=task, model=model)
+    if over:
+        metrics.inc("llm_over_budget_total", task=task, model=model)
+
+
+def _count(task: str, model: str, field: str, metric: str):
+    with _lock:
+        if (task, model) in _stats:
+            _stats[(task, model)][field] += 1
+    metrics.inc(metric, task=task, model=model)
+
+
+def route_stats() -> list[dict]:
+    """One row per (task, model) used in this process."""
+    with _lock:
+        items = [(k, dict(v)) for k, v in _stats.items()]
+    rows = []
+    for (task, model), s in sorted(items):
+        n = max(1, s["calls"])
+        rows.append({"task": task, "model": model, "calls": s["calls"], "mean_s": round(s["seconds"] / n, 3),
+                     "max_s": round(s["max_s"], 3), "tokens": int(s["prompt_tokens"] + s["completion_tokens"]),
+                     "failures": s["failures"], "escalations": s["escalations"],
+                     "escalation_rate": round(s["escalations"] / n, 3), "over_budget": s["over_budget"]})
+    return rows
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+
+
+# ---------- calls ----------
+def invoke(llm, sys: str, usr: str, kind: str, model: str = "") -> str:
+    """llm.invoke with prompt size, token usage and latency recorded under `kind` (and the route)."""
+    chars = len(sys) + len(usr)
+    metrics.inc("llm_calls_total", kind=kind)
+    metrics.inc("llm_prompt_chars_total", chars, kind=kind)
+    t0 = time.perf_counter()
+    with metrics.span("llm_seconds", kind=kind):
+        resp = llm.invoke([{"role": "system", "content": sys}, {"role": "user", "content": usr}])
+    usage = getattr(resp, "usage_metadata", None) or {}
+    # ~4 chars/token when the client doesn't report usage (e.g. stubs)
+    prompt_tokens = usage.get("input_tokens", chars / 4)
+    completion_tokens = usage.get("output_tokens", len(resp.content) / 4)
+    metrics.inc("llm_prompt_tokens_total", prompt_tokens, kind=kind)
+    metrics.inc("llm_completion_tokens_total", completion_tokens, kind=kind)
+    record(kind, model, time.perf_counter() - t0, prompt_tokens, completion_tokens)
+    return resp.content
+
+
+_SCHEMA = re.compile(r"Return JSON ONLY:.*", re.S)
+
+_REPAIR_SYS = "You fix malformed model output. Return STRICT JSON only (no prose/markdown/code fences)."
+
+
+def _repair(make_llm: Callable, raw: str, usr: str, model_name: str) -> str:
+    m = _SCHEMA.search(usr)
+    schema = m.group(0) if m else "A single JSON object."
+    prompt = f"REQUIRED FORMAT:\n{schema}\n\nREPLY TO FIX:\n{raw[:6000]}\n\nReturn the same content as valid JSON."
+    model = model_for("repair", model_name)
+    return invoke(make_llm(model), _REPAIR_SYS, prompt, "repair", model)
+
+
+def call(task: str, sys: str, usr: str, model_name: str, make_llm: Callable, parse: Callable[[str], dict],
+         validate: Callable[[dict], tuple[bool, str]] | None = None) -> dict:
+    """
+    One routed call: the route's model, then (if the reply fails) a JSON repair when it
+    didn't parse, then one escalation to the strong model with the rejection reason.
+    `parse` returns {"error": ...} for unparseable text; `validate` returns (ok, why).
+    Returns the last parsed object (its "error"/invalid state is the caller's to handle).
+    """
+    route = ROUTES.get(task) or Route(task, STRONG, 60.0, escalate=False)
+
+    def check(obj: dict) -> tuple[bool, str]:
+        if obj.get("error"):
+            return False, str(obj["error"])
+        return validate(obj) if validate else (True, "")
+
+    model = tier_model(route.tier, model_name)
+    raw = invoke(make_llm(model), sys, usr, task, model)
+    obj = parse(raw)
+    ok, why = check(obj)
+    if ok:
+        return obj
+    _count(task, model, "failures", "llm_validation_failures_total")
+
+    if obj.get("error") == "parse":
+        obj = parse(_repair(make_llm, raw, usr, model_name))
+        ok, why = check(obj)
+        if ok:
+            return obj
+
+    strong = tier_model(STRONG, model_name)
+    if not route.escalate or strong == model:
+        return obj
+    _count(task, model, "escalations", "llm_escalations_total")
+    retry = f"{usr}\n\nA previous answer was rejected ({why[:300]}). Follow every rule above."
+    obj = parse(invoke(make_llm(strong), sys, retry, task, strong))
+    ok, _ = check(obj)
+    if not ok:
+        _count(task, strong, "failures", "llm_validation_failures_total")
+    return obj
@@ -0,0 +1,270 @@
+# fpl/ai_manager/transfers.py
+# Exhaustive legal transfer search: every single and every pair of transfers,
+# checked with per-position price arrays and club-count masks, ranked by score gain.
+from __future__ import annotations
+import itertools
+import numpy as np
+import pandas as pd
+
+from fpl.ai_manager.core import SQUAD_SHAPE, MAX_PER_CLUB
+
+HIT_COST = 4
+POS_CODES = {p: i for i, p in enumerate(SQUAD_SHAPE)}
+
+
+def selling_price10(now10: int, bought10: int | None) -> int:
+    """FPL sale price in tenths: purchase price plus half the rise (rounded down); falls are passed on in full."""
+    if bought10 is None or now10 <= bought10:
+        return now10
+    return bought10 + (now10 - bought10) // 2
+
+
+def _score_column(players_df: pd.DataFrame) -> str:
+    return "xp_horizon" if "xp_horizon" in players_df.columns else "form"
+
+
+class TransferSearch:
+    """
+    All legal 1- and 2-transfer moves for a squad, in tenths of £m to keep budget
+    checks exact. `gain` is score(in) − score(out) − hit cost; the score defaults to
+    the projected points over the horizon (fpl.projection), else form. Outgoing
+    players are sold at their selling price when `purchase_prices` is given.
+    """
+
+    def __init__(self, players_df: pd.DataFrame, squad_ids: list[int], bank: float,
+                 free_transfers: int, score_col: str | None = None, purchase_prices: dict | None = None):
+        self.score_col = score_col or _score_column(players_df)
+        self.ids = players_df["id"].to_numpy(dtype=np.int64)
+        self.names = players_df["web_name"].astype(str).to_numpy()
+        self.pos = players_df["pos"].astype(str).map(POS_CODES).to_numpy(dtype=np.int8)
+        self.cost = np.rint(players_df["price"].to_numpy(dtype=np.float64) * 10).astype(np.int32)
+        self.club = players_df["team_short"].astype("category").cat.codes.to_numpy(dtype=np.int16)
+        self.score = pd.to_numeric(players_df[self.score_col], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+        self.row_of = {int(pid): i for i, pid in enumerate(self.ids)}
+        self.available = players_df["status"].astype(str).to_numpy() == "a"
+
+        self.squad_ids = [int(x) for x in squad_ids]
+        # ids missing from players_df can't be scored or sold, but they stay in the squad (see apply)
+        self.squad_rows = np.array([self.row_of[x] for x in self.squad_ids if x in self.row_of], dtype=np.int64)
+        self.bank10 = int(round(float(bank) * 10))
+        # what each row fetches when sold: its price, or purchase price + half the rise for squad players
+        self.sell = self.cost.copy()
+        owned = set(self.squad_ids)
+        for pid, bought in (purchase_prices or {}).items():
+            r = self.row_of.get(int(pid))
+            if r is not None and int(pid) in owned:
+                self.sell[r] = selling_price10(int(self.cost[r]), int(round(float(bought) * 10)))
+        self.free_transfers = int(free_transfers)
+        self.club_counts = np.bincount(self.club[self.squad_rows], minlength=int(self.club.max()) + 1)
+        in_squad = np.zeros(len(self.ids), dtype=bool)
+        in_squad[self.squad_rows] = True
+        self.cand_rows = np.flatnonzero(~in_squad)
+        self.pair_rows = self._pair_pool()
+
+    def rescore(self, score: np.ndarray) -> "TransferSearch":
+        """Swap in another per-row score (e.g. xP over a later window) and rebuild the pair pool."""
+        self.score = np.asarray(score, dtype=np.float64)
+        self.pair_rows = self._pair_pool()
+        return self
+
+    def hit(self, n: int) -> int:
+        return HIT_COST * max(0, n - self.free_transfers)
+
+    # ---------- singles ----------
+    def singles(self):
+        """Arrays (out_rows, in_rows, gain, spend10) for every legal single transfer."""
+        S, C = self.squad_rows, self.cand_rows
+        same = self.pos[S][:, None] == self.pos[C][None, :]
+        spend = self.cost[C][None, :] - self.sell[S][:, None]
+        afford = spend <= self.bank10
+        club_after = (self.club_counts[self.club[C]][None, :]
+                      - (self.club[S][:, None] == self.club[C][None, :]) + 1)
+        o, i = np.nonzero(same & afford & (club_after <= MAX_PER_CLUB))
+        gain = self.score[C[i]] - self.score[S[o]] - self.hit(1)
+        return S[o], C[i], gain, spend[o, i]
+
+    # ---------- pairs ----------
+    def _pair_pool(self) -> np.ndarray:
+        """
+        Candidates that can appear in a best pair. If two same-position, same-club
+        candidates are both no dearer and no worse than x, any pair using x can swap
+        it for one of them (same club effect, same budget or less), so x never wins.
+        """
+        C = self.cand_rows
+        cost, score = self.cost[C], self.score[C]
+        group = self.pos[C].astype(np.int32) * 1000 + self.club[C]
+        same = group[:, None] == group[None, :]
+        no_dearer = cost[:, None] <= cost[None, :]          # [d, x]: d costs <= x
+        no_worse = score[:, None] >= score[None, :]
+        strictly = (cost[:, None] < cost[None, :]) | (score[:, None] > score[None, :])
+        tie_break = np.arange(len(C))[:, None] < np.arange(len(C))[None, :]
+        dominates = same & no_dearer & no_worse & (strictly | tie_break)
+        return C[dominates.sum(axis=0) < 2]
+
+    def _in_pairs(self, p: int, q: int):
+        """Candidate in-pairs (x with pos p, y with pos q); unordered when p == q."""
+        xs = self.pair_rows[self.pos[self.pair_rows] == p]
+        ys = self.pair_rows[self.pos[self.pair_rows] == q]
+        if p == q:
+            a, b = np.triu_indices(len(xs), k=1)
+            return xs[a], xs[b]
+        return np.repeat(xs, len(ys)), np.tile(ys, len(xs))
+
+    def pairs(self, top_per_group: int = 50):
+        """
+        Every legal pair over the non-dominated pool (see _pair_pool) is checked; the
+        best `top_per_group` per (out-pair positions) are returned as
+        (out_a, out_b, in_x, in_y, gain, spend10) plus the number of legal pairs scored.
+        """
+        S = self.squad_rows
+        out_pairs = np.array(list(itertools.combinations(range(len(S)), 2)), dtype=np.int64)
+        a, b = S[out_pairs[:, 0]], S[out_pairs[:, 1]]
+        # orient each out pair so pos[a] <= pos[b]
+        swap = self.pos[a] > self.pos[b]
+        a, b = np.where(swap, b, a), np.where(swap, a, b)
+        hit = self.hit(2)
+        res, legal_total = [], 0
+        for p, q in sorted(set(zip(self.pos[a].tolist(), self.pos[b].tolist()))):
+            sel = (self.pos[a] == p) & (self.pos[b] == q)
+            oa, ob = a[sel], b[sel]
+            x, y = self._in_pairs(p, q)
+            if len(x) == 0:
+                continue
+            cx, cy = self.club[x], self.club[y]
+            in_cost = self.cost[x] + self.cost[y]
+            in_score = self.score[x] + self.score[y]
+            # (n_outpairs, n_inpairs) boolean masks
+            legal = in_cost[None, :] <= (self.bank10 + self.sell[oa] + self.sell[ob])[:, None]
+            ca, cb = self.club[oa][:, None], self.club[ob][:, None]
+            same_xy = cx == cy
+            for cz in (cx, cy):
+                # outgoing same-club players needed to stay within MAX_PER_CLUB
+                need = self.club_counts[cz] + 1 + same_xy - MAX_PER_CLUB
+                hit_a, hit_b = ca == cz, cb == cz
+                legal &= ((need <= 0)[None, :] | ((need == 1)[None, :] & (hit_a | hit_b))
+                          | ((need == 2)[None, :] & hit_a & hit_b))
+            n_legal = int(legal.sum())
+            legal_total += n_legal
+            if not n_legal:
+                continue
+            gain = np.where(legal, in_score[None, :] - (self.score[oa] + self.score[ob])[:, None] - hit, -np.inf)
+            flat = gain.ravel()
+            k = min(top_per_group, n_legal)
+            best = np.argpartition(-flat, k - 1)[:k]
+            r, c = np.unravel_index(best, gain.shape)
+            res.append((oa[r], ob[r], x[c], y[c], flat[best], in_cost[c] - self.sell[oa[r]] - self.sell[ob[r]]))
+        if not res:
+            empty = np.zeros(0, dtype=np.int64)
+            return (empty, empty, empty, empty, np.zeros(0), empty), 0
+        return tuple(np.concatenate(parts) for parts in zip(*res)), legal_total
+
+    # ---------- shortlist / validation ----------
+    def _move(self, outs, ins, gain: float, spend10: int) -> dict:
+        return {
+            "out_ids": [int(self.ids[r]) for r in outs],
+            "in_ids": [int(self.ids[r]) for r in ins],
+            "out_names": [self.names[r] for r in outs],
+            "in_names": [self.names[r] for r in ins],
+            "gain": round(float(gain), 2),
+            "spend": int(spend10) / 10.0,
+            "hit": self.hit(len(outs)),
+        }
+
+    def shortlist(self, k: int = 10, max_transfers: int = 2, similar=None) -> list[dict]:
+        """
+        Best-first legal moves (HOLD always included), at most one option per set of
+        outgoing players. With a fpl.similarity.SimilarityIndex, each unavailable squad
+        player also gets its closest affordable like-for-like replacement, tagged.
+        """
+        so, si, sg, ss = self.singles()
+        self.n_singles = len(sg)
+        outs = [so[:, None]]
+        ins = [si[:, None]]
+        gains, spends = [sg], [ss]
+        self.n_pairs = 0
+        if max_transfers >= 2:
+            (pa, pb, px, py, pg, ps), self.n_pairs = self.pairs(top_per_group=k * 15)
+            outs.append(np.stack([pa, pb], axis=1))
+            ins.append(np.stack([px, py], axis=1))
+            gains.append(pg)
+            spends.append(ps)
+        gain = np.concatenate(gains)
+        spend = np.concatenate(spends)
+        order = np.argsort(-gain, kind="stable")
+        out = [self._move([], [], 0.0, 0)]   # HOLD is always on offer
+        outs_seen = {frozenset()}
+        for j in order:
+            if len(out) >= k:
+                break
+            grp, jj = (0, j) if j < len(sg) else (1, j - len(sg))
+            o, i = outs[grp][jj], ins[grp][jj]
+            key = frozenset(o.tolist())
+            if key not in outs_seen:
+                outs_seen.add(key)
+                out.append(self._move(o, i, gain[j], spend[j]))
+        if similar is not None:
+            out += self._like_for_like(similar, outs_seen)
+        out.sort(key=lambda m: -m["gain"])
+        self.offered = {(frozenset(m["out_ids"]), frozenset(m["in_ids"])) for m in out}
+        return out
+
+    def _like_for_like(self, similar, outs_seen: set) -> list[dict]:
+        squad = [int(self.ids[r]) for r in self.squad_rows]
+        extra = []
+        for r in self.squad_rows:
+            pid = int(self.ids[r])
+            if self.available[r] or frozenset([r]) in outs_seen:
+                continue
+            bank = (self.bank10 - int(self.cost[r] - self.sell[r])) / 10.0   # replacements() adds the current price
+            for in_id in similar.replacements(pid, squad, bank, k=3):
+                if in_id in self.row_of and self.is_legal([pid], [in_id]):
+                    ri = self.row_of[in_id]
+                    m = self._move([r], [ri], self.score[ri] - self.score[r] - self.hit(1),
+                                   self.cost[ri] - self.sell[r])
+                    m["tag"] = "like-for-like"
+                    extra.append(m)
+                    break
+        return extra
+
+    def is_legal(self, out_ids: list[int], in_ids: list[int]) -> bool:
+        """Shortlist membership, else the same position/budget/club rules applied directly."""
+        outs, ins = [int(x) for x in out_ids], [int(x) for x in in_ids]
+        if (frozenset(outs), frozenset(ins)) in getattr(self, "offered", set()):
+            return True
+        if len(outs) != len(ins) or len(set(outs)) != len(outs) or len(set(ins)) != len(ins):
+            return False
+        squad = {int(self.ids[r]) for r in self.squad_rows}
+        if not set(outs) <= squad or set(ins) & squad or any(x not in self.row_of for x in ins):
+            return False
+        ro = [self.row_of[x] for x in outs]
+        ri = [self.row_of[x] for x in ins]
+        if sorted(self.pos[ro].tolist()) != sorted(self.pos[ri].tolist()):
+            return False
+        if int(self.cost[ri].sum() - self.sell[ro].sum()) > self.bank10:
+            return False
+        counts = self.club_counts.copy()
+        np.subtract.at(counts, self.club[ro], 1)
+        np.add.at(counts, self.club[ri], 1)
+        return bool(counts.max() <= MAX_PER_CLUB)
+
+    def apply(self, out_ids: list[int], in_ids: list[int]) -> tuple[list[int], float]:
+        """New squad ids (always the same size as the old squad) and bank after a legal move (outs at selling price)."""
+        outs = {int(x) for x in out_ids}
+        squad = [x for x in self.squad_ids if x not in outs] + [int(x) for x in in_ids]
+        spend10 = sum(int(self.cost[self.row_of[int(x)]]) for x in in_ids) - sum(int(self.sell[self.row_of[int(x)]]) for x in out_ids)
+        return squad, (self.bank10 - spend10) / 10.0
+
+
+def format_shortlist(moves: list[dict]) -> str:
+    lines = []
+    for n, m in enumerate(moves, start=1):
+        if not m["out_ids"]:
+            lines.append(f"T{n}: HOLD | gain +0.0")
+            continue
+        names = ", ".join(f"{o}→{i}" for o, i in zip(m["out_names"], m["in_names"]))
+        lines.append(
+            f"T{n}: out_ids={m['out_ids']} in_ids={m['in_ids']} ({names}) | "
+            f"gain {m['gain']:+.1f} | spend £{m['spend']:+.1f}m | hit -{m['hit']}"
+            + (f" | {m['tag']}" if m.get("tag") else "")
+        )
+    return "\n".join(lines)
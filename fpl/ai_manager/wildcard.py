@@ -0,0 +1,393 @@
+# fpl/ai_manager/wildcard.py
+# Exact full-squad optimizer behind the wildcard and free hit: the 15 that maximizes
+# projected points (XI in full, bench at BENCH_WEIGHT) under the 2/5/5/3 shape, the
+# budget and ≤3 per club, with optional locked and banned players.
+#
+# Without the club cap the problem splits by position: a 0/1 knapsack per position
+# over (starters, bench, cost in tenths), joined per formation by max-plus
+# convolution. The club cap is priced in instead (Lagrangian penalty per club, tuned
+# by subgradient steps), which gives an upper bound per branch-and-bound node; nodes
+# split on an over-full club (ban its i-th best pick, lock the ones before it) or on
+# one player of a penalized club, until no open node's bound beats the best squad.
+# Only players of penalized ("hot") clubs are re-run through the knapsack per node;
+# everyone else is a cached prefix. The captain is not part of the objective.
+from __future__ import annotations
+import heapq, re, time
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from fpl.ai_manager.core import SQUAD_SHAPE, MAX_PER_CLUB, VALID_FORMATIONS
+from fpl.ai_manager.planner import WC1_LAST_GW
+from fpl.ai_manager.transfers import POS_CODES, selling_price10
+
+BENCH_WEIGHT = 0.1     # share of bench xP counted (auto-sub cover)
+MAX_NODES = 500        # branch-and-bound node limit; the best squad so far is returned past it
+SUBGRADIENT_STEPS = 12 # penalty updates per node (the root gets twice as many)
+
+_POS = list(SQUAD_SHAPE)
+# starters per position code for each formation (GK always 1)
+_STARTS = [(1, d, m, f) for d, m, f in sorted(VALID_FORMATIONS)]
+_EPS = 1e-9
+
+
+class SquadPick:
+    """best_squad result: the 15, spend, objective and how the search went."""
+
+    def __init__(self, ids: list[int], cost10: int, value: float, formation: tuple,
+                 nodes: int, exact: bool, seconds: float):
+        self.ids = ids
+        self.cost10 = cost10
+        self.value = value            # XI score + BENCH_WEIGHT × bench score
+        self.formation = formation    # formation the objective was scored with
+        self.nodes = nodes
+        self.exact = exact            # False when MAX_NODES stopped the search
+        self.seconds = seconds
+
+
+def _dominated(score: np.ndarray, cost: np.ndarray, club: np.ndarray, n_pos: int) -> np.ndarray:
+    """
+    Rows that can't be in an optimal squad. Say k dominates j when it is no dearer and
+    no worse (ties broken by row). If j's dominators span ≥ n_pos + 4 clubs, then in any
+    squad holding j at least one of them is outside the squad and not in a full club
+    (≤ n_pos − 1 are in it, ≤ 4 other clubs can be full), so swapping j for it loses nothing.
+    """
+    n = len(score)
+    if n <= n_pos:
+        return np.zeros(n, dtype=bool)
+    idx = np.arange(n)
+    better = ((score[None, :] > score[:, None])
+              | ((score[None, :] == score[:, None])
+                 & ((cost[None, :] < cost[:, None]) | ((cost[None, :] == cost[:, None]) & (idx[None, :] < idx[:, None])))))
+    dom = (better & (cost[None, :] <= cost[:, None])).astype(np.int32)   # dom[j, k]: k dominates j
+    clubs = np.zeros((n, int(club.max()) + 1), dtype=np.int32)
+    clubs[idx, club] = 1
+    return ((dom @ clubs) > 0).sum(axis=1) >= n_pos + 4
+
+
+def _maxplus(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """out[c] = max over x ≤ c of a[x] + b[c − x] (same length)."""
+    n = len(a)
+    win = sliding_window_view(np.concatenate([np.full(n - 1, -np.inf), b]), n)[:, ::-1]
+    return (win + a[None, :]).max(axis=1)
+
+
+def _best_split(a: np.ndarray, b: np.ndarray, c: int) -> tuple[float, int]:
+    """(max over x of a[x] + b[c − x], that x)."""
+    v = a[:c + 1] + b[c::-1]
+    x = int(np.argmax(v))
+    return float(v[x]), x
+
+
+def _knapsack(T: np.ndarray, rows, cost, starter, bench, locked) -> tuple[np.ndarray, np.ndarray]:
+    """Add `rows` to table T[starters, bench, spend ≤ c]; returns (T, take) with take 1/2 = starter/bench."""
+    cap = T.shape[2] - 1
+    take = np.zeros((len(rows),) + T.shape, dtype=np.int8)
+    for i, r in enumerate(rows):
+        c = int(cost[r])
+        if c > cap:
+            if r in locked:
+                T = np.full_like(T, -np.inf)
+            continue
+        new = np.full_like(T, -np.inf) if r in locked else T.copy()
+        for role, (dst, src, val) in ((1, (np.s_[1:, :, c:], np.s_[:-1, :, :cap + 1 - c], starter[r])),
+                                      (2, (np.s_[:, 1:, c:], np.s_[:, :-1, :cap + 1 - c], bench[r]))):
+            cand = T[src] + val
+            hit = cand > new[dst]
+            new[dst][hit] = cand[hit]
+            take[i][dst][hit] = role
+        T = new
+    return T, take
+
+
+class _Solver:
+    """
+    Arrays for one solve. `relax(bans, locks, lam)` is the club-cap-free squad with
+    each hot club's players charged lam[club]; bans and locks only ever name hot players.
+    """
+
+    def __init__(self, pos, cost, club, score, budget10: int, bench_weight: float):
+        self.pos, self.cost, self.club, self.score = pos, cost, club, score
+        self.bench = score * float(bench_weight)
+        self.budget, self.w = int(budget10), float(bench_weight)
+        self.rows = [np.flatnonzero(pos == p) for p in range(len(_POS))]
+        self.need = [SQUAD_SHAPE[p] for p in _POS]
+        self.starts = [sorted({s[p] for s in _STARTS}) for p in range(len(_POS))]
+        # cheapest possible spend per position bounds every other position's cap
+        self.lo = [int(np.sort(cost[r])[:n].sum()) if len(r) >= n else None for r, n in zip(self.rows, self.need)]
+        self.slack = self.budget - sum(self.lo) if None not in self.lo else -1
+        self.hot: set[int] = set()
+        self._prefix: dict[int, tuple] = {}
+
+    def heat(self, clubs) -> None:
+        """Move clubs into the penalized set (their players leave the cached prefix)."""
+        clubs = set(clubs)
+        if clubs - self.hot:
+            self.hot |= clubs
+            self._prefix.clear()
+
+    def _split(self, p: int):
+        if p not in self._prefix:
+            rows = self.rows[p]
+            hot = np.isin(self.club[rows], list(self.hot))
+            n, S, B = self.need[p], max(self.starts[p]), self.need[p] - min(self.starts[p])
+            T = np.full((S + 1, B + 1, self.lo[p] + self.slack + 1), -np.inf)
+            T[0, 0, :] = 0.0
+            cold = rows[~hot]
+            T, take = _knapsack(T, cold, self.cost, self.score, self.bench, ())
+            self._prefix[p] = (T, cold, take, rows[hot])
+        return self._prefix[p]
+
+    def _table(self, p: int, bans, locks, lam: dict):
+        T, cold, cold_take, hot = self._split(p)
+        hot = np.array([r for r in hot if r not in bans], dtype=np.int64)
+        pen = np.array([lam.get(int(self.club[r]), 0.0) for r in hot])
+        starter, bench = np.zeros(len(self.score)), np.zeros(len(self.score))
+        starter[hot], bench[hot] = self.score[hot] - pen, self.bench[hot] - pen
+        T, hot_take = _knapsack(T, hot, self.cost, starter, bench, locks)
+        n, lo = self.need[p], self.lo[p]
+        cols = {s: T[s, n - s, lo:] for s in self.starts[p] if n - s < T.shape[1]}
+        return cols, (cold, cold_take), (hot, hot_take)
+
+    def _pick(self, p: int, tab, s: int, c: int) -> list[int]:
+        """Backtrack the rows position p used for s starters at spend ≤ c (offset by lo)."""
+        b, c, out = self.need[p] - s, c + self.lo[p], []
+        for rows, take in (tab[2], tab[1]):
+            for i in range(len(rows) - 1, -1, -1):
+                t = take[i, s, b, c]
+                if t == 0:
+                    continue
+                s, b = (s - 1, b) if t == 1 else (s, b - 1)
+                out.append(int(rows[i]))
+                c -= int(self.cost[rows[i]])
+        return out
+
+    def relax(self, bans, locks, lam: dict):
+        """(penalized value, rows, formation), or None when no squad fits."""
+        if self.slack < 0:
+            return None
+        k = self.slack + 1
+        tabs = [self._table(p, bans, locks, lam) for p in range(len(_POS))]
+        gk = tabs[0][0][1][:k]
+        gd = {d: _maxplus(gk, tabs[1][0][d][:k]) for d in self.starts[1]}
+        best = None
+        for _, d, m, f in _STARTS:
+            v, x = _best_split(gd[d], _maxplus(tabs[2][0][m][:k], tabs[3][0][f][:k]), self.slack)
+            if np.isfinite(v) and (best is None or v > best[0]):
+                best = (v, x, (d, m, f))
+        if best is None:
+            return None
+        v, x, (d, m, f) = best
+        # walk the convolutions back to a spend per position
+        _, xg = _best_split(gk, tabs[1][0][d][:k], x)
+        _, xm = _best_split(tabs[2][0][m][:k], tabs[3][0][f][:k], self.slack - x)
+        spend = [xg, x - xg, xm, self.slack - x - xm]
+        rows = []
+        for p, s in enumerate((1, d, m, f)):
+            rows += self._pick(p, tabs[p], s, spend[p])
+        return v, rows, (d, m, f)
+
+    def value(self, rows) -> tuple[float, tuple]:
+        """True objective (and formation) of a 15."""
+        by = [np.sort(self.score[[r for r in rows if self.pos[r] == p]])[::-1] for p in range(len(_POS))]
+        total = sum(float(s.sum()) for s in by)
+        best = None
+        for st in _STARTS:
+            xi = sum(float(by[p][:n].sum()) for p, n in enumerate(st))
+            v = xi + self.w * (total - xi)
+            if best is None or v > best[0]:
+                best = (v, st[1:])
+        return best
+
+
+def best_squad(players_df: pd.DataFrame, score: str | np.ndarray, budget10: int,
+               lock=(), ban=(), bench_weight: float = BENCH_WEIGHT, max_nodes: int = MAX_NODES
+               ) -> SquadPick | None:
+    """
+    The optimal 15 for `score` (a column name or per-row array) within `budget10`
+    (tenths of £m). `lock` ids must be in it, `ban` ids must not. None when no legal
+    squad exists (e.g. locks over the club cap or over budget).
+    """
+    t0 = time.perf_counter()
+    ids = players_df["id"].to_numpy(dtype=np.int64)
+    pos = players_df["pos"].astype(str).map(POS_CODES).fillna(-1).to_numpy(dtype=np.int8)
+    cost = np.rint(players_df["price"].to_numpy(dtype=np.float64) * 10).astype(np.int64)
+    club = players_df["team_short"].astype("category").cat.codes.to_numpy(dtype=np.int64)
+    if isinstance(score, str):
+        score = pd.to_numeric(players_df[score], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+    score = np.asarray(score, dtype=np.float64)
+
+    row_of = {int(pid): i for i, pid in enumerate(ids)}
+    lock = {int(x) for x in lock}
+    if not lock <= row_of.keys():
+        return None
+    locked = [row_of[x] for x in lock]
+    if locked and np.bincount(club[locked]).max() > MAX_PER_CLUB:
+        return None
+    keep = pos >= 0
+    keep[[row_of[int(x)] for x in ban if int(x) in row_of and int(x) not in lock]] = False
+    for p, name in enumerate(_POS):
+        r = np.flatnonzero(keep & (pos == p))
+        keep[r[_dominated(score[r], cost[r], club[r], SQUAD_SHAPE[name])]] = False
+    keep[locked] = True
+    rows = np.flatnonzero(keep)
+    local = {int(r): i for i, r in enumerate(rows)}
+
+    solver = _Solver(pos[rows], cost[rows], club[rows], score[rows], budget10, bench_weight)
+    sub_club = solver.club
+    solver.heat(int(sub_club[local[r]]) for r in locked)
+    best = None            # (value, rows, formation)
+    nodes, exact = 0, True
+
+    def evaluate(bans, locks, lam, steps):
+        """Subgradient on the hot clubs' penalties: (bound, lam, rows) of the tightest one, or None."""
+        nonlocal best
+        lam, top, step = dict(lam), None, None
+        while steps > 0:
+            res = solver.relax(bans, locks, lam)
+            if res is None:
+                return None
+            v, picked, _ = res
+            counts = np.bincount(sub_club[picked], minlength=int(sub_club.max()) + 1)
+            cold_over = [c for c in np.flatnonzero(counts > MAX_PER_CLUB) if c not in solver.hot]
+            if cold_over:                 # a new club over the cap: price it in and re-solve
+                solver.heat(int(c) for c in cold_over)
+                continue
+            steps -= 1
+            bound = v + MAX_PER_CLUB * sum(lam.values())
+            if top is None or bound < top[0]:
+                top = (bound, dict(lam), picked)
+            if counts.max() <= MAX_PER_CLUB:
+                real = solver.value(picked)
+                if best is None or real[0] > best[0]:
+                    best = (real[0], picked, real[1])
+            g = {c: int(counts[c]) - MAX_PER_CLUB for c in solver.hot}
+            g = {c: x for c, x in g.items() if x > 0 or lam.get(c, 0.0) > 0}
+            if not g or (best is not None and top[0] <= best[0] + _EPS):
+                break
+            # first step Polyak-sized (towards the best squad so far, or 5% under the bound), then decaying
+            target = best[0] if best is not None else 0.95 * bound
+            step = max(bound - target, 0.05) / sum(x * x for x in g.values()) if step is None else step * 0.8
+            lam = {c: max(0.0, lam.get(c, 0.0) + step * g.get(c, 0)) for c in solver.hot}
+        return top
+
+    root = evaluate(frozenset(), frozenset(local[r] for r in locked), {}, 2 * SUBGRADIENT_STEPS)
+    heap = [] if root is None else [(-root[0], 0, frozenset(), frozenset(local[r] for r in locked), root)]
+    tie = 1
+    while heap:
+        _, _, bans, locks, (bound, lam, picked) = heapq.heappop(heap)
+        if best is not None and bound <= best[0] + _EPS:
+            break
+        nodes += 1
+        if nodes > max_nodes:
+            exact = False
+            break
+        counts = np.bincount(sub_club[picked])
+        over = int(np.argmax(counts))
+        if counts[over] > MAX_PER_CLUB:
+            # at most MAX_PER_CLUB − (#locked) of the free picks can stay: branch on the first one dropped
+            free = sorted((r for r in picked if sub_club[r] == over and r not in locks),
+                          key=lambda r: -solver.score[r])
+            n_fixed = sum(1 for r in picked if sub_club[r] == over and r in locks)
+            children = [(bans | {free[i]}, locks | frozenset(free[:i]))
+                        for i in range(MAX_PER_CLUB + 1 - n_fixed)]
+        else:
+            # squad fits the cap but the penalties leave a gap: split on the best free hot player
+            free = [r for r in range(len(rows)) if sub_club[r] in solver.hot and r not in bans and r not in locks]
+            if not free:
+                continue
+            j = max(free, key=lambda r: (r in picked, solver.score[r]))
+            children = [(bans | {j}, locks), (bans, locks | {j})]
+        for c_bans, c_locks in children:
+            res = evaluate(c_bans, c_locks, lam, SUBGRADIENT_STEPS)
+            if res is not None and (best is None or res[0] > best[0] + _EPS):
+                heapq.heappush(heap, (-res[0], tie, c_bans, c_locks, res))
+                tie += 1
+    if best is None:
+        return None
+    v, picked, form = best
+    picked_rows = rows[picked]
+    return SquadPick([int(x) for x in ids[picked_rows]], int(cost[picked_rows].sum()), float(v), tuple(form),
+                     nodes, exact, time.perf_counter() - t0)
+
+
+# ---------- chips ----------
+SQUAD_CHIPS = ("FH", "WC1", "WC2")
+UNAVAILABLE = ("i", "s", "u", "n")    # statuses left out of a rebuild unless locked
+
+_CHIP_ASK = re.compile(r"\b(?:play|use|activate|trigger)\s+(?:the\s+|my\s+|a\s+)?(wild\s?card|wc|free\s?hit|fh)\b", re.I)
+_LOCK = re.compile(r"\b(?:lock|keep|must have|include)\b:?\s*([^.;\n]+)", re.I)
+_BAN = re.compile(r"\b(?:ban|avoid|exclude|without)\b:?\s*([^.;\n]+)", re.I)
+_NEGATED = re.compile(r"\b(?:don't|do not|never|not|no)\s+$", re.I)
+
+
+def squad_budget10(players_df: pd.DataFrame, squad_ids: list[int], bank: float,
+                   purchase_prices: dict | None = None) -> int:
+    """Bank plus the squad's selling value, in tenths. Without purchase prices, current price is the sale price."""
+    price = dict(zip(players_df["id"].astype(int), np.rint(players_df["price"].to_numpy(dtype=np.float64) * 10).astype(int)))
+    bought = {int(k): int(round(float(v) * 10)) for k, v in (purchase_prices or {}).items()}
+    return int(round(float(bank) * 10)) + sum(selling_price10(int(price[p]), bought.get(p))
+                                              for p in map(int, squad_ids) if p in price)
+
+
+def squad_value(players_df: pd.DataFrame, squad_ids: list[int], score_col: str,
+                bench_weight: float = BENCH_WEIGHT) -> float:
+    """best_squad's objective for a given 15 (best formation, bench at bench_weight)."""
+    sub = players_df[players_df["id"].isin([int(x) for x in squad_ids])]
+    vals = pd.to_numeric(sub[score_col], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+    pos = sub["pos"].astype(str).to_numpy()
+    by = [np.sort(vals[pos == p])[::-1] for p in _POS]
+    total, best = float(vals.sum()), 0.0
+    for st in _STARTS:
+        if all(len(by[p]) >= n for p, n in enumerate(st)):
+            xi = sum(float(by[p][:n].sum()) for p, n in enumerate(st))
+            best = max(best, xi + bench_weight * (total - xi))
+    return best
+
+
+def chip_request(note: str | None, gw: int) -> str | None:
+    """'FH' / 'WC1' / 'WC2' when the manager note asks to play one ("use my wildcard")."""
+    m = _CHIP_ASK.search(note or "")
+    if not m or _NEGATED.search(note[:m.start()]):
+        return None
+    if m.group(1).lower().replace(" ", "") in ("freehit", "fh"):
+        return "FH"
+    return "WC1" if gw <= WC1_LAST_GW else "WC2"
+
+
+def lock_ban(note: str | None, players_df: pd.DataFrame) -> tuple[list[int], list[int]]:
+    """
+    Player ids the note locks in ("keep Salah, Palmer") or rules out ("avoid Haaland"),
+    matched on web_name. A name shared by several players bans all of them and locks none.
+    """
+    if not note:
+        return [], []
+    by_name: dict[str, list[int]] = {}
+    for pid, name in zip(players_df["id"].astype(int), players_df["web_name"].astype(str)):
+        by_name.setdefault(name.lower(), []).append(pid)
+
+    def matches(rx) -> list[list[int]]:
+        return [by_name.get(part.strip().lower(), []) for m in rx.finditer(note)
+                for part in re.split(r",|\band\b|&|/", m.group(1))]
+
+    lock = [ids[0] for ids in matches(_LOCK) if len(ids) == 1]
+    ban = [p for ids in matches(_BAN) for p in ids if p not in lock]
+    return sorted(set(lock)), sorted(set(ban))
+
+
+def chip_squad(players_df: pd.DataFrame, state: dict, chip: str, note: str | None = None
+               ) -> tuple[SquadPick | None, float]:
+    """
+    The squad to play `chip` with, and its objective gain over the current 15.
+    FH optimizes next-GW xP (the squad reverts afterwards), a wildcard xP over the
+    projection horizon; either falls back to form without projections.
+    """
+    cols = players_df.columns
+    col = ("xp_next" if chip == "FH" else "xp_horizon") if "xp_next" in cols and "xp_horizon" in cols else "form"
+    lock, ban = lock_ban(note, players_df)
+    ban += [int(p) for p, s in zip(players_df["id"], players_df["status"].astype(str)) if s in UNAVAILABLE]
+    budget10 = squad_budget10(players_df, state["squad"], state["bank"], state.get("purchase_prices"))
+    pick = best_squad(players_df, col, budget10, lock=lock, ban=ban)
+    if pick is None:
+        return None, 0.0
+    return pick, pick.value - squad_value(players_df, state["squad"], col)
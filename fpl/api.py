@@ -1,24 +1,218 @@
 # fpl/api.py
+import os, threading, time
 import requests
 from functools import lru_cache
 
-FPL_API = "https://fantasy.premierleague.com/api"
+from config import FPL_TRANSPORT, FPL_SNAPSHOT_DIR, FPL_REPLAY_LATENCY, FPL_REPLAY_ERROR_RATE
+from fpl import metrics
+from fpl.transport import make_transport
+
+FPL_API = os.getenv("FPL_API_BASE", "https://fantasy.premierleague.com/api").rstrip("/")
 REQ_TIMEOUT = 10  # seconds
+RATE_PER_SEC = float(os.getenv("FPL_API_RATE", "10"))        # steady-state requests/sec
+MAX_CONCURRENCY = int(os.getenv("FPL_API_CONCURRENCY", "8"))  # in-flight requests, process-wide
+MAX_RETRIES = 3
+
+
+class SingleFlight:
+    """Concurrent callers for the same key share one in-flight call (result or exception)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+                self.leaders += 1
+            else:
+                self.followers += 1
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call["done"].set()
+
+
+class RateLimiter:
+    """
+    Token bucket plus a concurrency cap, shared by every fetch in the process.
+    429/5xx halve both (and honour Retry-After); successes creep them back up (AIMD).
+    """
+
+    def __init__(self, rate: float = RATE_PER_SEC, max_concurrency: int = MAX_CONCURRENCY):
+        self.max_rate = float(rate)
+        self.max_concurrency = int(max_concurrency)
+        self.rate = self.max_rate
+        self.limit = self.max_concurrency
+        self.tokens = float(max_concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.throttled = 0
+        self._last = time.monotonic()
+        self._cv = threading.Condition()
+
+    def _refill(self, now: float):
+        self.tokens = min(float(self.limit), self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        with self._cv:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.paused_until - now
+                if wait <= 0 and self.in_flight < self.limit and self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    self.in_flight += 1
+                    return
+                if wait <= 0 and self.in_flight < self.limit:
+                    wait = (1.0 - self.tokens) / self.rate
+                self._cv.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, status: int | None, retry_after: float | None = None):
+        with self._cv:
+            self.in_flight -= 1
+            if status == 429 or (status is not None and status >= 500):
+                self.throttled += 1
+                self.rate = max(0.5, self.rate / 2)
+                self.limit = max(1, self.limit // 2)
+                pause = retry_after if retry_after is not None else 1.0 / self.rate
+                self.paused_until = max(self.paused_until, time.monotonic() + pause)
+            elif status is not None:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+                if self.rate >= self.max_rate / 2:
+                    self.limit = min(self.max_concurrency, self.limit + 1)
+            self._cv.notify_all()
+
+
+_flight = SingleFlight()
+_limiter = RateLimiter()
+_transport = make_transport(FPL_TRANSPORT, FPL_SNAPSHOT_DIR, FPL_REPLAY_LATENCY, FPL_REPLAY_ERROR_RATE)
+
+
+def set_transport(transport):
+    """Swap the transport (live / record / replay) and drop every cached response."""
+    global _transport
+    _transport = transport
+    for fn in (fetch_bootstrap, fetch_fixtures, fetch_player_history, fetch_league_standings, fetch_entry_picks):
+        if hasattr(fn, "cache_clear"):
+            fn.cache_clear()
+
+
+def get_transport():
+    return _transport
+
+
+def _retry_after(r) -> float | None:
+    try:
+        return float(r.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _endpoint(url: str) -> str:
+    """Metric label: the first path segment after the API root (bootstrap-static, entry, …)."""
+    return url[len(FPL_API):].strip("/").split("/", 1)[0].split("?", 1)[0] or "root"
+
+
+def _fetch_json(url: str):
+    endpoint = _endpoint(url)
+    path = url[len(FPL_API):].lstrip("/")
+    transport = _transport
+    limiter = None if transport.local else _limiter   # replay never touches the network
+    for attempt in range(MAX_RETRIES + 1):
+        if limiter:
+            limiter.acquire()
+        status, retry_after = None, None
+        try:
+            with metrics.span("http_request_seconds", endpoint=endpoint):
+                r = transport.get(url, path, REQ_TIMEOUT)
+            status = r.status_code
+            metrics.inc("http_requests_total", endpoint=endpoint, status=status)
+            metrics.inc("http_bytes_total", len(r.content), endpoint=endpoint)
+            if (status == 429 or status >= 500) and attempt < MAX_RETRIES:
+                retry_after = _retry_after(r)
+                continue
+            r.raise_for_status()
+            return r.json()
+        finally:
+            if limiter:
+                limiter.release(status, retry_after)
+
+
+def _get_json(path: str):
+    url = f"{FPL_API}/{path}"
+    return _flight.do(url, lambda: _fetch_json(url))
+
+
+def api_stats() -> dict:
+    return {
+        "upstream_calls": _flight.leaders,
+        "coalesced_calls": _flight.followers,
+        "throttled": _limiter.throttled,
+        "rate": _limiter.rate,
+        "concurrency_limit": _limiter.limit,
+        "transport": type(_transport).__name__,
+    }
+
 
 @lru_cache(maxsize=8)
 def fetch_bootstrap():
-    r = requests.get(f"{FPL_API}/bootstrap-static/")
-    r.raise_for_status()
-    return r.json()
+    return _get_json("bootstrap-static/")
 
 @lru_cache(maxsize=8)
 def fetch_fixtures():
-    r = requests.get(f"{FPL_API}/fixtures/")
-    r.raise_for_status()
-    return r.json()
+    return _get_json("fixtures/")
 
-@lru_cache(maxsize=512)
+@lru_cache(maxsize=1024)   # > players in the game: a full KB build scans every history twice
 def fetch_player_history(player_id: int):
-    r = requests.get(f"{FPL_API}/element-summary/{player_id}/")
-    r.raise_for_status()
-    return r.json()
+    return _get_json(f"element-summary/{player_id}/")
+
+@lru_cache(maxsize=1024)
+def fetch_league_standings(league_id: int, page: int = 1):
+    return _get_json(f"leagues-classic/{league_id}/standings/?page_standings={page}")
+
+@lru_cache(maxsize=8192)
+def fetch_entry_picks(entry_id: int, gw: int):
+    return _get_json(f"entry/{entry_id}/event/{gw}/picks/")
+
+
+def clear_live_caches():
+    """Drop the responses that change during a GW (bootstrap, fixtures, player histories, league standings); run on KB refresh."""
+    for fn in (fetch_bootstrap, fetch_fixtures, fetch_player_history, fetch_league_standings):
+        if hasattr(fn, "cache_clear"):
+            fn.cache_clear()
+
+
+def _cache_metrics():
+    for fn in (fetch_bootstrap, fetch_fixtures, fetch_player_history, fetch_league_standings, fetch_entry_picks):
+        info = getattr(fn, "cache_info", None)
+        if info is None:   # replaced by a test/bench stub
+            continue
+        ci = info()
+        yield "http_cache", {"fn": fn.__name__, "result": "hit"}, ci.hits
+        yield "http_cache", {"fn": fn.__name__, "result": "miss"}, ci.misses
+        yield "http_cache_entries", {"fn": fn.__name__}, ci.currsize
+    yield "http_singleflight_coalesced", {}, _flight.followers
+    yield "http_rate_limit", {}, _limiter.rate
+    yield "http_throttled", {}, _limiter.throttled
+
+
+metrics.register_collector(_cache_metrics)
@@ -3,10 +3,29 @@ from datetime import datetime
 import pandas as pd
 import pytz
 
+from fpl import metrics
 from fpl.api import fetch_bootstrap, fetch_fixtures, fetch_player_history
+from fpl.trends import get_store
+from fpl.leagues import EO_LEAGUE, league_pick_matrix
+from fpl.projection import HORIZON, project, recent_rates
 
 TZ = pytz.timezone("Europe/London")
 POS = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
+STATUS_LABEL = {"a":"Available","d":"Doubtful","i":"Injured","s":"Suspended","u":"Unavailable"}
+
+# Lean players frame: only the element fields the app reads, with compact dtypes.
+# API numeric strings (form, ppg, ict…) are parsed once here. Everything else is
+# available on demand through players_detail().
+PLAYER_FIELDS = {
+    "id": "int16", "team": "int8", "element_type": "int8", "now_cost": "int16",
+    "form": "float32", "points_per_game": "float32", "ict_index": "float32",
+    "influence": "float32", "creativity": "float32", "threat": "float32", "ep_next": "float32",
+    "total_points": "int16", "minutes": "int16", "goals_scored": "int16", "assists": "int16",
+    "clean_sheets": "int16", "bonus": "int16",
+    "transfers_in_event": "int32", "transfers_out_event": "int32",
+}
+POS_CAT = pd.CategoricalDtype(list(POS.values()))
+STATUS_CAT = pd.CategoricalDtype(["a", "d", "i", "n", "s", "u"])
 
 def _recent_block(pid: int, last_n: int = 5):
     try:
@@ -22,40 +41,128 @@ def _recent_block(pid: int, last_n: int = 5):
     except Exception:
         return "RECENT: n/a"
 
+def _players_frame(elements: list[dict], team_short: dict) -> pd.DataFrame:
+    raw = pd.DataFrame(elements)
+    out = pd.DataFrame(index=raw.index)
+    for col, dtype in PLAYER_FIELDS.items():
+        src = raw[col] if col in raw.columns else pd.Series(0, index=raw.index)
+        out[col] = pd.to_numeric(src, errors="coerce").fillna(0).astype(dtype)
+    out["web_name"] = raw["web_name"].astype(str)
+    out["news"] = raw.get("news", pd.Series("", index=raw.index)).fillna("").astype(str)
+    out["status"] = raw["status"].astype(STATUS_CAT)
+    out["team_short"] = out["team"].map(team_short).astype(pd.CategoricalDtype(sorted(set(team_short.values()))))
+    out["price"] = out["now_cost"] / 10.0  # float64: budget sums must stay exact to 1e-6
+    out["pos"] = out["element_type"].map(POS).astype(POS_CAT)
+    out["selected_by"] = pd.to_numeric(raw.get("selected_by_percent", 0), errors="coerce").fillna(0.0).astype("float32")
+    # numeric chances (NaN = no flag) and a friendly status label
+    out["chance_next"] = pd.to_numeric(raw.get("chance_of_playing_next_round"), errors="coerce").astype("float32")
+    out["chance_this"] = pd.to_numeric(raw.get("chance_of_playing_this_round"), errors="coerce").astype("float32")
+    out["status_label"] = raw["status"].map(STATUS_LABEL).fillna(raw["status"]).astype("category")
+    return out
+
+_detail: tuple = (None, None)   # (bootstrap dict, its full element frame)
+
+def players_detail(columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    Full-detail element frame (every bootstrap field, raw API types), built on demand
+    from the process-wide bootstrap cache rather than kept in each session. The frame
+    is built once per bootstrap object; callers get a copy they may modify.
+    """
+    global _detail
+    bs = fetch_bootstrap()
+    if _detail[0] is not bs:
+        _detail = (bs, pd.DataFrame(bs.get("elements", [])))
+    df = _detail[1]
+    if columns:
+        return df[["id"] + [c for c in columns if c in df.columns and c != "id"]].copy()
+    return df.copy()
+
+def current_gw(bs: dict) -> int | None:
+    """The bootstrap's current GW, else the next unfinished one (None before the season has events)."""
+    events = pd.DataFrame(bs.get("events", []))
+    if events.empty:
+        return None
+    if "is_current" in events.columns and events["is_current"].any():
+        return int(events.loc[events["is_current"] == True, "id"].iloc[0])
+    upcoming = events[events["finished"] == False].sort_values("deadline_time")
+    return int(upcoming["id"].iloc[0]) if not upcoming.empty else None
+
+@metrics.timed("kb_build_seconds")
 def build_full_kb(include_history: bool = True, last_n: int = 5):
     bs = fetch_bootstrap()
     fixtures = fetch_fixtures()
     events = pd.DataFrame(bs.get("events", []))
-    players = pd.DataFrame(bs.get("elements", []))
     teams = pd.DataFrame(bs.get("teams", []))
     team_short = teams.set_index("id")["short_name"].to_dict()
 
-    # after players = pd.DataFrame(bs.get("elements", []))
-
-    STATUS_LABEL = {"a":"Available","d":"Doubtful","i":"Injured","s":"Suspended","u":"Unavailable"}
-    
-    players = players.copy()
-    players["team_short"] = players["team"].map(team_short)
-    players["price"] = players["now_cost"] / 10.0
-    players["pos"] = players["element_type"].map(POS)
-    players["selected_by"] = pd.to_numeric(players.get("selected_by_percent", 0), errors="coerce").fillna(0.0)
-    # NEW: expose numeric chances and a friendly status label
-    players["chance_next"] = pd.to_numeric(players.get("chance_of_playing_next_round"), errors="coerce")
-    players["chance_this"] = pd.to_numeric(players.get("chance_of_playing_this_round"), errors="coerce")
-    players["status_label"] = players["status"].map(STATUS_LABEL).fillna(players["status"])
-
-    cols = ["id","web_name","team_short","pos","price","form","selected_by","status","news","minutes","points_per_game","total_points","ict_index","chance_next","status_label","chance_this"]
+    gw_now = current_gw(bs)
+
+    # Keep every fetched bootstrap so we can answer "who's rising" later.
+    trends = pd.DataFrame()
+    try:
+        store = get_store()
+        store.append(bs, gw=gw_now)
+        trends = store.trend_frame()
+    except Exception:
+        pass
+
+    players = _players_frame(bs.get("elements", []), team_short)
+    trend_cols = ["price_chg_24h", "price_chg_7d", "own_chg_24h", "own_chg_7d", "own_slope_7d", "form_slope_7d"]
+    if not trends.empty:
+        players = players.join(trends[trend_cols], on="id")
+    for c in trend_cols:
+        if c not in players.columns:
+            players[c] = 0.0
+        players[c] = players[c].fillna(0.0).astype("float32")
+
+    # Effective ownership in the configured league / top-entries sample, from the
+    # picks of the latest GW whose deadline has passed.
+    eo_cols = ["own_league", "capt_league", "eo"]
+    picks = None
+    if EO_LEAGUE and not events.empty:
+        started = events[(events.get("is_current", False) == True) | (events["finished"] == True)]
+        if not started.empty:
+            try:
+                picks = league_pick_matrix(int(started["id"].max()), players["id"].to_numpy())
+            except Exception:
+                picks = None
+    if picks is not None and len(picks.entry_ids):
+        players = players.join(picks.frame(), on="id")
+        for c in eo_cols:
+            players[c] = players[c].fillna(0.0).astype("float32")
+
+    recent = None
+    if include_history:
+        ids = players["id"].to_numpy()
+        histories = {}
+        for pid in ids:
+            try:
+                histories[int(pid)] = fetch_player_history(int(pid))
+            except Exception:
+                pass
+        recent = recent_rates(histories, ids, last_n=last_n)
+    proj = project(players, fixtures, gw=gw_now, horizon=HORIZON, recent=recent)
+    players["xp_next"] = proj.next_gw()
+    players["xp_horizon"] = proj.total()
+
+    cols = ["id","web_name","team_short","pos","price","form","selected_by","status","news","minutes","points_per_game","total_points","ict_index","chance_next","status_label","chance_this","price_chg_7d","own_chg_7d","xp_next","xp_horizon","eo"]
     keep = [c for c in cols if c in players.columns]
     p_lines = []
     for _, r in players[keep].iterrows():
         pid = int(r.get("id"))
         base = (
         f"PLAYER: {r['web_name']} | TEAM: {r['team_short']} | POS: {r['pos']} | "
-        f"PRICE: £{float(r['price']):.1f}m | FORM: {r['form']} | OWN: {float(r['selected_by']):.1f}% | "
-        f"PPG: {r['points_per_game']} | TOT: {r['total_points']} | MINS: {r['minutes']} | ICT: {r['ict_index']} | "
+        f"PRICE: £{float(r['price']):.1f}m | FORM: {float(r['form']):.1f} | OWN: {float(r['selected_by']):.1f}% | "
+        f"PPG: {float(r['points_per_game']):.1f} | TOT: {r['total_points']} | MINS: {r['minutes']} | ICT: {float(r['ict_index']):.1f} | "
         f"STATUS: {r['status_label']} ({'' if pd.isna(r['chance_next']) else int(r['chance_next'])}% next) | "
         f"NEWS: {str(r.get('news') or '')[:120]}"
     )
+        if proj.gws:
+            base += f" | XP: next {float(r['xp_next']):.1f} / {len(proj.gws)}GW {float(r['xp_horizon']):.1f}"
+        if "eo" in r and r["eo"] > 0:   # absent from the line = no one in the league owns the player
+            base += f" | EO: {float(r['eo']):.0f}%"
+        if not trends.empty:
+            base += f" | TREND7D: price {float(r['price_chg_7d']):+.1f} own {float(r['own_chg_7d']):+.1f}%"
         if include_history:
             base += " | " + _recent_block(pid, last_n=last_n)
         p_lines.append(base)
@@ -77,15 +184,13 @@ def build_full_kb(include_history: bool = True, last_n: int = 5):
                 parts.append(f"GW{gw} {'vs' if is_home else '@'} {opps} (FDR {fdr})")
             team_fx_lines.append(f"TEAM_FIX: {team_short.get(tid, str(tid))} → " + "; ".join(parts))
 
-    gw_now = None
-    if not events.empty:
-        if "is_current" in events.columns and events["is_current"].any():
-            gw_now = int(events.loc[events["is_current"] == True, "id"].iloc[0])
-        else:
-            upcoming = events[events["finished"] == False].sort_values("deadline_time")
-            if not upcoming.empty:
-                gw_now = int(upcoming["id"].iloc[0])
-
     header = f"KB_BUILT: {datetime.now(TZ).strftime('%Y-%m-%d %H:%M')} | CURRENT_GW: {gw_now} | PLAYERS: {len(p_lines)}"
+    if proj.gws:
+        header += f" | XP_GWS: {proj.gws[0]}-{proj.gws[-1]}"
+    if "eo" in players.columns:
+        header += f" | EO: {EO_LEAGUE} GW{picks.gw} ({len(picks.entry_ids)} entries)"
     full_kb = f"{header}\n\n[FIXTURES]\n" + "\n".join(team_fx_lines) + "\n\n[PLAYERS]\n" + "\n".join(p_lines)
-    return full_kb, {"gw": gw_now, "players": len(p_lines), "header": header}, players, team_fx_lines
+    metrics.gauge("kb_chars", len(full_kb))
+    metrics.gauge("kb_players", len(p_lines))
+    meta = {"gw": gw_now, "players": len(p_lines), "header": header, "projection": proj, "recent": recent}
+    return full_kb, meta, players, team_fx_lines
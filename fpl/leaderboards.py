@@ -0,0 +1,100 @@
+# fpl/leaderboards.py
+# Top-K rankings for several metrics × position × price band, built once per KB epoch.
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+TOP_K = 50
+POSITIONS = ["ALL", "GK", "DEF", "MID", "FWD"]
+# label -> (min price exclusive, max price inclusive)
+PRICE_BANDS = {
+    "All prices": (-np.inf, np.inf),
+    "Budget (≤ £5.0m)": (-np.inf, 5.0),
+    "Mid (£5.1–7.5m)": (5.0, 7.5),
+    "Premium (> £7.5m)": (7.5, np.inf),
+}
+METRICS = {
+    "selected_by": "Ownership %",
+    "form": "Form",
+    "points_per_game": "Points per game",
+    "total_points": "Total points",
+    "pts_per_m": "Points per £m",
+    "mins_share": "Minutes reliability",
+    "eo": "Effective ownership % (league)",   # only when the KB carries league picks
+}
+DISPLAY_COLS = ["id", "web_name", "team_short", "pos", "price", "form", "selected_by",
+                "points_per_game", "total_points", "status", "eo"]
+
+
+def _metric_values(players: pd.DataFrame, gw: int | None) -> dict[str, np.ndarray]:
+    price = players["price"].to_numpy(dtype=np.float64)
+    mins = players["minutes"].to_numpy(dtype=np.float64)
+    played_gws = max(1, int(gw) - 1) if gw else max(1.0, mins.max() / 90.0)
+    values = {
+        "selected_by": players["selected_by"].to_numpy(dtype=np.float64),
+        "form": players["form"].to_numpy(dtype=np.float64),
+        "points_per_game": players["points_per_game"].to_numpy(dtype=np.float64),
+        "total_points": players["total_points"].to_numpy(dtype=np.float64),
+        "pts_per_m": players["total_points"].to_numpy(dtype=np.float64) / np.maximum(price, 0.1),
+        "mins_share": np.clip(mins / (90.0 * played_gws), 0.0, 1.0),
+    }
+    if "eo" in players.columns:
+        values["eo"] = players["eo"].to_numpy(dtype=np.float64)
+    return values
+
+
+def _top_k(values: np.ndarray, rows: np.ndarray, k: int) -> np.ndarray:
+    """Row positions of the k largest `values[rows]`, ordered best first."""
+    if len(rows) > k:
+        rows = rows[np.argpartition(-values[rows], k - 1)[:k]]
+    return rows[np.argsort(-values[rows], kind="stable")]
+
+
+class LeaderboardIndex:
+    """
+    Precomputed top-K row positions for every (metric, position, price band).
+    Filter changes are dict lookups; nothing is re-sorted at render time.
+    """
+
+    def __init__(self, players: pd.DataFrame, gw: int | None = None, k: int = TOP_K):
+        self.k = k
+        self.gw = gw
+        values = _metric_values(players, gw)
+        self.metrics = [m for m in METRICS if m in values]
+        self.frame = players[[c for c in DISPLAY_COLS if c in players.columns]].reset_index(drop=True)
+        for m, v in values.items():
+            if m not in self.frame.columns:
+                self.frame[m] = v.astype(np.float32)
+        pos = players["pos"].astype(str).to_numpy()
+        price = players["price"].to_numpy(dtype=np.float64)
+        self._rows: dict[tuple[str, str, str], np.ndarray] = {}
+        for band, (lo, hi) in PRICE_BANDS.items():
+            in_band = (price > lo) & (price <= hi)
+            for p in POSITIONS:
+                rows = np.flatnonzero(in_band if p == "ALL" else in_band & (pos == p))
+                for m, v in values.items():
+                    self._rows[(m, p, band)] = _top_k(v, rows, k).astype(np.int32)
+
+    def rows(self, metric: str = "selected_by", pos: str = "ALL",
+             band: str = "All prices") -> np.ndarray:
+        return self._rows[(metric, pos, band)]
+
+    def top(self, metric: str = "selected_by", pos: str = "ALL", band: str = "All prices",
+            k: int = 20, cols: list[str] | None = None) -> pd.DataFrame:
+        out = self.frame.iloc[self.rows(metric, pos, band)[:k]]
+        return out[cols] if cols else out
+
+    def prompt_block(self, metrics: tuple[str, ...] = ("form", "pts_per_m"), k: int = 5) -> str:
+        """Compact per-position top-k lines for LLM prompts."""
+        lines = []
+        for m in metrics:
+            for p in POSITIONS[1:]:
+                top = self.top(m, p, k=k)
+                picks = ", ".join(f"{r.web_name}({r.id}) £{r.price:.1f}m {getattr(r, m):.1f}"
+                                  for r in top.itertuples())
+                lines.append(f"TOP_{m.upper()}_{p}: {picks}")
+        return "\n".join(lines)
+
+
+def build_index(players: pd.DataFrame, gw: int | None = None, k: int = TOP_K) -> LeaderboardIndex:
+    return LeaderboardIndex(players, gw=gw, k=k)
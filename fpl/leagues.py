@@ -0,0 +1,160 @@
+# fpl/leagues.py
+# Classic-league standings and per-entry picks, fetched concurrently through fpl.api
+# (same caching, single-flight and rate limiting), stored as an entries × players
+# multiplier matrix for vectorized effective ownership.
+from __future__ import annotations
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from fpl.api import MAX_CONCURRENCY, fetch_entry_picks, fetch_league_standings
+
+OVERALL_LEAGUE_ID = 314
+PAGE_SIZE = 50
+# League used for the KB / leaderboard EO columns: a classic league id, "top" for a
+# sample of the overall top entries, or empty to skip.
+EO_LEAGUE = os.getenv("FPL_EO_LEAGUE", "").strip()
+EO_ENTRIES = int(os.getenv("FPL_EO_ENTRIES", "1000"))     # entries read from the league
+EO_SAMPLE = int(os.getenv("FPL_EO_SAMPLE", "0"))          # 0 = picks for all of them
+CHIP_CODES = {None: 0, "bboost": 1, "3xc": 2, "freehit": 3, "wildcard": 4, "manager": 5}
+
+
+def league_entries(league_id: int, max_entries: int = 1000, workers: int = MAX_CONCURRENCY) -> pd.DataFrame:
+    """
+    Standings rows (entry, entry_name, player_name, rank, total) for up to
+    `max_entries`. Pages are requested `workers` at a time until one reports no next page.
+    """
+    n_pages = max(1, -(-int(max_entries) // PAGE_SIZE))
+    rows, page, done = [], 1, False
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="league") as pool:
+        while page <= n_pages and not done:
+            wave = list(range(page, min(n_pages, page + workers - 1) + 1))
+            for payload in pool.map(lambda p: fetch_league_standings(int(league_id), p), wave):
+                table = payload.get("standings", {})
+                rows += table.get("results", [])
+                if not table.get("has_next"):
+                    done = True
+                    break
+            page = wave[-1] + 1
+    cols = ["entry", "entry_name", "player_name", "rank", "total"]
+    df = pd.DataFrame(rows[:max_entries], columns=None if rows else cols)
+    return df[[c for c in cols if c in df.columns]].reset_index(drop=True)
+
+
+def top_entries(n: int = 10_000, sample: int = 0, seed: int = 0) -> pd.DataFrame:
+    """The overall top-n (optionally a random `sample` of them, rank order kept)."""
+    df = league_entries(OVERALL_LEAGUE_ID, max_entries=n)
+    if sample and sample < len(df):
+        keep = np.sort(np.random.default_rng(seed).choice(len(df), size=sample, replace=False))
+        df = df.iloc[keep].reset_index(drop=True)
+    return df
+
+
+class PickMatrix:
+    """
+    Entries × players int8 codes, columns aligned with `player_ids`: 0 = not picked,
+    otherwise the pick multiplier + 1 (1 bench, 2 XI or BB bench, 3 captain, 4 triple
+    captain). Entries whose picks could not be fetched are dropped.
+    """
+
+    def __init__(self, entry_ids: np.ndarray, player_ids: np.ndarray, codes: np.ndarray,
+                 chips: np.ndarray, gw: int):
+        self.entry_ids = entry_ids
+        self.player_ids = player_ids
+        self.codes = codes
+        self.chips = chips
+        self.gw = gw
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes + self.chips.nbytes + self.entry_ids.nbytes)
+
+    def _rows(self, rows) -> np.ndarray:
+        return self.codes if rows is None else self.codes[rows]
+
+    def ownership(self, rows=None) -> np.ndarray:
+        c = self._rows(rows)
+        return (c > 0).sum(axis=0) / max(1, len(c)) * 100
+
+    def captaincy(self, rows=None) -> np.ndarray:
+        c = self._rows(rows)
+        return (c >= 3).sum(axis=0) / max(1, len(c)) * 100
+
+    def effective_ownership(self, rows=None) -> np.ndarray:
+        """Σ multiplier / entries × 100: captains count twice, TC three times, BB benches once."""
+        c = self._rows(rows)
+        mult_sum = c.sum(axis=0, dtype=np.int64) - (c > 0).sum(axis=0)
+        return mult_sum / max(1, len(c)) * 100
+
+    def chip_usage(self) -> dict[str, float]:
+        n = max(1, len(self.chips))
+        return {name: float((self.chips == code).sum()) / n * 100 for name, code in CHIP_CODES.items() if name}
+
+    def frame(self, rows=None) -> pd.DataFrame:
+        return pd.DataFrame({
+            "own_league": self.ownership(rows).astype(np.float32),
+            "capt_league": self.captaincy(rows).astype(np.float32),
+            "eo": self.effective_ownership(rows).astype(np.float32),
+        }, index=pd.Index(self.player_ids, name="id"))
+
+    def exposure(self, squad_mult: dict[int, int], rows=None) -> pd.DataFrame:
+        """
+        Our multiplier minus league EO/100 per player: positive = we gain on the field
+        when that player scores, negative = the league does.
+        """
+        eo = self.effective_ownership(rows) / 100
+        ours = np.zeros(len(self.player_ids))
+        col = {int(p): j for j, p in enumerate(self.player_ids)}
+        for pid, m in squad_mult.items():
+            if int(pid) in col:
+                ours[col[int(pid)]] = m
+        diff = ours - eo
+        keep = np.flatnonzero(np.abs(diff) >= 0.05)
+        return pd.DataFrame({"id": self.player_ids[keep], "ours": ours[keep], "eo": eo[keep],
+                             "exposure": diff[keep]}).sort_values("exposure", ignore_index=True)
+
+
+def pick_matrix(entry_ids, gw: int, player_ids: np.ndarray, workers: int = MAX_CONCURRENCY) -> PickMatrix:
+    """Fetch picks for every entry concurrently and scatter them into one int8 matrix."""
+    entry_ids = np.asarray(list(entry_ids), dtype=np.int64)
+    col = {int(p): j for j, p in enumerate(player_ids)}
+
+    def one(entry_id):
+        try:
+            return fetch_entry_picks(int(entry_id), int(gw))
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="picks") as pool:
+        payloads = list(pool.map(one, entry_ids.tolist()))
+
+    ok = np.array([p is not None and bool(p.get("picks")) for p in payloads], dtype=bool)
+    r_idx, c_idx, vals, chips = [], [], [], []
+    for r, p in enumerate(pl for pl, good in zip(payloads, ok) if good):
+        chips.append(CHIP_CODES.get(p.get("active_chip"), 0))
+        for pk in p["picks"]:
+            j = col.get(int(pk["element"]))
+            if j is not None:
+                r_idx.append(r)
+                c_idx.append(j)
+                vals.append(int(pk.get("multiplier", 0)) + 1)
+    codes = np.zeros((int(ok.sum()), len(player_ids)), dtype=np.int8)
+    codes[np.asarray(r_idx, dtype=np.int64), np.asarray(c_idx, dtype=np.int64)] = np.asarray(vals, dtype=np.int8)
+    return PickMatrix(entry_ids[ok], np.asarray(player_ids), codes, np.asarray(chips, dtype=np.int8), int(gw))
+
+
+def league_pick_matrix(gw: int, player_ids: np.ndarray, league: str = EO_LEAGUE,
+                       max_entries: int = EO_ENTRIES, sample: int = EO_SAMPLE) -> PickMatrix | None:
+    """Picks for the configured league ("top" = overall top entries); None when unset."""
+    if not league:
+        return None
+    if league == "top":
+        entries = top_entries(max_entries, sample=sample)
+    else:
+        entries = league_entries(int(league), max_entries=max_entries)
+        if sample and sample < len(entries):
+            entries = entries.sample(n=sample, random_state=0).sort_index()
+    if entries.empty:
+        return None
+    return pick_matrix(entries["entry"], gw, player_ids)
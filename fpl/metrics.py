@@ -0,0 +1,178 @@
+# fpl/metrics.py
+# Process-wide counters and timing histograms for the hot paths (FPL API, KB build,
+# LLM calls, validation, DB), exported as Prometheus text. Recording is a dict update
+# under one lock, cheap enough to leave on everywhere.
+from __future__ import annotations
+import os, threading, time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Iterable
+
+METRICS_FILE = os.getenv("FPL_METRICS_FILE", "")   # also write the text export here (node_exporter textfile style)
+PREFIX = "fpl_"
+# seconds; spans cover ~µs validation up to multi-second LLM calls
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_counters: dict[tuple[str, tuple], float] = {}
+_gauges: dict[tuple[str, tuple], float] = {}
+_hists: dict[tuple[str, tuple], list] = {}          # [count, sum, max, per-bucket counts]
+_help: dict[str, str] = {}
+_collectors: list[Callable[[], Iterable[tuple[str, dict, float]]]] = []
+
+
+def _key(name: str, labels: dict) -> tuple[str, tuple]:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def describe(name: str, text: str):
+    _help[name] = text
+
+
+def inc(name: str, value: float = 1.0, **labels):
+    k = _key(name, labels)
+    with _lock:
+        _counters[k] = _counters.get(k, 0.0) + value
+
+
+def gauge(name: str, value: float, **labels):
+    k = _key(name, labels)
+    with _lock:
+        _gauges[k] = float(value)
+
+
+def observe(name: str, value: float, **labels):
+    k = _key(name, labels)
+    with _lock:
+        h = _hists.get(k)
+        if h is None:
+            h = _hists[k] = [0, 0.0, 0.0, [0] * len(BUCKETS)]
+        h[0] += 1
+        h[1] += value
+        h[2] = max(h[2], value)
+        for i, b in enumerate(BUCKETS):
+            if value <= b:
+                h[3][i] += 1
+                break
+
+
+@contextmanager
+def span(name: str, **labels):
+    """Time the block into histogram `name` (seconds), errors included."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - t0, **labels)
+
+
+def timed(name: str, **labels):
+    """Decorator form of span()."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def register_collector(fn: Callable[[], Iterable[tuple[str, dict, float]]]):
+    """`fn()` yields (gauge name, labels, value) at export time (cache sizes, pool state…)."""
+    _collectors.append(fn)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _hists.clear()
+
+
+def snapshot() -> list[dict]:
+    """One row per series: counters and gauges as value, histograms as count/sum/mean/max."""
+    rows = []
+    with _lock:
+        counters = dict(_counters)
+        hists = {k: (h[0], h[1], h[2]) for k, h in _hists.items()}
+    for (name, labels), v in sorted(counters.items()):
+        rows.append({"metric": name, "labels": _fmt_labels(labels), "type": "counter", "value": v})
+    for (name, labels), (n, total, mx) in sorted(hists.items()):
+        rows.append({"metric": name, "labels": _fmt_labels(labels), "type": "histogram", "value": total,
+                     "count": n, "mean_ms": total / n * 1000 if n else 0.0, "max_ms": mx * 1000})
+    for name, labels, v in _collect():
+        rows.append({"metric": name, "labels": _fmt_labels(_key(name, labels)[1]), "type": "gauge", "value": v})
+    return rows
+
+
+def _collect() -> list[tuple[str, dict, float]]:
+    with _lock:
+        out = [(name, dict(labels), v) for (name, labels), v in _gauges.items()]
+    for fn in list(_collectors):
+        try:
+            out += list(fn())
+        except Exception:
+            inc("metrics_collector_errors_total")
+    return out
+
+
+def _fmt_labels(labels: tuple, extra: tuple = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+
+def render_prometheus() -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        counters = dict(_counters)
+        hists = {k: (h[0], h[1], list(h[3])) for k, h in _hists.items()}
+    gauges: dict[tuple[str, tuple], float] = {_key(n, l): v for n, l, v in _collect()}
+    lines, seen = [], set()
+
+    def header(name: str, kind: str):
+        if name not in seen:
+            seen.add(name)
+            if name in _help:
+                lines.append(f"# HELP {PREFIX}{name} {_help[name]}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+    for (name, labels), v in sorted(counters.items()):
+        header(name, "counter")
+        lines.append(f"{PREFIX}{name}{_fmt_labels(labels)} {v:g}")
+    for (name, labels), v in sorted(gauges.items()):
+        header(name, "gauge")
+        lines.append(f"{PREFIX}{name}{_fmt_labels(labels)} {v:g}")
+    for (name, labels), (n, total, buckets) in sorted(hists.items()):
+        header(name, "histogram")
+        cum = 0
+        for b, c in zip(BUCKETS, buckets):
+            cum += c
+            lines.append(f"{PREFIX}{name}_bucket{_fmt_labels(labels, (('le', f'{b:g}'),))} {cum}")
+        lines.append(f"{PREFIX}{name}_bucket{_fmt_labels(labels, (('le', '+Inf'),))} {n}")
+        lines.append(f"{PREFIX}{name}_sum{_fmt_labels(labels)} {total:.6f}")
+        lines.append(f"{PREFIX}{name}_count{_fmt_labels(labels)} {n}")
+    return "\n".join(lines) + "\n"
+
+
+def write_file(path: str = METRICS_FILE) -> bool:
+    """Atomically write the text export to `path` (no-op when unset)."""
+    if not path:
+        return False
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+    return True
+
+
+describe("http_request_seconds", "FPL API round trips (per attempt).")
+describe("http_bytes_total", "Response bytes read from the FPL API.")
+describe("http_cache", "fetch_* lru_cache hits/misses.")
+describe("kb_build_seconds", "build_full_kb wall time.")
+describe("llm_seconds", "llm.invoke latency by prompt kind.")
+describe("llm_prompt_chars_total", "Prompt characters sent, by prompt kind.")
+describe("db_query_seconds", "DB round trips by statement verb.")
+describe("rerun_seconds", "Streamlit script reruns, wall time.")
@@ -0,0 +1,91 @@
+# fpl/profiler.py
+# Opt-in sampling profiler for one thread (e.g. a single Streamlit rerun): a daemon
+# thread reads the target's current frame every `interval` seconds and counts stacks.
+# No tracing hooks, so the profiled code runs at full speed between samples.
+from __future__ import annotations
+import os, sys, threading, time
+from collections import Counter
+import pandas as pd
+
+SAMPLE_INTERVAL = float(os.getenv("FPL_PROFILE_INTERVAL", "0.005"))
+MAX_SECONDS = float(os.getenv("FPL_PROFILE_MAX_SECS", "300"))   # give up if stop() is never reached
+MAX_DEPTH = 64
+
+
+def _frame_label(code) -> str:
+    path = code.co_filename
+    for root in sys.path:
+        if root and path.startswith(root):
+            path = os.path.relpath(path, root)
+            break
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """`with SamplingProfiler() as prof: ...` then `prof.top()` / `prof.collapsed()`."""
+
+    def __init__(self, thread_id: int | None = None, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter = Counter()   # stack (tuple of code objects) -> seconds
+        self.samples = 0
+        self.elapsed = 0.0
+        self._halt = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._t0 = 0.0
+
+    def start(self) -> "SamplingProfiler":
+        self._t0 = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="fpl-profiler")
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._halt.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self._t0
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._halt.wait(self.interval):
+            now = time.perf_counter()
+            # weight by wall time since the last sample: a busy target holds the GIL and
+            # delays the sampler, so plain counts would under-report CPU-bound code
+            dt, last = now - last, now
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or time.perf_counter() - self._t0 > MAX_SECONDS:
+                return   # target thread finished (or was abandoned mid-run)
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += dt
+            self.samples += 1
+
+    def top(self, n: int = 30) -> pd.DataFrame:
+        """Functions by inclusive ("total") and exclusive ("self") share of samples."""
+        own, total = Counter(), Counter()
+        for stack, secs in self.stacks.items():
+            own[stack[-1]] += secs
+            for code in set(stack):
+                total[code] += secs
+        sampled = sum(self.stacks.values()) or 1.0
+        rows = [{"function": _frame_label(code), "self_pct": own[code] / sampled * 100,
+                 "total_pct": secs / sampled * 100, "total_s": secs}
+                for code, secs in total.items()]
+        if not rows:
+            return pd.DataFrame(columns=["function", "self_pct", "total_pct", "total_s"])
+        return pd.DataFrame(rows).sort_values(["total_pct", "self_pct"], ascending=False, ignore_index=True).head(n)
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format (flamegraph.pl / speedscope input), in ms."""
+        return "\n".join(";".join(_frame_label(c) for c in stack) + f" {round(secs * 1000)}"
+                         for stack, secs in self.stacks.most_common())
@@ -0,0 +1,160 @@
+# fpl/projection.py
+# Expected points for every player over the next N gameweeks, in one vectorized pass.
+#
+# Per player and GW:  xP = Σ over that GW's fixtures (0 = blank, 2 = double) of
+#   start_p · (2 + goals90·GOAL_PTS·att + assists90·3·att + cs90·CS_PTS·def + bonus90·att)
+#   + cameo_p · 1
+# where start_p comes from minutes reliability × availability and att/def scale with
+# opponent FDR and home advantage. Per-90 rates are season rates from bootstrap,
+# blended with recent history when it has been fetched.
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+HORIZON = 6
+MAX_FIX_PER_GW = 3
+GOAL_PTS = np.array([0, 6, 6, 5, 4], dtype=np.float32)   # by element_type
+CS_PTS = np.array([0, 4, 4, 1, 0], dtype=np.float32)
+# FDR 1..5 (index 0 unused) → multiplier on attacking / defensive returns
+ATT_MULT = np.array([1.0, 1.30, 1.15, 1.00, 0.85, 0.70], dtype=np.float32)
+DEF_MULT = np.array([1.0, 1.45, 1.20, 1.00, 0.75, 0.55], dtype=np.float32)
+HOME_MULT = np.float32(1.05)
+AVAIL_BY_STATUS = {"a": 1.0, "d": 0.5, "i": 0.0, "s": 0.0, "u": 0.0, "n": 0.0}
+RECENT_WEIGHT = 0.6  # weight of last-N history vs season rates when history is present
+
+
+def fixture_tensor(fixtures: list[dict], gws: list[int], n_teams: int = 20, include_finished: bool = False):
+    """
+    (teams+1, G, K) FDR and home-flag arrays for the given GWs. Slots without a
+    fixture have FDR 0, which the caller masks out (blanks); doubles fill two slots.
+    Finished fixtures are skipped unless `include_finished` (replaying past GWs).
+    """
+    fdr = np.zeros((n_teams + 1, len(gws), MAX_FIX_PER_GW), dtype=np.int8)
+    home = np.zeros_like(fdr, dtype=bool)
+    slot = np.zeros((n_teams + 1, len(gws)), dtype=np.int8)
+    col = {gw: j for j, gw in enumerate(gws)}
+    for f in fixtures:
+        j = col.get(f.get("event"))
+        if j is None or (f.get("finished") and not include_finished):
+            continue
+        for team, opp_fdr, is_home in ((f["team_h"], f["team_h_difficulty"], True),
+                                       (f["team_a"], f["team_a_difficulty"], False)):
+            if team > n_teams:
+                continue
+            k = slot[team, j]
+            if k < MAX_FIX_PER_GW:
+                fdr[team, j, k] = int(opp_fdr or 3)
+                home[team, j, k] = is_home
+                slot[team, j] = k + 1
+    return fdr, home
+
+
+def upcoming_gws(fixtures: list[dict], horizon: int = HORIZON, from_gw: int | None = None) -> list[int]:
+    pending = [int(f["event"]) for f in fixtures if f.get("event") and not f.get("finished")]
+    if not pending:
+        return []
+    start = max(min(pending), int(from_gw or 0))
+    return [g for g in range(start, start + horizon) if g <= max(pending)]
+
+
+def recent_rates(histories: dict[int, dict], ids: np.ndarray, last_n: int = 5) -> pd.DataFrame:
+    """Last-N per-90 rates and minutes share from element-summary payloads (missing → NaN)."""
+    rows = np.full((len(ids), 5), np.nan, dtype=np.float32)
+    for i, pid in enumerate(ids):
+        h = (histories.get(int(pid)) or {}).get("history", [])[-last_n:]
+        if not h:
+            continue
+        mins = sum(int(g.get("minutes", 0)) for g in h)
+        n90 = max(mins / 90.0, 1e-6)
+        rows[i] = (
+            sum(int(g.get("goals_scored", 0)) for g in h) / n90,
+            sum(int(g.get("assists", 0)) for g in h) / n90,
+            sum(int(g.get("clean_sheets", 0)) for g in h) / n90,
+            sum(int(g.get("bonus", 0)) for g in h) / n90,
+            mins / (90.0 * len(h)),
+        )
+    return pd.DataFrame(rows, columns=["g90", "a90", "cs90", "b90", "mins_share"], index=ids)
+
+
+class Projection:
+    """Expected points matrix (players × GWs) aligned with the players frame rows."""
+
+    def __init__(self, ids: np.ndarray, gws: list[int], xp: np.ndarray):
+        self.ids = ids
+        self.gws = gws
+        self.xp = xp
+
+    def total(self, n: int | None = None) -> np.ndarray:
+        return self.xp[:, :n].sum(axis=1) if self.xp.size else np.zeros(len(self.ids), np.float32)
+
+    def next_gw(self) -> np.ndarray:
+        return self.xp[:, 0] if self.xp.size else np.zeros(len(self.ids), np.float32)
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.xp, index=pd.Index(self.ids, name="id"),
+                            columns=[f"xp_gw{g}" for g in self.gws])
+
+
+def player_rates(players: pd.DataFrame, gws: list[int], recent: pd.DataFrame | None = None):
+    """
+    Per-player (rates (P,4) = goals/assists/cs/bonus per 90, start_p, cameo_p) from
+    season totals, blended with recent history when present.
+    """
+    ids = players["id"].to_numpy()
+    mins = players["minutes"].to_numpy(dtype=np.float32)
+    n90 = np.maximum(mins / 90.0, 1.0)
+    rates = np.stack([
+        players["goals_scored"].to_numpy(dtype=np.float32) / n90,
+        players["assists"].to_numpy(dtype=np.float32) / n90,
+        players["clean_sheets"].to_numpy(dtype=np.float32) / n90,
+        players["bonus"].to_numpy(dtype=np.float32) / n90,
+    ], axis=1)
+    played = max(1, int(gws[0]) - 1) if gws else 1
+    share = np.clip(mins / (90.0 * played), 0.0, 1.0)
+
+    if recent is not None and len(recent):
+        rec = recent.reindex(ids)[["g90", "a90", "cs90", "b90", "mins_share"]].to_numpy(dtype=np.float32)
+        have = ~np.isnan(rec[:, 0])
+        rates[have] = (1 - RECENT_WEIGHT) * rates[have] + RECENT_WEIGHT * rec[have, :4]
+        share[have] = (1 - RECENT_WEIGHT) * share[have] + RECENT_WEIGHT * rec[have, 4]
+
+    chance = players["chance_next"].to_numpy(dtype=np.float32)
+    status_avail = players["status"].astype(str).map(AVAIL_BY_STATUS).fillna(1.0).to_numpy(dtype=np.float32)
+    avail = np.where(np.isnan(chance), status_avail, chance / 100.0).astype(np.float32)
+    start_p = avail * share
+    cameo_p = avail * (1.0 - share) * 0.3
+    return rates, start_p, cameo_p
+
+
+def fixture_mults(team: np.ndarray, fixtures: list[dict], gws: list[int], include_finished: bool = False):
+    """(P, G, K) played-slot mask and attacking / defensive multipliers for each player's team."""
+    n_teams = int(max(team.max(initial=0), max((max(f["team_h"], f["team_a"]) for f in fixtures), default=0)))
+    fdr, home = fixture_tensor(fixtures, gws, n_teams=n_teams, include_finished=include_finished)
+    pf, ph = fdr[team], home[team]
+    hm = np.where(ph, HOME_MULT, np.float32(1.0))
+    return pf > 0, ATT_MULT[pf] * hm, DEF_MULT[pf] * hm
+
+
+def project(players: pd.DataFrame, fixtures: list[dict], gw: int | None = None,
+            horizon: int = HORIZON, recent: pd.DataFrame | None = None) -> Projection:
+    """
+    One pass over all players. `players` needs id, team, element_type, minutes,
+    goals_scored, assists, clean_sheets, bonus, status, chance_next.
+    """
+    ids = players["id"].to_numpy()
+    gws = upcoming_gws(fixtures, horizon, from_gw=gw)
+    if not gws:
+        return Projection(ids, [], np.zeros((len(ids), 0), np.float32))
+
+    et = players["element_type"].to_numpy(dtype=np.int64)
+    team = players["team"].to_numpy(dtype=np.int64)
+    rates, start_p, cameo_p = player_rates(players, gws, recent)
+    played_slot, att, dfn = fixture_mults(team, fixtures, gws)
+
+    per_fix = (
+        2.0
+        + (rates[:, 0] * GOAL_PTS[et] + rates[:, 1] * 3.0 + rates[:, 3])[:, None, None] * att
+        + (np.minimum(rates[:, 2], 0.6) * CS_PTS[et])[:, None, None] * dfn
+    ) * start_p[:, None, None] + cameo_p[:, None, None]
+    xp = np.where(played_slot, per_fix, 0.0).sum(axis=2).astype(np.float32)
+    return Projection(ids, gws, xp)
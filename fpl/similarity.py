@@ -0,0 +1,138 @@
+# fpl/similarity.py
+# Nearest-neighbour index over per-player stat vectors, built once per KB epoch.
+# Answers "who's like X but cheaper" / "replacement for Y under £Z" with a masked
+# distance over one position's rows (a few hundred × ~12 floats → microseconds).
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+from fpl.projection import fixture_tensor, upcoming_gws
+
+RUN_GWS = 5
+MIN_90S = 3.0   # per-90 rates use at least this many 90s so cameo players don't look elite
+# feature -> weight applied after per-position z-scoring
+FEATURES = {
+    "g90": 1.0, "a90": 1.0, "cs90": 0.7, "b90": 0.5,
+    "influence90": 0.7, "creativity90": 0.7, "threat90": 0.7,
+    "mins_share": 1.0, "form": 0.7, "price": 0.8, "fixture_run": 0.5,
+}
+SHOW_COLS = ["id", "web_name", "team_short", "pos", "price", "form", "selected_by", "status"]
+
+
+def stat_vectors(players: pd.DataFrame, fixtures: list[dict], gw: int | None) -> pd.DataFrame:
+    """Raw (un-normalized) feature columns, one row per player, in players order."""
+    mins = players["minutes"].to_numpy(dtype=np.float64)
+    n90 = np.maximum(mins / 90.0, MIN_90S)
+    per90 = lambda c: players[c].to_numpy(dtype=np.float64) / n90
+    played = max(1, int(gw or 1) - 1)
+    team = players["team"].to_numpy(dtype=np.int64)
+
+    # mean opponent FDR over the next RUN_GWS (blank GWs count as the hardest, 5)
+    gws = upcoming_gws(fixtures, RUN_GWS, from_gw=gw)
+    if gws:
+        n_teams = int(max(team.max(initial=0), max((max(f["team_h"], f["team_a"]) for f in fixtures), default=0)))
+        fdr = fixture_tensor(fixtures, gws, n_teams=n_teams)[0][team].astype(np.float64)   # (P, G, K)
+        n_fix = (fdr > 0).sum(axis=2)
+        per_gw = np.where(n_fix > 0, fdr.sum(axis=2) / np.maximum(n_fix, 1), 5.0)
+        run = per_gw.mean(axis=1)
+    else:
+        run = np.full(len(players), 3.0)
+
+    return pd.DataFrame({
+        "g90": per90("goals_scored"), "a90": per90("assists"), "cs90": per90("clean_sheets"),
+        "b90": per90("bonus"), "influence90": per90("influence"), "creativity90": per90("creativity"),
+        "threat90": per90("threat"), "mins_share": np.clip(mins / (90.0 * played), 0.0, 1.0),
+        "form": players["form"].to_numpy(dtype=np.float64),
+        "price": players["price"].to_numpy(dtype=np.float64),
+        "fixture_run": -run,   # higher = easier run, like the other features
+    })
+
+
+class SimilarityIndex:
+    """
+    Per-position z-scored, weighted feature matrix. `similar()` filters by position,
+    max price, availability and club limits, then takes the k nearest by Euclidean
+    distance (similarity = 1 / (1 + distance)).
+    """
+
+    def __init__(self, players: pd.DataFrame, fixtures: list[dict], gw: int | None = None):
+        raw = stat_vectors(players, fixtures, gw)
+        self.frame = players[[c for c in SHOW_COLS if c in players.columns]].reset_index(drop=True)
+        self.ids = players["id"].to_numpy(dtype=np.int64)
+        self.row_of = {int(pid): i for i, pid in enumerate(self.ids)}
+        self.pos = players["pos"].astype(str).to_numpy()
+        self.club = players["team_short"].astype(str).to_numpy()
+        self.price = players["price"].to_numpy(dtype=np.float64)
+        self.available = players["status"].astype(str).to_numpy() == "a"
+        self.names = players["web_name"].astype(str).str.lower().to_numpy(dtype=str)
+        self.selected = players["selected_by"].to_numpy(dtype=np.float64)
+
+        X = raw[list(FEATURES)].to_numpy(dtype=np.float64)
+        w = np.array(list(FEATURES.values()))
+        self.X = np.zeros_like(X, dtype=np.float32)
+        for p in np.unique(self.pos):
+            rows = self.pos == p
+            mu, sd = X[rows].mean(axis=0), X[rows].std(axis=0)
+            self.X[rows] = ((X[rows] - mu) / np.where(sd > 0, sd, 1.0) * w).astype(np.float32)
+        self.rows_by_pos = {p: np.flatnonzero(self.pos == p) for p in np.unique(self.pos)}
+
+    def find(self, name: str) -> int | None:
+        """Player id for a (partial, case-insensitive) web name; most-owned match wins."""
+        q = str(name).strip().lower()
+        if not q:
+            return None
+        for mask in (self.names == q, np.char.startswith(self.names, q), np.char.find(self.names, q) >= 0):
+            hits = np.flatnonzero(mask)
+            if len(hits):
+                return int(self.ids[hits[np.argmax(self.selected[hits])]])
+        return None
+
+    def nearest(self, player_id: int, k: int = 5, max_price: float | None = None, pos: str | None = None,
+                squad_ids: list[int] | None = None, exclude_ids=(), available_only: bool = True,
+                max_per_club: int = 3) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (rows, similarity) of the k nearest players to `player_id`, best first (same
+        position unless `pos`). With `squad_ids`, the squad is excluded and clubs
+        already at `max_per_club` once the player leaves are skipped, as for a transfer.
+        """
+        r0 = self.row_of[int(player_id)]
+        rows = self.rows_by_pos.get(pos or self.pos[r0], np.zeros(0, dtype=np.int64))
+        keep = rows != r0
+        if max_price is not None:
+            keep &= self.price[rows] <= float(max_price) + 1e-6
+        if available_only:
+            keep &= self.available[rows]
+        skip = [int(x) for x in exclude_ids]
+        if squad_ids:
+            skip += [int(x) for x in squad_ids]
+            squad_rows = [self.row_of[int(x)] for x in squad_ids if int(x) in self.row_of and int(x) != int(player_id)]
+            clubs, counts = np.unique(self.club[squad_rows], return_counts=True)
+            full = clubs[counts >= max_per_club]
+            if len(full):
+                keep &= ~np.isin(self.club[rows], full)
+        if skip:
+            keep &= ~np.isin(self.ids[rows], skip)
+        cand = rows[keep]
+        d = np.sqrt(((self.X[cand] - self.X[r0]) ** 2).sum(axis=1))
+        if len(cand) > k:
+            part = np.argpartition(d, k - 1)[:k]
+            cand, d = cand[part], d[part]
+        order = np.argsort(d, kind="stable")
+        return cand[order], (1.0 / (1.0 + d[order])).astype(np.float32)
+
+    def similar(self, player_id: int, k: int = 5, **filters) -> pd.DataFrame:
+        """`nearest()` as a display frame (SHOW_COLS + similarity)."""
+        rows, sim = self.nearest(player_id, k=k, **filters)
+        out = self.frame.iloc[rows].reset_index(drop=True)
+        out["similarity"] = sim
+        return out
+
+    def replacements(self, out_id: int, squad_ids: list[int], bank: float, k: int = 3) -> list[int]:
+        """Ids of like-for-like transfer targets for `out_id`: affordable, club-legal, available."""
+        budget = self.price[self.row_of[int(out_id)]] + float(bank)
+        rows, _ = self.nearest(out_id, k=k, max_price=budget, squad_ids=squad_ids)
+        return [int(x) for x in self.ids[rows]]
+
+
+def build_similarity(players: pd.DataFrame, fixtures: list[dict], gw: int | None = None) -> SimilarityIndex:
+    return SimilarityIndex(players, fixtures, gw=gw)
@@ -0,0 +1,167 @@
+# fpl/simulate.py
+# Monte Carlo gameweek simulator: samples minutes, goals, assists, clean sheets and
+# bonus per player and fixture, then scores a squad under every captain and chip.
+#
+# Rates and fixture multipliers are the ones fpl.projection uses, so the sample mean
+# of each player's points matches the xP (bar the bonus cap of 3 per fixture).
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+from fpl.ai_manager.core import VALID_FORMATIONS
+from fpl.projection import CS_PTS, GOAL_PTS, fixture_mults, player_rates
+
+SIM_RUNS = 10_000
+CHIPS = ("NONE", "TC", "BB")
+_OUTFIELD = ("DEF", "MID", "FWD")
+# smallest count per outfield position any legal formation allows (3 DEF / 2 MID / 1 FWD)
+_MIN_OUT = np.array([min(f[i] for f in VALID_FORMATIONS) for i in range(3)], dtype=np.int16)
+
+
+class SimResult:
+    """Sampled squad totals per (captain_id, chip), plus per-player sample means."""
+
+    def __init__(self, totals: dict[tuple[int, str], np.ndarray], player_mean: dict[int, float],
+                 names: dict[int, str], runs: int):
+        self.totals = totals
+        self.player_mean = player_mean
+        self.names = names
+        self.runs = runs
+        self._summary: pd.DataFrame | None = None
+
+    def summary(self) -> pd.DataFrame:
+        if self._summary is not None:
+            return self._summary
+        rows = []
+        for (cap, chip), t in self.totals.items():
+            p10, p50, p90 = np.percentile(t, [10, 50, 90])
+            rows.append({"captain_id": cap, "captain": self.names.get(cap, str(cap)), "chip": chip,
+                         "mean": float(t.mean()), "std": float(t.std()),
+                         "p10": float(p10), "p50": float(p50), "p90": float(p90)})
+        self._summary = pd.DataFrame(rows).sort_values("mean", ascending=False, ignore_index=True)
+        return self._summary
+
+    def best(self, chip: str | None = None) -> dict:
+        s = self.summary()
+        if chip:
+            s = s[s["chip"] == chip]
+        return s.iloc[0].to_dict()
+
+    def prompt_block(self, top: int = 3) -> str:
+        """Short captain/chip lines for the weekly LLM prompt."""
+        s = self.summary()
+        lines = []
+        for chip in CHIPS:
+            sub = s[s["chip"] == chip].head(top)
+            if sub.empty:
+                continue
+            picks = ", ".join(f"{r.captain}({r.captain_id}) mean {r.mean:.1f} p10 {r.p10:.0f} p90 {r.p90:.0f}"
+                              for r in sub.itertuples())
+            lines.append(f"SIM_{chip}: {picks}")
+        return "\n".join(lines)
+
+
+class GwSimulator:
+    """
+    Built once per players frame; `sample()` draws (runs × players) points for one
+    GW. Per-player rates are computed up front, fixture multipliers per call.
+    """
+
+    def __init__(self, players: pd.DataFrame, fixtures: list[dict], recent: pd.DataFrame | None = None,
+                 base_gw: int | None = None):
+        self.fixtures = fixtures
+        self.ids = players["id"].to_numpy(dtype=np.int64)
+        self.row_of = {int(pid): i for i, pid in enumerate(self.ids)}
+        self.et = players["element_type"].to_numpy(dtype=np.int64)
+        self.team = players["team"].to_numpy(dtype=np.int64)
+        self.pos = players["pos"].astype(str).to_numpy()
+        self.names = dict(zip(self.ids.tolist(), players["web_name"].astype(str)))
+        gws = [int(base_gw)] if base_gw else []
+        self.rates, self.start_p, self.cameo_p = player_rates(players, gws, recent)
+
+    def sample(self, ids: list[int], gw: int, runs: int = SIM_RUNS, seed: int | None = None):
+        """(points (runs, P) int16, played (runs, P) bool) for the given player ids."""
+        rng = np.random.default_rng(seed)
+        r = np.array([self.row_of[int(x)] for x in ids], dtype=np.int64)
+        slot, att, dfn = fixture_mults(self.team[r], self.fixtures, [int(gw)], include_finished=True)
+        used = max(1, int(slot[:, 0].sum(axis=1).max(initial=0)))   # doubles only when someone has one
+        slot, att, dfn = slot[:, 0, :used], att[:, 0, :used], dfn[:, 0, :used]   # (P, K)
+        P, K = slot.shape
+        rates, et = self.rates[r], self.et[r]
+
+        u = rng.random((runs, P, K), dtype=np.float32)
+        start = (u < self.start_p[r][:, None]) & slot
+        cameo = ~start & (u < (self.start_p[r] + self.cameo_p[r])[:, None]) & slot
+        goals = rng.poisson(rates[:, 0][:, None] * att, size=(runs, P, K))
+        assists = rng.poisson(rates[:, 1][:, None] * att, size=(runs, P, K))
+        bonus = np.minimum(rng.poisson(rates[:, 3][:, None] * att, size=(runs, P, K)), 3)
+        cs = rng.random((runs, P, K), dtype=np.float32) < np.minimum(np.minimum(rates[:, 2], 0.6)[:, None] * dfn, 1.0)
+
+        per_fix = (2 + goals * GOAL_PTS[et][:, None] + assists * 3 + bonus + cs * CS_PTS[et][:, None]) * start + cameo
+        return per_fix.sum(axis=2).astype(np.int16), (start | cameo).any(axis=2)
+
+    def simulate(self, xi_ids: list[int], bench_order: list[int], gw: int, captains: list[int] | None = None,
+                 vice_id: int | None = None, chips: tuple[str, ...] = CHIPS, runs: int = SIM_RUNS,
+                 seed: int | None = None) -> SimResult:
+        """
+        Squad totals for each captain in `captains` (default: the whole XI) under each
+        chip. NONE/TC apply auto-subs in bench order (same position first, otherwise
+        any swap that keeps a legal formation); BB counts all 15. If the captain does
+        not play the armband passes to `vice_id` (default: best mean other XI player).
+        """
+        xi, bench = [int(x) for x in xi_ids], [int(x) for x in bench_order]
+        pts, played = self.sample(xi + bench, gw, runs=runs, seed=seed)
+        pts32 = pts.astype(np.int32)
+        mean = pts32.mean(axis=0)
+        col = {pid: j for j, pid in enumerate(xi + bench)}
+        player_mean = {pid: float(mean[j]) for pid, j in col.items()}
+
+        base = {"BB": pts32.sum(axis=1)}
+        if "NONE" in chips or "TC" in chips:
+            base["NONE"] = pts32[:, :len(xi)].sum(axis=1) + self._auto_subs(xi, bench, pts32, played)
+        base["TC"] = base.get("NONE")
+
+        out = {}
+        for cap in [int(c) for c in (captains or xi)]:
+            vice = vice_id if vice_id is not None and int(vice_id) != cap else \
+                max((p for p in xi if p != cap), key=lambda p: player_mean[p], default=cap)
+            c, v = col[cap], col[int(vice)]
+            armband = np.where(played[:, c], pts32[:, c], np.where(played[:, v], pts32[:, v], 0))
+            for chip in chips:
+                out[(cap, chip)] = base[chip] + armband * (2 if chip == "TC" else 1)
+        return SimResult(out, player_mean, self.names, runs)
+
+    def _auto_subs(self, xi: list[int], bench: list[int], pts: np.ndarray, played: np.ndarray) -> np.ndarray:
+        n = len(xi)
+        runs = pts.shape[0]
+        xpos = self.pos[[self.row_of[p] for p in xi]]
+        bpos = self.pos[[self.row_of[p] for p in bench]]
+        gain = np.zeros(runs, dtype=np.int32)
+
+        gk_x = [j for j in range(n) if xpos[j] == "GK"]
+        gk_b = [j for j in range(len(bench)) if bpos[j] == "GK"]
+        if gk_x and gk_b:
+            sub = ~played[:, gk_x[0]] & played[:, n + gk_b[0]]
+            gain += np.where(sub, pts[:, n + gk_b[0]], 0)
+
+        # per-run counts of XI outfielders by position, and how many of them did not play
+        idx = [[j for j in range(n) if xpos[j] == p] for p in _OUTFIELD]
+        count = np.stack([np.full(runs, len(js), dtype=np.int16) for js in idx], axis=1)
+        missing = np.stack([(~played[:, js]).sum(axis=1).astype(np.int16) if js else np.zeros(runs, np.int16)
+                            for js in idx], axis=1)
+        for b, p in enumerate(bpos):
+            if p == "GK":
+                continue
+            pb = _OUTFIELD.index(p)
+            avail = played[:, n + b]
+            done = np.zeros(runs, dtype=bool)
+            for q in [pb] + [i for i in range(3) if i != pb]:
+                ok = avail & ~done & (missing[:, q] > 0)
+                if q != pb:
+                    ok &= count[:, q] - 1 >= _MIN_OUT[q]
+                missing[ok, q] -= 1
+                count[ok, q] -= 1
+                count[ok, pb] += 1
+                done |= ok
+            gain += np.where(done, pts[:, n + b], 0)
+        return gain
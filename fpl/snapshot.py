@@ -0,0 +1,45 @@
+# fpl/snapshot.py
+# Everything built once per KB refresh outside Streamlit (API service, job workers):
+# the KB text and players frame plus the shared leaderboard and similarity indexes.
+from __future__ import annotations
+import os, time
+import pandas as pd
+
+from fpl.api import fetch_fixtures
+from fpl.kb import build_full_kb
+from fpl.leaderboards import build_index
+from fpl.similarity import build_similarity
+
+KB_HISTORY = os.getenv("FPL_API_KB_HISTORY", "0") == "1"    # include recent per-player history in the KB
+KB_LAST_N = int(os.getenv("FPL_API_KB_LAST_N", "5"))
+
+
+class KbSnapshot:
+    def __init__(self, full_kb: str, kb_meta: dict, players_df: pd.DataFrame, fixtures_text,
+                 fixtures: list[dict], leaderboards, similarity):
+        self.full_kb = full_kb
+        self.kb_meta = kb_meta
+        self.players_df = players_df
+        self.fixtures_text = fixtures_text
+        self.fixtures = fixtures
+        self.leaderboards = leaderboards
+        self.similarity = similarity
+        self.built_at = time.time()
+        self.epoch = 0
+
+    @property
+    def gw(self) -> int | None:
+        return self.kb_meta.get("gw")
+
+    def session_values(self, openai_key: str, state: dict) -> dict:
+        """What decision.session_scope() needs to run one user's AI manager."""
+        return {"openai_key": openai_key, "auto_mgr": state, "full_kb": self.full_kb,
+                "leaderboards": self.leaderboards, "similarity": self.similarity}
+
+
+def build_snapshot(include_history: bool = KB_HISTORY, last_n: int = KB_LAST_N) -> KbSnapshot:
+    full_kb, kb_meta, players_df, fixtures_text = build_full_kb(include_history=include_history, last_n=last_n)
+    fixtures = fetch_fixtures()
+    gw = kb_meta.get("gw")
+    return KbSnapshot(full_kb, kb_meta, players_df, fixtures_text, fixtures,
+                      build_index(players_df, gw=gw), build_similarity(players_df, fixtures, gw=gw))
@@ -0,0 +1,219 @@
+# fpl/transport.py
+# Pluggable HTTP transport under fpl.api: live requests, record (live + save every
+# 200 response into a snapshot), or replay (serve a snapshot from memory, no network).
+#
+# Snapshots live under FPL_SNAPSHOT_DIR:
+#   blobs/ab/abcdef….json.gz   gzip'd response bodies, named by sha256 (shared, deduplicated)
+#   <tag>.json                 manifest: path → blob sha + capture time, plus the GW and times
+# Paths are relative to the API root ("bootstrap-static/", "element-summary/12/"), so a
+# snapshot replays under any FPL_API_BASE.
+from __future__ import annotations
+import atexit, gzip, hashlib, json, os, random, threading, time
+from datetime import datetime, timezone
+import requests
+
+SNAPSHOT_VERSION = 1
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class Reply:
+    """The slice of requests.Response that fpl.api reads."""
+
+    def __init__(self, status_code: int, content: bytes = b"", headers: dict | None = None, url: str = ""):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.url = url
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} for {self.url} (replay)", response=self)
+
+
+class LiveTransport:
+    local = False   # real network: fpl.api applies its rate limiter
+
+    def get(self, url: str, path: str, timeout: float):
+        return requests.get(url, timeout=timeout)
+
+
+class SnapshotStore:
+    """Content-addressed blobs plus one manifest per snapshot tag."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+
+    def manifest_path(self, tag: str) -> str:
+        return os.path.join(self.root, f"{tag}.json")
+
+    def put_blob(self, body: bytes) -> str:
+        sha = hashlib.sha256(body).hexdigest()
+        path = os.path.join(self.blob_dir, sha[:2], f"{sha}.json.gz")
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(gzip.compress(body, compresslevel=6))
+            os.replace(tmp, path)
+        return sha
+
+    def get_blob(self, sha: str) -> bytes:
+        with open(os.path.join(self.blob_dir, sha[:2], f"{sha}.json.gz"), "rb") as f:
+            return gzip.decompress(f.read())
+
+    def load_manifest(self, tag: str) -> dict:
+        with open(self.manifest_path(tag), encoding="utf-8") as f:
+            man = json.load(f)
+        if man.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"snapshot {tag}: unsupported version {man.get('version')}")
+        return man
+
+    def save_manifest(self, tag: str, man: dict):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.manifest_path(tag) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(man, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.manifest_path(tag))
+
+    def tags(self) -> list[dict]:
+        """Snapshots on disk, newest first: tag, gw, created, entries."""
+        out = []
+        if not os.path.isdir(self.root):
+            return out
+        for fn in os.listdir(self.root):
+            if fn.endswith(".json"):
+                try:
+                    man = self.load_manifest(fn[:-5])
+                except (ValueError, OSError, json.JSONDecodeError):
+                    continue
+                out.append({"tag": fn[:-5], "gw": man.get("gw"), "created": man.get("created"),
+                            "entries": len(man.get("entries", {}))})
+        return sorted(out, key=lambda r: r["created"] or "", reverse=True)
+
+    def latest(self) -> str | None:
+        tags = self.tags()
+        return tags[0]["tag"] if tags else None
+
+
+def _current_gw(bootstrap: dict) -> int | None:
+    events = bootstrap.get("events", [])
+    cur = [e["id"] for e in events if e.get("is_current")]
+    if cur:
+        return int(cur[0])
+    upcoming = [e["id"] for e in events if not e.get("finished")]
+    return int(min(upcoming)) if upcoming else None
+
+
+class RecordTransport:
+    """Live requests; every 200 body is stored and indexed under `tag` (manifest flushed at exit)."""
+    local = False
+    FLUSH_EVERY = 100
+
+    def __init__(self, store: SnapshotStore, tag: str | None = None, inner: LiveTransport | None = None,
+                 clock=None):
+        self.store = store
+        self.inner = inner or LiveTransport()
+        self.clock = clock or _now   # capture timestamps (synthetic seasons back-date them)
+        self.tag = tag or f"snap-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}"
+        self.manifest = {"version": SNAPSHOT_VERSION, "created": self.clock(), "finished": None, "gw": None,
+                         "entries": {}}
+        self._lock = threading.Lock()
+        self._dirty = 0
+        atexit.register(self.flush)
+
+    def get(self, url: str, path: str, timeout: float):
+        r = self.inner.get(url, path, timeout)
+        if r.status_code == 200:
+            body = r.content
+            sha = self.store.put_blob(body)
+            with self._lock:
+                self.manifest["entries"][path] = {"sha": sha, "at": self.clock(), "bytes": len(body)}
+                if path.startswith("bootstrap-static"):
+                    try:
+                        self.manifest["gw"] = _current_gw(json.loads(body))
+                    except ValueError:
+                        pass
+                self._dirty += 1
+                flush = self._dirty >= self.FLUSH_EVERY
+            if flush:
+                self.flush()
+        return r
+
+    def flush(self):
+        with self._lock:
+            self.manifest["finished"] = self.clock()
+            self._dirty = 0
+            man = json.loads(json.dumps(self.manifest))
+        self.store.save_manifest(self.tag, man)
+
+
+class ReplayTransport:
+    """
+    Serves a snapshot from memory (blobs are read once, on first use). Paths not in
+    the snapshot get 404. `latency` seconds are slept per request and `error_rate`
+    of requests answer 503, to exercise retries and slow paths without a network.
+    """
+    local = True   # no rate limiting needed
+
+    def __init__(self, store: SnapshotStore, tag: str | None = None, latency: float = 0.0,
+                 error_rate: float = 0.0, seed: int | None = None, preload: bool = False):
+        self.store = store
+        self.tag = tag or store.latest()
+        if self.tag is None:
+            raise FileNotFoundError(f"no snapshots under {store.root}")
+        self.manifest = store.load_manifest(self.tag)
+        self.entries = self.manifest["entries"]
+        self.latency = float(latency)
+        self.error_rate = float(error_rate)
+        self._rng = random.Random(seed)
+        self._bodies: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self.misses = 0
+        if preload:
+            for path in self.entries:
+                self._body(path)
+
+    def _body(self, path: str) -> bytes | None:
+        body = self._bodies.get(path)
+        if body is None:
+            ent = self.entries.get(path)
+            if ent is None:
+                return None
+            body = self.store.get_blob(ent["sha"])
+            with self._lock:
+                self._bodies[path] = body
+        return body
+
+    def get(self, url: str, path: str, timeout: float):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            return Reply(503, b"", {"Retry-After": "0"}, url)
+        body = self._body(path)
+        if body is None:
+            self.misses += 1
+            return Reply(404, b"", {}, url)
+        return Reply(200, body, {"Content-Type": "application/json"}, url)
+
+
+def make_transport(spec: str, snapshot_dir: str, latency: float = 0.0, error_rate: float = 0.0):
+    """
+    "live" | "record[:tag]" | "replay[:tag]" (replay without a tag = newest snapshot).
+    """
+    mode, _, tag = (spec or "live").partition(":")
+    mode = mode.strip().lower()
+    if mode == "live":
+        return LiveTransport()
+    store = SnapshotStore(snapshot_dir)
+    if mode == "record":
+        return RecordTransport(store, tag or None)
+    if mode == "replay":
+        return ReplayTransport(store, tag or None, latency=latency, error_rate=error_rate)
+    raise ValueError(f"unknown FPL_TRANSPORT {spec!r} (live, record[:tag], replay[:tag])")
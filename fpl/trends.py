@@ -0,0 +1,239 @@
+# fpl/trends.py
+# Columnar store of bootstrap-static snapshots: price / ownership / transfer trends.
+#
+# Layout: data/trends/<season>/seg_00000.npz, one segment per SEGMENT_ROWS snapshots.
+# Each segment holds `ts` (epoch s), `gw`, and one (T, P) array per field indexed by
+# element id. Row 0 of a field is absolute, rows 1.. are deltas to the previous row,
+# so unchanged values compress to nothing. Appends take a lock file next to the segments,
+# so the app, API and worker processes can share one store.
+from __future__ import annotations
+import glob, io, os, threading, time
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+from config import SEASON
+
+TRENDS_DIR = os.getenv("FPL_TRENDS_DIR", os.path.join("data", "trends"))
+SEGMENT_ROWS = 168  # a week of hourly snapshots
+STATUS_CODES = "adinsu"
+DAY = 86400
+
+# field -> (bootstrap key, dtype, scale). Floats are stored as scaled integers.
+FIELDS = {
+    "now_cost": ("now_cost", np.int16, 1),
+    "selected_by": ("selected_by_percent", np.int16, 10),
+    "transfers_in_event": ("transfers_in_event", np.int32, 1),
+    "transfers_out_event": ("transfers_out_event", np.int32, 1),
+    "form": ("form", np.int16, 10),
+    "status": ("status", np.int8, None),
+    "present": (None, np.int8, None),
+}
+
+
+def _encode(elements: list[dict]) -> dict[str, np.ndarray]:
+    """One snapshot row per field, indexed by element id."""
+    df = pd.DataFrame(elements)
+    ids = df["id"].to_numpy(dtype=np.int64)
+    width = int(ids.max()) + 1 if len(ids) else 1
+    row = {}
+    for name, (key, dtype, scale) in FIELDS.items():
+        arr = np.zeros(width, dtype=dtype)
+        if name == "present":
+            arr[ids] = 1
+        elif name == "status":
+            codes = df["status"].map({c: i for i, c in enumerate(STATUS_CODES)}) if "status" in df else None
+            arr[ids] = codes.fillna(0).to_numpy(dtype=dtype) if codes is not None else 0
+        elif key in df:
+            vals = pd.to_numeric(df[key], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+            arr[ids] = np.rint(vals * scale).astype(dtype)
+        row[name] = arr
+    return row
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive inter-process lock on `path` (created if missing), held for the block."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _pad(arr: np.ndarray, width: int) -> np.ndarray:
+    if arr.shape[-1] >= width:
+        return arr
+    pad = [(0, 0)] * (arr.ndim - 1) + [(0, width - arr.shape[-1])]
+    return np.pad(arr, pad)
+
+
+class TrendStore:
+    """Append bootstrap snapshots; query deltas and rolling trends across the season."""
+
+    def __init__(self, root: str = TRENDS_DIR, season: str = SEASON, clock=time.time):
+        self.dir = os.path.join(root, season)
+        self.clock = clock          # stamps appends made without an explicit ts (backtests replay capture times)
+        self._lock = threading.Lock()
+        self._cache_key = None
+        self._cache: dict | None = None
+
+    # ---------- storage ----------
+    def _segments(self) -> list[str]:
+        return sorted(glob.glob(os.path.join(self.dir, "seg_*.npz")))
+
+    @staticmethod
+    def _read_segment(path: str) -> dict[str, np.ndarray]:
+        with np.load(path) as z:
+            seg = {k: z[k] for k in z.files}
+        for name in FIELDS:
+            seg[name] = np.cumsum(seg[name], axis=0, dtype=seg[name].dtype)
+        return seg
+
+    @staticmethod
+    def _write_segment(path: str, seg: dict[str, np.ndarray]):
+        out = {"ts": seg["ts"], "gw": seg["gw"]}
+        for name in FIELDS:
+            a = seg[name]
+            out[name] = np.concatenate([a[:1], np.diff(a, axis=0)]).astype(a.dtype)
+        buf = io.BytesIO()
+        np.savez_compressed(buf, **out)
+        tmp = f"{path}.{os.getpid()}.tmp"   # this process's appends are serialized by the locks
+        with open(tmp, "wb") as f:
+            f.write(buf.getvalue())
+        os.replace(tmp, path)
+
+    def append(self, bootstrap: dict, gw: int | None = None, ts: float | None = None) -> bool:
+        """Store one snapshot. Returns False if it is identical to the previous one."""
+        elements = bootstrap.get("elements") or []
+        if not elements:
+            return False
+        row = _encode(elements)
+        ts = int(ts if ts is not None else self.clock())
+        os.makedirs(self.dir, exist_ok=True)
+        with self._lock, _file_lock(os.path.join(self.dir, ".lock")):
+            segs = self._segments()
+            seg = self._read_segment(segs[-1]) if segs else None
+            if seg is not None:
+                width = max(seg["present"].shape[1], row["present"].shape[0])
+                last = {k: _pad(seg[k][-1], width) for k in FIELDS}
+                if all(np.array_equal(last[k], _pad(row[k], width)) for k in FIELDS):
+                    return False
+            if seg is None or len(seg["ts"]) >= SEGMENT_ROWS:
+                path = os.path.join(self.dir, f"seg_{len(segs):05d}.npz")
+                seg = {"ts": np.zeros(0, np.int64), "gw": np.zeros(0, np.int16)}
+                seg.update({k: np.zeros((0, len(row[k])), dtype=FIELDS[k][1]) for k in FIELDS})
+            else:
+                path = segs[-1]
+            width = max(seg["present"].shape[1], row["present"].shape[0])
+            seg["ts"] = np.append(seg["ts"], np.int64(ts))
+            seg["gw"] = np.append(seg["gw"], np.int16(gw or 0))
+            for k in FIELDS:
+                seg[k] = np.vstack([_pad(seg[k], width), _pad(row[k], width)[None, :]])
+            self._write_segment(path, seg)
+            self._cache_key = None
+        return True
+
+    def load(self) -> dict[str, np.ndarray]:
+        """Dense, absolute (T, P) arrays for the whole season; cached until a segment changes."""
+        segs = self._segments()
+        key = tuple((p, os.path.getmtime(p), os.path.getsize(p)) for p in segs)
+        with self._lock:
+            if self._cache is not None and key == self._cache_key:
+                return self._cache
+            parts = [self._read_segment(p) for p in segs]
+            width = max((s["present"].shape[1] for s in parts), default=1)
+            data = {
+                "ts": np.concatenate([s["ts"] for s in parts]) if parts else np.zeros(0, np.int64),
+                "gw": np.concatenate([s["gw"] for s in parts]) if parts else np.zeros(0, np.int16),
+            }
+            for k in FIELDS:
+                data[k] = (np.vstack([_pad(s[k], width) for s in parts]) if parts
+                           else np.zeros((0, width), dtype=FIELDS[k][1]))
+            self._cache, self._cache_key = data, key
+            return data
+
+    def size_bytes(self) -> int:
+        return sum(os.path.getsize(p) for p in self._segments())
+
+    # ---------- queries ----------
+    def values(self, field: str, start: int = 0) -> np.ndarray:
+        """(T, P) float array in natural units (£m tenths, %, form points) from row `start`."""
+        scale = FIELDS[field][2] or 1
+        return self.load()[field][start:].astype(np.float64) / scale
+
+    def _row_at(self, ts: float) -> int:
+        """Index of the last snapshot at or before `ts` (0 if none)."""
+        return max(0, int(np.searchsorted(self.load()["ts"], ts, side="right")) - 1)
+
+    def delta(self, field: str, hours: float) -> np.ndarray:
+        """Latest value minus the value `hours` ago, per element id."""
+        data = self.load()
+        if len(data["ts"]) == 0:
+            return np.zeros(0)
+        then = self._row_at(data["ts"][-1] - hours * 3600)
+        vals = self.values(field, start=then)
+        return vals[-1] - vals[0]
+
+    def slope(self, field: str, hours: float) -> np.ndarray:
+        """Least-squares slope per day over the trailing window, per element id."""
+        data = self.load()
+        if len(data["ts"]) < 2:
+            return np.zeros(data["present"].shape[1])
+        lo = self._row_at(data["ts"][-1] - hours * 3600)
+        y = self.values(field, start=lo)
+        x = (data["ts"][lo:] - data["ts"][lo:].mean()) / DAY
+        den = float((x * x).sum())
+        if den == 0:
+            return np.zeros(y.shape[1])
+        return (x[:, None] * (y - y.mean(axis=0))).sum(axis=0) / den
+
+    def trend_frame(self) -> pd.DataFrame:
+        """Per-player trend columns, indexed by element id (empty until two snapshots exist)."""
+        data = self.load()
+        if len(data["ts"]) < 2:
+            return pd.DataFrame()
+        ids = np.flatnonzero(data["present"][-1])
+        cols = {
+            "price_chg_24h": self.delta("now_cost", 24)[ids] / 10.0,
+            "price_chg_7d": self.delta("now_cost", 24 * 7)[ids] / 10.0,
+            "own_chg_24h": self.delta("selected_by", 24)[ids],
+            "own_chg_7d": self.delta("selected_by", 24 * 7)[ids],
+            "own_slope_7d": self.slope("selected_by", 24 * 7)[ids],
+            "form_slope_7d": self.slope("form", 24 * 7)[ids],
+            "net_transfers_event": (data["transfers_in_event"][-1] - data["transfers_out_event"][-1])[ids],
+        }
+        return pd.DataFrame(cols, index=pd.Index(ids, name="id")).astype(
+            {k: np.float32 for k in cols if k != "net_transfers_event"}
+        )
+
+
+_store: TrendStore | None = None
+
+
+def get_store() -> TrendStore:
+    global _store
+    if _store is None:
+        _store = TrendStore()
+    return _store
+
+
+def set_store(store: TrendStore | None) -> TrendStore | None:
+    """Swap the process-wide store (None: back to the default on next use); returns the previous one."""
+    global _store
+    prev, _store = _store, store
+    return prev
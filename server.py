@@ -0,0 +1,336 @@
+# server.py
+"""
+Async JSON API alongside the Streamlit app: KB, leaderboards, fixtures, similarity,
+per-user season state/logs and the AI manager run.
+
+    python server.py --port 8000 --workers 4
+    uvicorn server:app --workers 4
+
+Each worker process keeps one KB snapshot (KB text, players, leaderboard and
+similarity indexes) for FPL_API_KB_TTL seconds; concurrent requests for a stale
+snapshot share one rebuild. Blocking work (KB build, DB, decision engine) runs in
+the threadpool so the event loop keeps serving reads.
+
+The routes that spend LLM calls or write state (run, enqueue, refresh) need
+`Authorization: Bearer $FPL_API_TOKEN`; with no token set they are disabled.
+"""
+from __future__ import annotations
+import argparse, asyncio, hmac, json, os, time
+from contextlib import asynccontextmanager
+import numpy as np
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+import fpl.api as fpl_api
+from fpl import metrics
+from fpl.leaderboards import POSITIONS, PRICE_BANDS
+from fpl.snapshot import KbSnapshot, build_snapshot
+from fpl.ai_manager.persist_db import init_db, load_state, get_gw_logs, list_users, enqueue_job, job_stats
+from fpl.ai_manager.decision import (session_scope, ensure_initial_squad_with_ai, run_ai_auto_until_current,
+                                      user_run_lease)
+from config import MODEL_NAME
+
+KB_TTL = float(os.getenv("FPL_API_KB_TTL", "900"))          # seconds a snapshot is served before rebuilding
+API_TOKEN = os.getenv("FPL_API_TOKEN", "")                  # shared secret for run / enqueue / refresh
+MAX_ROWS = 200
+
+
+def _default(o):
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, (pd.Timestamp, pd.Timedelta)):
+        return str(o)
+    raise TypeError(f"not JSON serializable: {type(o).__name__}")
+
+
+def _json(obj, status: int = 200) -> Response:
+    return Response(json.dumps(obj, default=_default), status_code=status, media_type="application/json")
+
+
+def _records(df: pd.DataFrame) -> list[dict]:
+    # to_json turns NaN into null, which json.dumps would refuse
+    return json.loads(df.to_json(orient="records"))
+
+
+def _error(msg: str, status: int = 400) -> Response:
+    return _json({"error": msg}, status)
+
+
+def _denied(request: Request) -> Response | None:
+    """The error for a mutating route without the deployment's bearer token; None when allowed."""
+    if not API_TOKEN:
+        return _error("this route is disabled here (set FPL_API_TOKEN to enable it)", 403)
+    if not hmac.compare_digest(request.headers.get("authorization", "").encode(), f"Bearer {API_TOKEN}".encode()):
+        return _error("missing or wrong bearer token", 401)
+    return None
+
+
+class _BadParam(ValueError):
+    """A malformed query parameter; answered as a 400 by the app's exception handler."""
+
+
+def _number(q, name: str, kind=int, default=None, lo=None):
+    """Query parameter `name` as int/float (`default` if absent), at least `lo`."""
+    raw = q.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        val = kind(raw)
+    except ValueError:
+        raise _BadParam(f"{name} must be {'an integer' if kind is int else 'a number'}, got {raw!r}") from None
+    if lo is not None and val < lo:
+        raise _BadParam(f"{name} must be >= {lo}, got {raw!r}")
+    return val
+
+
+def _ids(q, name: str = "ids") -> list[int]:
+    try:
+        return [int(x) for x in q.get(name, "").split(",") if x.strip()]
+    except ValueError:
+        raise _BadParam(f"{name} must be comma-separated integers") from None
+
+
+async def _bad_param(request: Request, exc: _BadParam) -> Response:
+    return _error(str(exc))
+
+
+# ---------- KB snapshot (one per worker process) ----------
+class KbCache:
+    """Serves the current snapshot; one rebuild at a time (others await it)."""
+
+    def __init__(self, ttl: float = KB_TTL):
+        self.ttl = ttl
+        self.current: KbSnapshot | None = None
+        self.builds = 0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self.current is not None and time.time() - self.current.built_at < self.ttl
+
+    async def get(self, force: bool = False) -> KbSnapshot:
+        if not force and self._fresh():
+            return self.current
+        epoch = self.builds
+        async with self._lock:
+            if self.builds != epoch or (not force and self._fresh()):
+                return self.current   # someone else rebuilt while we waited
+            fpl_api.clear_live_caches()   # a rebuild from the cached responses would serve the same data
+            snap = await run_in_threadpool(build_snapshot)
+            self.builds += 1
+            snap.epoch = self.builds
+            self.current = snap
+            return snap
+
+
+KB = KbCache()
+_user_locks: dict[str, asyncio.Lock] = {}
+
+
+def _user_lock(uid: str) -> asyncio.Lock:
+    return _user_locks.setdefault(uid, asyncio.Lock())
+
+
+# ---------- endpoints ----------
+async def health(request: Request) -> Response:
+    snap = KB.current
+    return _json({"ok": True, "pid": os.getpid(), "kb_epoch": snap.epoch if snap else None,
+                  "kb_age": round(time.time() - snap.built_at, 1) if snap else None,
+                  "fpl_api": fpl_api.api_stats()})
+
+
+async def kb(request: Request) -> Response:
+    snap = await KB.get()
+    meta = {k: v for k, v in snap.kb_meta.items() if isinstance(v, (str, int, float, type(None)))}
+    out = {"epoch": snap.epoch, "meta": meta}
+    if request.query_params.get("text", "1") != "0":
+        out["text"] = snap.full_kb
+    return _json(out)
+
+
+async def players(request: Request) -> Response:
+    snap = await KB.get()
+    df = snap.players_df
+    q = request.query_params
+    if q.get("pos"):
+        df = df[df["pos"].astype(str) == q["pos"].upper()]
+    if q.get("team"):
+        df = df[df["team_short"].astype(str) == q["team"].upper()]
+    max_price = _number(q, "max_price", float)
+    if max_price is not None:
+        df = df[df["price"] <= max_price]
+    if q.get("ids"):
+        df = df[df["id"].isin(_ids(q))]
+    limit = min(_number(q, "limit", default=MAX_ROWS, lo=0), MAX_ROWS)
+    return _json({"count": int(len(df)), "players": _records(df.head(limit))})
+
+
+async def leaderboards(request: Request) -> Response:
+    snap = await KB.get()
+    lb = snap.leaderboards
+    q = request.query_params
+    metric, pos, band = q.get("metric", "selected_by"), q.get("pos", "ALL").upper(), q.get("band", "All prices")
+    if metric not in lb.metrics or pos not in POSITIONS or band not in PRICE_BANDS:
+        return _error(f"metric in {lb.metrics}, pos in {POSITIONS}, band in {list(PRICE_BANDS)}")
+    k = min(_number(q, "k", default=20, lo=1), lb.k)
+    return _json({"metric": metric, "pos": pos, "band": band, "rows": _records(lb.top(metric, pos, band, k=k))})
+
+
+async def fixtures(request: Request) -> Response:
+    snap = await KB.get()
+    fx = snap.fixtures
+    gw = _number(request.query_params, "gw", lo=1)
+    if gw is not None:
+        fx = [f for f in fx if f.get("event") == gw]
+    return _json({"gw": snap.kb_meta.get("gw"), "by_team": snap.fixtures_text, "fixtures": fx})
+
+
+async def similar(request: Request) -> Response:
+    snap = await KB.get()
+    idx = snap.similarity
+    q = request.query_params
+    name = request.path_params["player"]
+    pid = int(name) if name.isdigit() else idx.find(name)
+    if pid is None or pid not in idx.row_of:
+        return _error(f"no player matching '{name}'", 404)
+    df = idx.similar(pid, k=min(_number(q, "k", default=5, lo=1), 15),
+                     max_price=_number(q, "max_price", float),
+                     pos=q.get("pos", "").upper() or None)
+    return _json({"player_id": pid, "similar": _records(df)})
+
+
+async def users(request: Request) -> Response:
+    return _json({"users": await run_in_threadpool(list_users)})
+
+
+async def user_state(request: Request) -> Response:
+    state = await run_in_threadpool(load_state, request.path_params["uid"])
+    if state is None:
+        return _error("no saved state", 404)
+    return _json(state)
+
+
+async def user_logs(request: Request) -> Response:
+    logs = await run_in_threadpool(get_gw_logs, request.path_params["uid"])
+    since = _number(request.query_params, "since_gw", default=0)
+    return _json({"logs": [e for e in logs if int(e.get("gw") or 0) >= since]})
+
+
+def _run_user(uid: str, api_key: str, snap: KbSnapshot, extra: str | None) -> dict | None:
+    """Run under the user's job lease (user_run_lease loads the saved state); None while busy."""
+    with session_scope(snap.session_values(api_key, {"squad": []})) as s, \
+            user_run_lease(uid, f"api:{os.getpid()}") as lease:
+        if lease is None:
+            return None
+        ensure_initial_squad_with_ai(user_id=uid, players_df=snap.players_df, kb_text=snap.full_kb,
+                                     model_name=MODEL_NAME, budget=100.0)
+        timings = run_ai_auto_until_current(user_id=uid, kb_meta=snap.kb_meta, players_df=snap.players_df,
+                                            model_name=MODEL_NAME, extra_instructions=extra,
+                                            keep_going=lease.alive)
+        state = s.auto_mgr
+    return {"timings": timings, "last_gw_processed": state.get("last_gw_processed"),
+            "squad": state.get("squad", []), "bank": state.get("bank"),
+            "free_transfers": state.get("free_transfers"), "chips": state.get("chips")}
+
+
+async def run_user(request: Request) -> Response:
+    denied = _denied(request)
+    if denied is not None:
+        return denied
+    uid = request.path_params["uid"]
+    api_key = request.headers.get("x-openai-key") or os.getenv("OPENAI_API_KEY", "")
+    if not api_key:
+        return _error("OpenAI key required (X-OpenAI-Key header or OPENAI_API_KEY)", 401)
+    body = {}
+    if await request.body():
+        try:
+            body = await request.json()
+        except ValueError:
+            return _error("body must be JSON")
+    snap = await KB.get()
+    lock = _user_lock(uid)
+    if lock.locked() and body.get("wait") is False:
+        return _error("a run for this user is already in progress", 409)
+    async with lock:   # one run per user per worker; DB state is the source of truth between runs
+        out = await run_in_threadpool(_run_user, uid, api_key, snap, body.get("extra_instructions"))
+    if out is None:   # a worker or another API process holds the user's lease
+        return _error("a run for this user is already in progress", 409)
+    return _json(out)
+
+
+async def enqueue(request: Request) -> Response:
+    """Queue a run for worker.py instead of running here (POST /users/{uid}/enqueue?gw=N)."""
+    denied = _denied(request)
+    if denied is not None:
+        return denied
+    gw = _number(request.query_params, "gw", lo=1)
+    if gw is None:
+        gw = (await KB.get()).gw
+        if gw is None:
+            return _error("no current GW in the KB; pass ?gw=N", 409)
+    job_id = await run_in_threadpool(enqueue_job, request.path_params["uid"], int(gw))
+    return _json({"job_id": job_id, "target_gw": int(gw)})
+
+
+async def jobs(request: Request) -> Response:
+    return _json(await run_in_threadpool(job_stats))
+
+
+async def prometheus(request: Request) -> Response:
+    return Response(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+async def refresh(request: Request) -> Response:
+    denied = _denied(request)
+    if denied is not None:
+        return denied
+    snap = await KB.get(force=True)
+    return _json({"epoch": snap.epoch, "gw": snap.kb_meta.get("gw")})
+
+
+@asynccontextmanager
+async def _lifespan(app):
+    await run_in_threadpool(init_db)
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health),
+        Route("/kb", kb),
+        Route("/players", players),
+        Route("/leaderboards", leaderboards),
+        Route("/fixtures", fixtures),
+        Route("/similar/{player}", similar),
+        Route("/users", users),
+        Route("/users/{uid}/state", user_state),
+        Route("/users/{uid}/logs", user_logs),
+        Route("/users/{uid}/run", run_user, methods=["POST"]),
+        Route("/users/{uid}/enqueue", enqueue, methods=["POST"]),
+        Route("/jobs", jobs),
+        Route("/metrics", prometheus),
+        Route("/refresh", refresh, methods=["POST"]),
+    ],
+    lifespan=_lifespan,
+    exception_handlers={_BadParam: _bad_param},
+)
+
+
+def main():
+    import uvicorn
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--host", default=os.getenv("FPL_API_HOST", "127.0.0.1"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("FPL_API_PORT", "8000")))
+    ap.add_argument("--workers", type=int, default=int(os.getenv("FPL_API_WORKERS", "1")))
+    ap.add_argument("--app", default="server:app", help="import string (bench.service_app:app for the stub LLM)")
+    a = ap.parse_args()
+    uvicorn.run(a.app, host=a.host, port=a.port, workers=a.workers, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
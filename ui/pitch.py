@@ -71,8 +71,8 @@ _PITCH_CSS = """
 </style>
 """
 
-def _player_card(row: pd.Series, is_captain: bool = False) -> str:
-    name = row.get("web_name", f"ID {int(row['id'])}")
+def _player_card(row: dict, is_captain: bool = False) -> str:
+    name = row.get("web_name") or f"ID {int(row['id'])}"
     team = row.get("team_short", "")
     price = f"£{float(row.get('price', 0.0)):.1f}m"
     pos = row.get("pos", "")
@@ -86,44 +86,28 @@ def _player_card(row: pd.Series, is_captain: bool = False) -> str:
     </div>
     """
 
-def render_pitch(players_df: pd.DataFrame, xi_ids: Iterable[int], bench_ids: Iterable[int], captain_id: int | None):
-    """
-    Render an FPL-style pitch: GK row, DEF row, MID row, FWD row; bench below.
-    - players_df must have: id, web_name, team_short, pos, price
-    - xi_ids: 11 ids; bench_ids: 4 ids in order; captain_id in xi_ids
-    """
+def players_by_id(players_df: pd.DataFrame) -> pd.DataFrame:
+    return players_df.drop_duplicates("id").set_index("id", drop=False)
+
+def pitch_html(by_id: pd.DataFrame, xi_ids: Iterable[int], bench_ids: Iterable[int], captain_id: int | None) -> str:
+    """Pitch markup (no CSS) from a players frame indexed by id (see players_by_id)."""
     xi_ids = [int(x) for x in (xi_ids or [])]
     bench_ids = [int(x) for x in (bench_ids or [])]
     cap = int(captain_id or 0)
+    xi = by_id.loc[by_id.index.intersection(xi_ids)]
+    bench = by_id.loc[by_id.index.intersection(bench_ids)]
 
-    if len(xi_ids) == 0:
-        st.info("No XI available to render.")
-        return
-
-    xi = players_df[players_df["id"].isin(xi_ids)].copy()
-    bench = players_df[players_df["id"].isin(bench_ids)].copy()
-
-    # Group XI by position
-    gk  = xi[xi["pos"] == "GK"].sort_values("web_name")
-    defs = xi[xi["pos"] == "DEF"].sort_values("web_name")
-    mids = xi[xi["pos"] == "MID"].sort_values("web_name")
-    fwds = xi[xi["pos"] == "FWD"].sort_values("web_name")
-
-    # Inject CSS once
-    st.markdown(_PITCH_CSS, unsafe_allow_html=True)
-
-    # Build HTML rows
     def _row_html(df: pd.DataFrame) -> str:
-        cards = "".join(_player_card(r, is_captain=(int(r["id"]) == cap)) for _, r in df.iterrows())
+        cards = "".join(_player_card(r, is_captain=(int(r["id"]) == cap)) for r in df.to_dict("records"))
         return f'<div class="row">{cards}</div>'
 
-    pitch_html = f"""
+    # XI by position (GK, DEF, MID, FWD rows), bench in the order given
+    rows = "".join(_row_html(xi[xi["pos"] == pos].sort_values("web_name")) for pos in ("GK", "DEF", "MID", "FWD"))
+    bench = bench.reindex([b for b in bench_ids if b in bench.index])
+    return f"""
     <div class="pitch-wrap">
       <div class="pitch">
-        {_row_html(gk)}
-        {_row_html(defs)}
-        {_row_html(mids)}
-        {_row_html(fwds)}
+        {rows}
         <div class="bench">
           <div class="bench-title">Bench</div>
           {_row_html(bench)}
@@ -132,4 +116,38 @@ def render_pitch(players_df: pd.DataFrame, xi_ids: Iterable[int], bench_ids: Ite
     </div>
     """
 
-    st.markdown(pitch_html, unsafe_allow_html=True)
+@st.cache_data(show_spinner=False, max_entries=512)
+def cached_pitch_html(_by_id: pd.DataFrame, kb_hash: str, squad_ids: tuple, xi_ids: tuple, bench_ids: tuple,
+                      captain_id: int) -> str:
+    """pitch_html memoized per (squad, XI, bench, captain, KB hash); _by_id must belong to that KB."""
+    return pitch_html(_by_id, xi_ids, bench_ids, captain_id)
+
+def inject_pitch_css():
+    st.markdown(_PITCH_CSS, unsafe_allow_html=True)
+
+def render_pitch(players_df: pd.DataFrame, xi_ids: Iterable[int], bench_ids: Iterable[int], captain_id: int | None,
+                 kb_hash: str | None = None, by_id: pd.DataFrame | None = None, css: bool = True):
+    """
+    Render an FPL-style pitch: GK row, DEF row, MID row, FWD row; bench below.
+    - players_df must have: id, web_name, team_short, pos, price
+    - xi_ids: 11 ids; bench_ids: 4 ids in order; captain_id in xi_ids
+    - with a KB hash the HTML is cached (pass by_id to skip re-indexing players_df);
+      css=False when the caller already injected it via inject_pitch_css() this run
+    """
+    xi_ids = tuple(int(x) for x in (xi_ids or []))
+    bench_ids = tuple(int(x) for x in (bench_ids or []))
+    cap = int(captain_id or 0)
+
+    if len(xi_ids) == 0:
+        st.info("No XI available to render.")
+        return
+
+    if by_id is None:
+        by_id = players_by_id(players_df)
+    if kb_hash is None:
+        html = pitch_html(by_id, xi_ids, bench_ids, cap)
+    else:
+        html = cached_pitch_html(by_id, kb_hash, tuple(sorted(xi_ids + bench_ids)), xi_ids, bench_ids, cap)
+    if css:
+        inject_pitch_css()
+    st.markdown(html, unsafe_allow_html=True)
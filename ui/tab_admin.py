@@ -0,0 +1,99 @@
+# ui/tab_admin.py
+import os
+import streamlit as st
+import pandas as pd
+
+from fpl import metrics
+from fpl.ai_manager.persist_db import job_stats, query_page, QUERY_MAX_ROWS
+from fpl.ai_manager.routing import route_stats
+
+# The tab shows process-wide metrics, job queue and profiler controls to whoever opens the
+# app, so it only exists on deployments that opt in (FPL_ADMIN=1). The SQL box reads every
+# user's data and needs its own opt-in on top (FPL_ADMIN_SQL=1).
+ADMIN_TAB = os.getenv("FPL_ADMIN", "") == "1"
+ADMIN_SQL = ADMIN_TAB and os.getenv("FPL_ADMIN_SQL", "") == "1"
+
+
+def _render_sql():
+    sql = st.text_area("Query", key="admin_sql", height=90,
+                       placeholder="SELECT user_id, gw, created_at FROM gw_logs ORDER BY user_id, gw")
+    c1, c2, c3 = st.columns([1, 1, 2])
+    with c1:
+        rows = st.number_input("Rows / page", min_value=10, max_value=QUERY_MAX_ROWS, value=min(500, QUERY_MAX_ROWS),
+                               step=100, key="admin_sql_rows")
+    last = st.session_state.get("admin_sql_result")
+    token = None
+    with c2:
+        run = st.button("Run", disabled=not sql.strip())
+    with c3:
+        more = st.button("Next page", disabled=not (last and last["sql"] == sql and last["next"]))
+    if more:
+        token = last["next"]
+    if run or more:
+        try:
+            page = query_page(sql, page_token=token, max_rows=int(rows), arrow=True)
+            st.session_state.admin_sql_result = {
+                "sql": sql, "next": page.next_token, "table": page.table(), "page": (last["page"] + 1) if more else 1,
+                "caption": f"{page.rows} rows · ~{page.nbytes / 2**20:.1f} MiB · {page.elapsed:.2f}s"
+                           + (f" · stopped at the {page.truncated} limit" if page.truncated else ""),
+            }
+        except Exception as e:
+            st.session_state.pop("admin_sql_result", None)
+            st.error(f"{type(e).__name__}: {e}")
+    res = st.session_state.get("admin_sql_result")
+    if res:
+        st.caption(f"Page {res['page']} · {res['caption']}")
+        st.dataframe(res["table"], use_container_width=True, hide_index=True)
+
+
+@st.fragment
+def render_admin_tab():
+    st.subheader("🛠 Admin: metrics & profiling")
+
+    rows = pd.DataFrame(metrics.snapshot())
+    if rows.empty:
+        st.info("No metrics recorded yet in this process.")
+    else:
+        needle = st.text_input("Filter metrics", key="admin_metric_filter", placeholder="e.g. llm, db_, http")
+        if needle:
+            rows = rows[rows["metric"].str.contains(needle, case=False, regex=False)]
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+    st.caption("Process-wide since start (shared by every session). Histograms: value = total seconds.")
+
+    c1, c2 = st.columns(2)
+    with c1:
+        st.download_button("⬇ Prometheus text", metrics.render_prometheus(), file_name="fpl_metrics.prom",
+                           mime="text/plain")
+    with c2:
+        if st.button("Reset metrics"):
+            metrics.reset()
+            st.rerun()
+
+    with st.expander("LLM routes"):
+        routes = route_stats()
+        if routes:
+            st.dataframe(pd.DataFrame(routes), use_container_width=True, hide_index=True)
+        else:
+            st.caption("No LLM calls yet in this process.")
+
+    with st.expander("Job queue"):
+        try:
+            st.json(job_stats())
+        except Exception as e:
+            st.caption(f"Unavailable: {e}")
+
+    if ADMIN_SQL:
+        with st.expander("SQL (read-only; bounded rows, bytes and time)"):
+            _render_sql()
+
+    st.markdown("---")
+    st.markdown("**Sampling profiler**")
+    if st.button("⏱ Profile next rerun", help="Samples the script thread for one full rerun."):
+        st.session_state.profile_next = True
+        st.rerun()
+    profile = st.session_state.get("last_profile")
+    if profile:
+        st.caption(f"Last profiled rerun: {profile['elapsed']:.2f}s, {profile['samples']} samples")
+        st.dataframe(profile["top"], use_container_width=True, hide_index=True)
+        st.download_button("⬇ Collapsed stacks (flamegraph)", profile["collapsed"], file_name="rerun.folded",
+                           mime="text/plain")
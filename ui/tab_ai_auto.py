@@ -9,15 +9,54 @@ from fpl.ai_manager.decision import (
     run_ai_auto_until_current,
     refresh_logged_points,
     force_redraft_gw1,  # NEW: allow full GW1 re-draft on demand
+    user_run_lease,
 )
+from ui.pitch import players_by_id, render_pitch, inject_pitch_css
 
+LOG_PAGE_SIZE = 5
+BUSY = "A run for this user is already in progress; try again shortly."
+SQUAD_COLS = ["web_name", "team_short", "pos", "price", "form", "status", "selected_by", "points_per_game"]
 
-def _pname(players_df: pd.DataFrame, pid: int) -> str:
-    row = players_df.loc[players_df["id"] == pid]
-    return row["web_name"].iloc[0] if not row.empty else f"ID {pid}"
 
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _players_by_id(_players_df: pd.DataFrame, kb_hash: str) -> pd.DataFrame:
+    """players_df indexed by id, once per KB (name lookups and squad joins)."""
+    return players_by_id(_players_df)
 
-def render_ai_tab(players_df: pd.DataFrame, kb_meta: dict, user_id: str):
+
+def _pname(by_id: pd.DataFrame, pid) -> str:
+    try:
+        return by_id.at[int(pid), "web_name"]
+    except (KeyError, TypeError, ValueError):
+        return f"ID {pid}"
+
+
+def _log_page(logs: list[dict], page: int) -> list[dict]:
+    """One page of log entries, newest first, from the in-memory log (no DB round trip per rerun)."""
+    offset = page * LOG_PAGE_SIZE
+    return sorted(logs, key=lambda x: x["gw"], reverse=True)[offset:offset + LOG_PAGE_SIZE]
+
+
+def _squad_tables(by_id: pd.DataFrame, entries: list[dict]) -> dict[int, pd.DataFrame]:
+    """Each entry's 15-man squad with XI / Bench / Captain marks, via one join for the whole page."""
+    marks = []
+    for i, e in enumerate(entries):
+        xi = set(map(int, e.get("xi_ids", [])))
+        bench = set(map(int, e.get("bench_ids") or e.get("bench_order") or []))
+        cap = int(e.get("captain_id") or 0)
+        marks += [(i, pid, "Yes" if pid in xi else "", "Yes" if pid in bench else "", "C" if pid == cap else "")
+                  for pid in map(int, e.get("squad_ids", []))]
+    if not marks:
+        return {}
+    week = pd.DataFrame(marks, columns=["entry", "pid", "XI", "Bench", "Captain"])
+    week = week.join(by_id[SQUAD_COLS], on="pid", how="inner")
+    week = week.sort_values(["entry", "Captain", "XI", "pos", "web_name"], ascending=[True, False, False, True, True])
+    cols = SQUAD_COLS + ["XI", "Bench", "Captain"]
+    return {i: g[cols] for i, g in week.groupby("entry", sort=False)}
+
+
+@st.fragment
+def render_ai_tab(players_df: pd.DataFrame, kb_meta: dict, user_id: str, kb_hash: str = ""):
     st.subheader("🧠 AI Auto Manager — LLM-only")
 
     if "auto_mgr" not in st.session_state:
@@ -33,25 +72,31 @@ def render_ai_tab(players_df: pd.DataFrame, kb_meta: dict, user_id: str):
         with col1:
             disabled = not bool(st.session_state.openai_key)
             if st.button("🧠 Draft GW1 Squad (AI)", disabled=disabled):
-                with st.spinner("Asking the model to draft your 15..."):
-                    ensure_initial_squad_with_ai(
-                        user_id=user_id,
-                        players_df=players_df,
-                        kb_text=st.session_state.full_kb,
-                        model_name=MODEL_NAME,
-                        budget=100.0,
-                    )
-
-                squad_ids = (st.session_state.get("auto_mgr", {}).get("squad") or [])
-                if len(squad_ids) == 15:
-                    with st.spinner("Locking in GW decisions…"):
-                        run_ai_auto_until_current(
-                            user_id=user_id,
-                            kb_meta=kb_meta,
-                            players_df=players_df,
-                            model_name=MODEL_NAME,
-                            extra_instructions=None,
-                        )
+                with user_run_lease(user_id, "app") as lease:
+                    squad_ids = []
+                    if lease is not None:
+                        with st.spinner("Asking the model to draft your 15..."):
+                            ensure_initial_squad_with_ai(
+                                user_id=user_id,
+                                players_df=players_df,
+                                kb_text=st.session_state.full_kb,
+                                model_name=MODEL_NAME,
+                                budget=100.0,
+                            )
+                        squad_ids = (st.session_state.get("auto_mgr", {}).get("squad") or [])
+                    if len(squad_ids) == 15:
+                        with st.spinner("Locking in GW decisions…"):
+                            run_ai_auto_until_current(
+                                user_id=user_id,
+                                kb_meta=kb_meta,
+                                players_df=players_df,
+                                model_name=MODEL_NAME,
+                                extra_instructions=None,
+                                keep_going=lease.alive,
+                            )
+                if lease is None:
+                    st.warning(BUSY)
+                elif len(squad_ids) == 15:
                     st.success("Drafted and processed the current GW. See the log below.")
                     st.rerun()
                 else:
@@ -86,8 +131,10 @@ def render_ai_tab(players_df: pd.DataFrame, kb_meta: dict, user_id: str):
     with colA:
         regen_disabled = not bool(st.session_state.openai_key)
         if st.button("🔁 Regenerate this GW (AI)", type="primary", disabled=regen_disabled):
-            with st.spinner("Re-evaluating this gameweek…"):
-                print(force_redraft_toggle)
+            with st.spinner("Re-evaluating this gameweek…"), user_run_lease(user_id, "app") as lease:
+                if lease is None:
+                    st.warning(BUSY)
+                    st.stop()
                 # If GW1 and user wants a full redraft, do it first, then log the week
                 if gw_now == 1 and force_redraft_toggle:
                     ok, msg = force_redraft_gw1(
@@ -107,6 +154,7 @@ def render_ai_tab(players_df: pd.DataFrame, kb_meta: dict, user_id: str):
                     players_df=players_df,
                     model_name=MODEL_NAME,
                     extra_instructions=(user_note or None),  # note applies for THIS regenerate only
+                    keep_going=lease.alive,
                 )
             if ok:
                 st.success(msg)
@@ -130,7 +178,31 @@ def render_ai_tab(players_df: pd.DataFrame, kb_meta: dict, user_id: str):
         st.info("No gameweeks processed yet.")
         return
 
-    for entry in sorted(logs, key=lambda x: x["gw"], reverse=True):
+    # ---------- Season plan (latest planner run) ----------
+    planned = next((e for e in sorted(logs, key=lambda x: x["gw"], reverse=True) if e.get("plan")), None)
+    if planned:
+        with st.expander(f"📅 Season plan (from GW {planned['gw']})", expanded=False):
+            plan_df = pd.DataFrame(planned["plan"]).rename(columns={
+                "gw": "GW", "chip": "Chip", "transfers": "Transfers", "ft_before": "FTs before",
+                "ft_after": "FTs after", "hit": "Hit", "gain": "xP gain"})
+            chips_at = [f"{r['chip']} GW{r['gw']}" for r in planned["plan"] if r.get("chip")]
+            st.caption("Chip timing: " + (", ".join(chips_at) or "hold all chips"))
+            st.dataframe(plan_df, use_container_width=True, hide_index=True)
+
+    # ---------- Log, one page at a time (newest first) ----------
+    pages = (len(logs) + LOG_PAGE_SIZE - 1) // LOG_PAGE_SIZE
+    page = 1
+    if pages > 1:
+        if st.session_state.get("ai_log_page", 1) > pages:   # the log got shorter (user switch / rewind)
+            st.session_state.ai_log_page = pages
+        page = int(st.number_input(f"Log page (of {pages}, newest first)", min_value=1, max_value=pages,
+                                   value=1, step=1, key="ai_log_page"))
+    entries = _log_page(logs, page - 1)
+    by_id = _players_by_id(players_df, kb_hash)
+    squads = _squad_tables(by_id, entries)
+    inject_pitch_css()
+
+    for i, entry in enumerate(entries):
         header = [
             f"GW {entry['gw']}",
             f"Points: {entry['points']}",
@@ -139,6 +211,8 @@ def render_ai_tab(players_df: pd.DataFrame, kb_meta: dict, user_id: str):
         ]
         if entry.get("chip") and entry["chip"] != "NONE":
             header.append(f"Chip {entry['chip']}")
+        if entry.get("hit"):
+            header.append(f"Hit -{entry['hit']}")
         if entry.get("redraft"):
             header.append("Full redraft")
 
@@ -147,51 +221,40 @@ def render_ai_tab(players_df: pd.DataFrame, kb_meta: dict, user_id: str):
             if entry.get("redraft"):
                 st.markdown("**Full redraft applied.**")
             elif entry.get("moves"):
-                if len(entry["moves"]) == 0:
-                    st.markdown("**No transfer made.**")
-                else:
-                    for mv in entry["moves"]:
-                        st.markdown(f"**Transfer:** {_pname(players_df, mv['out'])} → {_pname(players_df, mv['in'])}")
+                for mv in entry["moves"]:
+                    st.markdown(f"**Transfer:** {_pname(by_id, mv['out'])} → {_pname(by_id, mv['in'])}")
             elif entry.get("made") and entry.get("transfer"):
                 out_id = entry["transfer"]["out"]
                 in_id = entry["transfer"]["in"]
-                st.markdown(f"**Transfer:** {_pname(players_df, out_id)} → {_pname(players_df, in_id)}")
+                st.markdown(f"**Transfer:** {_pname(by_id, out_id)} → {_pname(by_id, in_id)}")
             else:
                 st.markdown("**No transfer made.**")
 
             st.markdown(f"**Reason (AI):** {entry.get('reason', '')}")
 
-            # Prepare lists/sets
-            xi_list = list(map(int, entry.get("xi_ids", [])))
-            bench_list = list(map(int, entry.get("bench_ids") or entry.get("bench_order") or []))
-            cap_id = int(entry.get("captain_id") or 0)
-            xi_ids = set(xi_list)
-            bench_ids = set(bench_list)
-            squad_ids = list(map(int, entry.get("squad_ids", [])))
-
-            week = players_df[players_df["id"].isin(squad_ids)].copy()
-            if not week.empty:
-                week["XI"] = week["id"].apply(lambda x: "Yes" if x in xi_ids else "")
-                week["Bench"] = week["id"].apply(lambda x: "Yes" if x in bench_ids else "")
-                week["Captain"] = week["id"].apply(lambda x: "C" if x == cap_id else "")
-                week = week[
-                    [
-                        "web_name",
-                        "team_short",
-                        "pos",
-                        "price",
-                        "form",
-                        "status",
-                        "selected_by",
-                        "points_per_game",
-                        "XI",
-                        "Bench",
-                        "Captain",
-                    ]
-                ].sort_values(["Captain", "XI", "pos", "web_name"], ascending=[False, False, True, True])
+            chk = entry.get("lineup_check") or {}
+            if chk:
+                line = f"**Lineup:** {chk.get('source', 'llm')} · xP {chk.get('xp', 0):.1f} (best {chk.get('best_xp') or 0:.1f})"
+                if chk.get("best_points") is not None:
+                    line += f" · hindsight best {chk['best_points']} pts, {chk.get('points_left', 0)} left on the table"
+                st.caption(line)
+            sim = entry.get("sim") or {}
+            if sim:
+                st.caption(f"**Simulator pick:** captain {_pname(by_id, sim.get('captain_id'))} · {sim.get('chip')} · "
+                           f"mean {sim.get('mean')} (p10 {sim.get('p10'):.0f} / p90 {sim.get('p90'):.0f})")
+            opt = entry.get("optimizer") or {}
+            if opt:
+                st.caption(f"**Squad optimizer:** +{opt.get('gain', 0):.1f} xP over the previous 15 · "
+                           f"£{opt.get('spend', 0):.1f}m of £{opt.get('budget', 0):.1f}m · "
+                           f"{'exact' if opt.get('exact') else 'node limit'} in {opt.get('seconds', 0):.2f}s")
 
+            cap_id = int(entry.get("captain_id") or 0)
+            week = squads.get(i)
+            if week is not None:
+                render_pitch(players_df, entry.get("xi_ids", []), entry.get("bench_ids") or entry.get("bench_order") or [],
+                             cap_id, kb_hash=kb_hash, by_id=by_id, css=False)
                 st.markdown("**Full 15-man squad (this GW):**")
-                st.dataframe(week, use_container_width=True)
-                st.markdown(f"**Captain:** {_pname(players_df, cap_id) if cap_id else '—'}")
+                st.dataframe(week, use_container_width=True, hide_index=True)
+                st.markdown(f"**Captain:** {_pname(by_id, cap_id) if cap_id else '—'}")
             else:
                 st.info("Squad snapshot not available for this entry.")
@@ -1,46 +1,109 @@
 # ui/tab_chat.py
-import hashlib
+import time
 import streamlit as st
 from langchain_openai import ChatOpenAI
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.chains import ConversationChain
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.tools import tool
 
-def render_chat_tab(model_name: str, kb_text: str, kb_hash: str):
-    st.subheader("💬 Chat with the FPL Agent")
+from fpl.ai_manager import routing
 
-    def _make_chain(api_key: str, kb_text: str):
-        llm = ChatOpenAI(openai_api_key=api_key, model_name=model_name, temperature=0.2)
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system",
-                 """You are an FPL expert with access to a knowledge base of real-time player stats and upcoming fixtures.
+MAX_TOOL_ROUNDS = 3
+
+SYSTEM_PROMPT = """You are an FPL expert with access to a knowledge base of real-time player stats and upcoming fixtures.
 Use only this knowledge base to provide data-driven advice. Be concise and specific.
 Core duties: Recommend team, transfers, captain and chip strategies. Use injury/rotation info.
 Rules: Max 3 per club, respect budgets. EPL data only.
-Response: Give concrete picks with prices and reasoning; reference current GW and upcoming runs."""
-                ),
-                ("system", kb_text),
-                MessagesPlaceholder("history"),
-                ("human", "{input}"),
-            ]
-        )
-        memory = ConversationBufferMemory(return_messages=True, memory_key="history")
-        return ConversationChain(llm=llm, memory=memory, prompt=prompt, verbose=False)
+Response: Give concrete picks with prices and reasoning; reference current GW and upcoming runs.
+For "who's like X (but cheaper)" or "replacement for X under £Y" questions, call the similar_players tool."""
+
+
+def _similar_players_tool(index):
+    @tool
+    def similar_players(player: str, max_price: float | None = None, k: int = 5,
+                        position: str | None = None) -> str:
+        """Players statistically closest to `player` (name): per-90 output, ICT, minutes, price and
+        fixture run. Optional `max_price` in £m, `position` (GK/DEF/MID/FWD) to look elsewhere,
+        and `k` results (max 15). Only currently available players are returned."""
+        if index is None:
+            return "Similarity index not loaded."
+        pid = index.find(player)
+        if pid is None:
+            return f"No player matching '{player}'."
+        df = index.similar(pid, k=max(1, min(int(k), 15)), max_price=max_price, pos=position)
+        if df.empty:
+            return "No available players match those filters."
+        return df.round(2).to_string(index=False)
+
+    return similar_players
+
+
+def _invoke(chain: dict, msgs: list, llm_key: str = "llm"):
+    t0 = time.perf_counter()
+    resp = chain[llm_key].invoke(msgs)
+    usage = getattr(resp, "usage_metadata", None) or {}
+    routing.record("chat", chain.get("model", ""), time.perf_counter() - t0,
+                   usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+    return resp
+
+
+def _run_tools(chain: dict, msgs: list, resp) -> list:
+    msgs = msgs + [resp]
+    for call in resp.tool_calls:
+        fn = chain["tools"].get(call["name"])
+        out = fn.invoke(call["args"]) if fn else f"Unknown tool {call['name']}"
+        msgs.append(ToolMessage(str(out), tool_call_id=call["id"]))
+    return msgs
+
+
+def _reply(chain: dict, user_input: str) -> str:
+    """
+    One chat turn: let the model call tools (up to MAX_TOOL_ROUNDS), keep only the final
+    answer. Still asking for tools after the last round, it answers once more without them.
+    Only a plain AIMessage is stored, so the history never holds unanswered tool calls.
+    """
+    chain["messages"].append(HumanMessage(user_input))
+    msgs = chain["system"] + chain["messages"]
+    resp = _invoke(chain, msgs)
+    for _ in range(MAX_TOOL_ROUNDS):
+        if not getattr(resp, "tool_calls", None):
+            break
+        msgs = _run_tools(chain, msgs, resp)
+        resp = _invoke(chain, msgs)
+    if getattr(resp, "tool_calls", None):
+        resp = _invoke(chain, _run_tools(chain, msgs, resp), llm_key="base")
+    chain["messages"].append(AIMessage(resp.content or ""))
+    return resp.content
+
+
+@st.fragment
+def render_chat_tab(model_name: str, kb_text: str, kb_hash: str):
+    """A fragment: sending a message reruns only this tab. kb_hash is the caller's memoized KB hash."""
+    st.subheader("💬 Chat with the FPL Agent")
+
+    def _make_chain(api_key: str, kb_text: str):
+        model = routing.model_for("chat", model_name)
+        llm = ChatOpenAI(openai_api_key=api_key, model_name=model, temperature=0.2)
+        tools = [_similar_players_tool(st.session_state.get("similarity"))]
+        return {
+            "llm": llm.bind_tools(tools),
+            "base": llm,  # no tools: the last word after MAX_TOOL_ROUNDS
+            "model": model,
+            "tools": {t.name: t for t in tools},
+            "system": [SystemMessage(SYSTEM_PROMPT), SystemMessage(kb_text)],
+            "messages": [],  # human / final assistant turns only
+        }
 
     api_key = st.session_state.openai_key
-    current_hash = hashlib.sha256(kb_text.encode("utf-8")).hexdigest()
 
-    if ("conversation" not in st.session_state) or (st.session_state.get("kb_hash") != current_hash) or st.button("Rebuild chat with current KB"):
+    if ("conversation" not in st.session_state) or (st.session_state.get("conversation_kb_hash") != kb_hash) or st.button("Rebuild chat with current KB"):
         if api_key:
             st.session_state.conversation = _make_chain(api_key, kb_text)
-            st.session_state.kb_hash = current_hash
+            st.session_state.conversation_kb_hash = kb_hash
         else:
             st.info("Enter your OpenAI API key in the sidebar to enable chat.")
 
     if "conversation" in st.session_state:
-        mem_msgs = st.session_state.conversation.memory.chat_memory.messages
-        for m in mem_msgs:
+        for m in st.session_state.conversation["messages"]:
             st.chat_message("user" if m.type == "human" else "assistant").write(m.content)
 
     user_input = st.chat_input("Ask about FPL (e.g., best £6.5m mids, who to captain, wildcard draft)...")
@@ -53,7 +116,7 @@ Response: Give concrete picks with prices and reasoning; reference current GW an
         else:
             with st.spinner("Thinking..."):
                 try:
-                    assistant_reply = st.session_state.conversation.predict(input=user_input)
+                    assistant_reply = _reply(st.session_state.conversation, user_input)
                 except Exception as e:
                     assistant_reply = f"Error: {e}"
         st.chat_message("assistant").write(assistant_reply)
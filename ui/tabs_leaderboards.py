@@ -1,31 +1,91 @@
 # ui/tabs_leaderboards.py
 import streamlit as st
+from fpl.leaderboards import METRICS, PRICE_BANDS, LeaderboardIndex
 
-def render_top20(players_df):
-    st.subheader("Top 20 Players by Ownership")
+# Slices are memoized per KB hash, so every session on the same KB shares them (the
+# sidebar Refresh clears them), and each tab is a fragment: changing a picker reruns only that tab.
+@st.cache_resource(show_spinner=False, max_entries=256)
+def _slice(_lb: LeaderboardIndex, kb_hash: str, metric: str, pos: str, band: str, k: int, cols: tuple):
+    return _lb.top(metric, pos, band, k=k, cols=list(cols))
+
+def clear_caches():
+    """Drop memoized slices and movers (sidebar Refresh)."""
+    _slice.clear()
+    _movers.clear()
+
+def _cols(cols: list[str], metric: str) -> tuple:
+    return tuple(cols + ([metric] if metric not in cols else []))
+
+def _metric_picker(lb: LeaderboardIndex, key: str, default: str = "selected_by") -> str:
+    return st.selectbox(
+        "Rank by", lb.metrics, index=lb.metrics.index(default),
+        format_func=METRICS.get, key=key,
+    )
+
+@st.fragment
+def render_top20(lb: LeaderboardIndex, kb_hash: str = ""):
+    metric = _metric_picker(lb, "lb_top20_metric")
+    st.subheader(f"Top 20 Players by {METRICS[metric]}")
+    cols = ["web_name","team_short","pos","price","form","selected_by"]
     st.dataframe(
-        players_df.sort_values("selected_by", ascending=False).head(20)[
-            ["web_name","team_short","pos","price","form","selected_by"]
-        ],
+        _slice(lb, kb_hash, metric, "ALL", "All prices", 20, _cols(cols, metric)),
         use_container_width=True
     )
 
-def render_top10_by_pos(players_df):
-    st.subheader("Top 10 by Position (Ownership)")
+@st.fragment
+def render_top10_by_pos(lb: LeaderboardIndex, kb_hash: str = ""):
+    c1, c2 = st.columns(2)
+    with c1:
+        metric = _metric_picker(lb, "lb_pos_metric")
+    with c2:
+        band = st.selectbox("Price band", list(PRICE_BANDS), key="lb_pos_band")
+    st.subheader(f"Top 10 by Position ({METRICS[metric]})")
+    cols = ["web_name","team_short","price","form","selected_by"]
     for pos_name in ["GK","DEF","MID","FWD"]:
         st.markdown(f"**{pos_name}**")
         st.dataframe(
-            players_df[players_df["pos"] == pos_name]
-            .sort_values("selected_by", ascending=False)
-            .head(10)[["web_name","team_short","price","form","selected_by"]],
+            _slice(lb, kb_hash, metric, pos_name, band, 10, _cols(cols, metric)),
             use_container_width=True
         )
 
-def render_budget(players_df):
+@st.fragment
+def render_budget(lb: LeaderboardIndex, kb_hash: str = ""):
+    c1, c2 = st.columns(2)
+    with c1:
+        metric = _metric_picker(lb, "lb_budget_metric")
+    with c2:
+        pos = st.selectbox("Position", ["ALL","GK","DEF","MID","FWD"], key="lb_budget_pos")
     st.subheader("Top Budget Picks (≤ £5.0m)")
+    cols = ["web_name","team_short","pos","price","form","selected_by"]
     st.dataframe(
-        players_df[players_df["price"] <= 5.0]
-        .sort_values("selected_by", ascending=False)
-        .head(15)[["web_name","team_short","pos","price","form","selected_by"]],
+        _slice(lb, kb_hash, metric, pos, "Budget (≤ £5.0m)", 15, _cols(cols, metric)),
         use_container_width=True
     )
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _movers(_players_df, kb_hash: str):
+    """(risers, fallers, price movers) for one KB, or None before any trend data."""
+    if "own_chg_7d" not in _players_df.columns or not _players_df["own_chg_7d"].any():
+        return None
+    cols = ["web_name","team_short","pos","price","price_chg_7d","selected_by","own_chg_7d","form"]
+    movers = _players_df[_players_df["price_chg_7d"] != 0]
+    return (_players_df.nlargest(15, "own_chg_7d")[cols], _players_df.nsmallest(15, "own_chg_7d")[cols],
+            movers.sort_values("price_chg_7d", ascending=False)[cols])
+
+def render_risers(players_df, kb_hash: str = ""):
+    st.subheader("Risers & Fallers (last 7 days)")
+    tables = _movers(players_df, kb_hash)
+    if tables is None:
+        st.info("Trends appear once at least two KB refreshes have been stored.")
+        return
+    risers, fallers, movers = tables
+    c1, c2 = st.columns(2)
+    with c1:
+        st.markdown("**Ownership risers**")
+        st.dataframe(risers, use_container_width=True)
+    with c2:
+        st.markdown("**Ownership fallers**")
+        st.dataframe(fallers, use_container_width=True)
+    if not movers.empty:
+        st.markdown("**Price changes**")
+        st.dataframe(movers, use_container_width=True)
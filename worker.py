@@ -0,0 +1,160 @@
+# worker.py
+"""
+Job worker: advances users' seasons from the jobs table (persist_db). Run as many
+processes, on as many nodes, as you like against the same DATABASE_URL.
+
+    python worker.py --enqueue              # queue every saved user up to the current GW, then work
+    python worker.py --processes 4          # 4 worker processes on this node
+    python worker.py --drain                # exit once nothing is queued or running
+    python worker.py --stats                # queue depth, throughput, queue latency
+
+A job is leased (FOR UPDATE SKIP LOCKED on Postgres; SQLite's writer lock locally),
+kept alive by a heartbeat thread, and retried with exponential backoff on error.
+Jobs are idempotent: a user whose last_gw_processed already reaches the target is
+marked done without running, and the decision engine itself only processes GWs
+after last_gw_processed.
+"""
+from __future__ import annotations
+import argparse, logging, multiprocessing as mp, os, socket, sys, time, traceback
+
+import fpl.api as fpl_api
+from fpl import metrics
+from fpl.kb import current_gw
+from fpl.snapshot import KbSnapshot, build_snapshot
+from fpl.ai_manager.persist_db import (
+    engine, init_db, load_state, enqueue_all, lease_job, finish_job, fail_job, job_stats, pending_jobs,
+    JobHeartbeat, JOB_LEASE_SECS,
+)
+from fpl.ai_manager.decision import session_scope, run_ai_auto_until_current
+from config import MODEL_NAME
+
+POLL_SECS = float(os.getenv("FPL_JOB_POLL", "2"))
+KB_TTL = float(os.getenv("FPL_API_KB_TTL", "900"))
+GW_CHECK_SECS = float(os.getenv("FPL_JOB_GW_CHECK", "60"))   # how often a job ahead of the KB may re-check FPL's GW
+
+log = logging.getLogger("fpl.worker")
+
+
+class Worker:
+    def __init__(self, name: str | None = None, lease_secs: float = JOB_LEASE_SECS, api_key: str | None = None):
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_secs = lease_secs
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY", "")
+        self.snap: KbSnapshot | None = None
+        self.gw_checked = 0.0
+        self.stats = {"jobs": 0, "done": 0, "noop": 0, "retry": 0, "lost": 0, "busy": 0.0}
+
+    def _snapshot(self, target_gw: int) -> KbSnapshot:
+        """The KB snapshot, rebuilt from fresh FPL responses on TTL expiry or when FPL's GW has moved on."""
+        stale = self.snap is None or time.time() - self.snap.built_at > KB_TTL
+        if not stale and (self.snap.gw or 0) < target_gw:
+            stale = self._gw_moved()
+        if stale:
+            fpl_api.clear_live_caches()
+            self.snap = build_snapshot()
+        return self.snap
+
+    def _gw_moved(self) -> bool:
+        """Whether FPL's current GW is past the snapshot's: one bootstrap fetch, at most every GW_CHECK_SECS."""
+        if time.time() - self.gw_checked < GW_CHECK_SECS:
+            return False
+        self.gw_checked = time.time()
+        fpl_api.clear_live_caches()
+        return (current_gw(fpl_api.fetch_bootstrap()) or 0) > (self.snap.gw or 0)
+
+    def run_one(self, job: dict) -> str:
+        """Run a leased job to completion; returns the outcome (done/noop/retry/lost)."""
+        uid, target = job["user_id"], int(job["target_gw"])
+        state = load_state(uid, job["season"])
+        if state is None or not state.get("squad"):
+            finish_job(job["id"], job["lease_token"], target, {"skipped": "no saved squad"})
+            return "noop"
+        if int(state.get("last_gw_processed") or 0) >= target:
+            finish_job(job["id"], job["lease_token"], int(state["last_gw_processed"]), {"skipped": "up to date"})
+            return "noop"
+
+        hb = JobHeartbeat(job["id"], job["lease_token"], self.lease_secs)
+        hb.start()
+        try:
+            snap = self._snapshot(target)
+            with session_scope(snap.session_values(self.api_key, state)) as s:
+                timings = run_ai_auto_until_current(user_id=uid, kb_meta=snap.kb_meta, players_df=snap.players_df,
+                                                    model_name=MODEL_NAME, keep_going=hb.alive)
+                done_gw = s.auto_mgr.get("last_gw_processed")
+        except Exception:
+            hb.stop()
+            return "retry" if fail_job(job["id"], job["lease_token"], traceback.format_exc()) else "lost"
+        hb.stop()
+        if hb.lost:
+            return "lost"
+        if done_gw is None or int(done_gw) < target:
+            fail_job(job["id"], job["lease_token"], f"stopped at GW{done_gw} (target GW{target}, KB GW{snap.gw})")
+            return "retry"
+        finish_job(job["id"], job["lease_token"], int(done_gw), {"timings": timings, "worker": self.name})
+        return "done"
+
+    def work(self, drain: bool = False, max_jobs: int | None = None, poll: float = POLL_SECS) -> dict:
+        """Lease and run jobs until stopped (or, with `drain`, until nothing is queued or running)."""
+        while max_jobs is None or self.stats["jobs"] < max_jobs:
+            job = lease_job(self.name, self.lease_secs)
+            if job is None:
+                if drain and not pending_jobs():
+                    break
+                time.sleep(poll)
+                continue
+            t0 = time.perf_counter()
+            outcome = self.run_one(job)
+            secs = time.perf_counter() - t0
+            self.stats["jobs"] += 1
+            self.stats[outcome] += 1
+            self.stats["busy"] += secs
+            metrics.inc("jobs_total", outcome=outcome)
+            metrics.observe("job_seconds", secs)
+            metrics.write_file()
+            log.info("%s job=%s user=%s gw=%s attempt=%s %s in %.2fs", self.name, job["id"], job["user_id"],
+                     job["target_gw"], job["attempts"], outcome, secs)
+        return self.stats
+
+
+def _process_main(drain: bool, max_jobs: int | None):
+    engine.dispose(close=False)   # never share pooled connections across fork
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    stats = Worker().work(drain=drain, max_jobs=max_jobs)
+    log.info("worker %s exiting: %s", os.getpid(), stats)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--processes", type=int, default=1)
+    ap.add_argument("--enqueue", nargs="?", const=-1, type=int, metavar="GW",
+                    help="enqueue every saved user first (default GW: the KB's current GW)")
+    ap.add_argument("--drain", action="store_true", help="exit when the queue is empty")
+    ap.add_argument("--max-jobs", type=int, default=None, help="per process")
+    ap.add_argument("--stats", action="store_true", help="print queue stats and exit")
+    a = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    init_db()
+
+    if a.stats:
+        print(job_stats())
+        return 0
+    if a.enqueue is not None:
+        gw = a.enqueue if a.enqueue > 0 else build_snapshot().gw
+        log.info("enqueued %d users to GW%s", enqueue_all(int(gw)), gw)
+    if not os.getenv("OPENAI_API_KEY"):
+        log.error("OPENAI_API_KEY is not set")
+        return 1
+
+    if a.processes <= 1:
+        _process_main(a.drain, a.max_jobs)
+        return 0
+    procs = [mp.Process(target=_process_main, args=(a.drain, a.max_jobs), name=f"worker-{i}")
+             for i in range(a.processes)]
+    for p in procs: p.start()
+    for p in procs: p.join()
+    print(job_stats())
+    return max(p.exitcode or 0 for p in procs)
+
+
+if __name__ == "__main__":
+    sys.exit(main())